@@ -1,7 +1,7 @@
 """Chat routes."""
 import json
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from fastapi.responses import StreamingResponse
 from sqlmodel import Session
 from backend.core.db import get_session
@@ -29,6 +29,7 @@ from backend.services.chat_service import (
     delete_chat_session as delete_session,
 )
 from backend.crud import chat_crud
+from backend.utils.cancellation import ClientDisconnected, cancel_on_disconnect
 
 router = APIRouter(prefix="/chat", tags=["chat"])
 
@@ -95,14 +96,22 @@ async def get_messages(
 
 @router.post("/", response_model=ChatResponse)
 async def chat(
+    request: Request,
     chat_request: ChatRequest,
     current_user: UserRead = Depends(get_current_active_user),
     db: Session = Depends(get_session),
 ):
-    """Send a message and get agent response."""
+    """Send a message and get agent response.
+
+    The agent run, including its in-flight database queries, is cancelled
+    when the client disconnects.
+    """
     try:
-        response = await send_message(db, current_user.id, chat_request)
+        response = await cancel_on_disconnect(request, send_message(db, current_user.id, chat_request))
         return response
+    except ClientDisconnected:
+        # Nobody reads this; 499 is the de facto "client closed request" status
+        raise HTTPException(status_code=499, detail="Client closed request")
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -1,15 +1,21 @@
 """Document management routes."""
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from typing import List, Optional
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile, status
 from sqlmodel import Session
+from backend.core.config import settings
 from backend.core.db import get_session
 from backend.api.v1.auth import get_current_active_user
 from backend.models.user import UserRead
-from backend.models.document import DocumentRead, DocumentUpdate
+from backend.models.document import DocumentBulkDelete, DocumentBulkDeleteRead, DocumentRead, DocumentUpdate
+from backend.models.ingestion import DocumentStatusRead
+from backend.utils.storage import FileTooLargeError
 from backend.services.document_service import (
     get_user_documents,
+    get_document_status,
+    request_reindex,
     update_document_metadata,
     delete_document,
+    delete_documents,
 )
 
 router = APIRouter(prefix="/docs", tags=["documents"])
@@ -45,6 +51,40 @@ async def get_document(
     return DocumentRead.model_validate(document)
 
 
+@router.get("/{document_id}/status", response_model=DocumentStatusRead)
+async def get_document_processing_status(
+    document_id: int,
+    current_user: UserRead = Depends(get_current_active_user),
+    session: Session = Depends(get_session),
+):
+    """Get processing status and embedding progress of a document."""
+    try:
+        return get_document_status(session, document_id, current_user.id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/{document_id}/reindex", response_model=DocumentRead, status_code=status.HTTP_202_ACCEPTED)
+async def reindex_document_endpoint(
+    document_id: int,
+    file: Optional[UploadFile] = File(None),
+    current_user: UserRead = Depends(get_current_active_user),
+    session: Session = Depends(get_session),
+):
+    """Re-index a document, optionally uploading a new version of its file.
+
+    Only chunks whose text changed are embedded again. Runs in the background;
+    poll ``GET /docs/{id}/status`` for progress.
+    """
+    try:
+        document = await request_reindex(session, document_id, current_user.id, file)
+        return DocumentRead.model_validate(document)
+    except FileTooLargeError as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @router.patch("/{document_id}", response_model=DocumentRead)
 async def update_document(
     document_id: int,
@@ -75,4 +115,23 @@ async def delete_document_endpoint(
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@router.post("/bulk-delete", response_model=DocumentBulkDeleteRead)
+async def bulk_delete_documents_endpoint(
+    request: DocumentBulkDelete,
+    current_user: UserRead = Depends(get_current_active_user),
+    session: Session = Depends(get_session),
+):
+    """Delete many documents at once.
 
+    Documents are hidden immediately; their vectors and files are purged in
+    the background.
+    """
+    if len(request.document_ids) > settings.BULK_DELETE_MAX_DOCUMENTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.BULK_DELETE_MAX_DOCUMENTS} documents can be deleted per request",
+        )
+    try:
+        return delete_documents(session, request.document_ids, current_user.id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
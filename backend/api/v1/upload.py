@@ -1,11 +1,14 @@
 """Document upload routes."""
+from typing import List
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, status
 from sqlmodel import Session
 from backend.core.db import get_session
 from backend.api.v1.auth import get_current_active_user
 from backend.models.user import UserRead
 from backend.models.document import DocumentRead
-from backend.services.document_service import upload_document
+from backend.models.ingestion import IngestionBatchRead
+from backend.services.document_service import upload_document, upload_documents_bulk, get_batch_status
+from backend.utils.storage import FileTooLargeError
 
 router = APIRouter(prefix="/upload", tags=["upload"])
 
@@ -16,14 +19,51 @@ async def upload_file(
     current_user: UserRead = Depends(get_current_active_user),
     session: Session = Depends(get_session),
 ):
-    """Upload a document."""
+    """Upload a document.
+
+    The document is returned in ``pending`` status and processed in the
+    background; poll ``GET /docs/{id}/status`` for progress.
+    """
     try:
         document = await upload_document(session, file, current_user.id)
         return DocumentRead.model_validate(document)
+    except FileTooLargeError as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error uploading file: {str(e)}")
 
 
+@router.post("/bulk", response_model=IngestionBatchRead, status_code=status.HTTP_201_CREATED)
+async def upload_files_bulk(
+    files: List[UploadFile] = File(...),
+    current_user: UserRead = Depends(get_current_active_user),
+    session: Session = Depends(get_session),
+):
+    """Upload many documents at once as one ingestion batch.
+
+    Accepts any number of documents and zip/tar archives (``.zip``, ``.tar``,
+    ``.tar.gz``, ``.tgz``, ``.tar.bz2``, ``.tar.xz``); archive members are
+    ingested as individual documents. Poll ``GET /upload/batches/{id}`` for
+    aggregate progress.
+    """
+    try:
+        return await upload_documents_bulk(session, files, current_user.id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error uploading files: {str(e)}")
+
 
+@router.get("/batches/{batch_id}", response_model=IngestionBatchRead)
+async def get_upload_batch(
+    batch_id: int,
+    current_user: UserRead = Depends(get_current_active_user),
+    session: Session = Depends(get_session),
+):
+    """Get aggregate processing progress of a bulk upload."""
+    try:
+        return get_batch_status(session, batch_id, current_user.id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
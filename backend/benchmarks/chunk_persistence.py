@@ -0,0 +1,116 @@
+"""Benchmark DocumentChunk inserts and deletes against PostgreSQL.
+
+Compares the ORM path (``session.add`` per row, ``session.delete`` per row)
+with batched executemany, COPY and a set-based DELETE. Needs the database
+from ``DATABASE_URL``; everything runs in one transaction that is rolled
+back, so no rows are left behind.
+
+The COPY case uses the driver of ``DATABASE_URL``, which is printed: a
+plain ``postgresql://`` URL selects psycopg2 up to SQLAlchemy 2.0 and
+psycopg 3 from 2.1. Pass ``--database-url`` with ``postgresql+psycopg2://``
+or ``postgresql+psycopg://`` to compare both drivers on the same database.
+
+Usage:
+    python -m backend.benchmarks.chunk_persistence --rows 20000
+"""
+import argparse
+import time
+import uuid
+from typing import Callable
+from sqlalchemy import delete
+from sqlmodel import Session, create_engine, select
+from backend.core.db import engine
+from backend.crud import document_crud
+from backend.models.document import Document, DocumentChunk
+from backend.models.user import User
+
+
+def make_rows(document_id: int, count: int) -> list[dict]:
+    """Chunk rows shaped like the ones written by ingestion."""
+    text = "Retrieval augmented generation splits documents into chunks. " * 8
+    return [
+        {
+            "document_id": document_id,
+            "chunk_text": f"{idx}\t{text}\n",
+            "chunk_index": idx,
+            "chunk_meta": '{"filename": "benchmark.txt", "mime_type": "text/plain"}',
+            "chunk_hash": uuid.uuid4().hex,
+            "embedding_id": str(uuid.uuid4()),
+        }
+        for idx in range(count)
+    ]
+
+
+def timed(session: Session, func: Callable[[], None]) -> float:
+    """Run ``func`` inside a savepoint that is rolled back afterwards."""
+    savepoint = session.begin_nested()
+    started = time.perf_counter()
+    func()
+    session.flush()
+    elapsed = time.perf_counter() - started
+    savepoint.rollback()
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--database-url", help="Database URL (default: DATABASE_URL)")
+    args = parser.parse_args()
+
+    bind = create_engine(args.database_url) if args.database_url else engine
+    driver = bind.dialect.driver
+    copy_method = "copy" if driver in document_crud.COPY_DRIVERS else "executemany (no COPY support)"
+    with Session(bind) as session:
+        # Commits inside the crud helpers would end the outer transaction
+        session.commit = session.flush
+
+        user = User(email=f"benchmark-{uuid.uuid4().hex[:8]}@example.com", hashed_password="-")
+        session.add(user)
+        session.flush()
+        document = Document(filename="benchmark.txt", owner_id=user.id, storage_path="/dev/null")
+        session.add(document)
+        session.flush()
+        rows = make_rows(document.id, args.rows)
+
+        def orm_insert():
+            for row in rows:
+                session.add(DocumentChunk(**row))
+
+        def orm_delete():
+            document_crud.insert_document_chunks(session, rows, method="copy")
+            started = time.perf_counter()
+            chunks = session.exec(select(DocumentChunk).where(DocumentChunk.document_id == document.id)).all()
+            for chunk in chunks:
+                session.delete(chunk)
+            session.flush()
+            return time.perf_counter() - started
+
+        def set_delete():
+            document_crud.insert_document_chunks(session, rows, method="copy")
+            started = time.perf_counter()
+            session.execute(delete(DocumentChunk).where(DocumentChunk.document_id == document.id))
+            return time.perf_counter() - started
+
+        results = {
+            "insert: orm add": timed(session, orm_insert),
+            "insert: executemany": timed(
+                session, lambda: document_crud.insert_document_chunks(session, rows, method="executemany")
+            ),
+            "insert: copy": timed(session, lambda: document_crud.insert_document_chunks(session, rows, method="copy")),
+        }
+        for name, func in (("delete: orm per row", orm_delete), ("delete: set-based", set_delete)):
+            savepoint = session.begin_nested()
+            results[name] = func()
+            savepoint.rollback()
+
+        session.rollback()
+
+    print(f"{args.rows} rows, driver {driver}, insert: copy runs {copy_method}")
+    print(f"{'case':<24}{'time (s)':>10}{'rows/s':>12}")
+    for name, seconds in results.items():
+        print(f"{name:<24}{seconds:>10.3f}{args.rows / seconds:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
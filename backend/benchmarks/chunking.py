@@ -0,0 +1,86 @@
+"""Benchmark the span-based chunker against the legacy ``chunk_text``.
+
+Usage:
+    python -m backend.benchmarks.chunking --size-mb 4 --repeat 3
+"""
+import argparse
+import random
+import time
+import tracemalloc
+from typing import Callable
+from backend.utils.chunker import SpanChunker
+from backend.utils.extractor import chunk_text
+
+_WORDS = (
+    "retrieval augmented generation embeds document chunks into vectors and searches "
+    "them by similarity before the language model answers the question using context"
+).split()
+
+
+def make_markdown(size_bytes: int, seed: int = 0) -> str:
+    """Generate a synthetic Markdown document of about ``size_bytes`` characters."""
+    rng = random.Random(seed)
+    parts = []
+    total = 0
+    section = 0
+    while total < size_bytes:
+        section += 1
+        parts.append(f"## Section {section}\n\n")
+        for _ in range(rng.randint(2, 8)):
+            sentences = []
+            for _ in range(rng.randint(2, 10)):
+                words = [rng.choice(_WORDS) for _ in range(rng.randint(5, 25))]
+                sentences.append(" ".join(words).capitalize() + ".")
+            paragraph = " ".join(sentences) + "\n\n"
+            parts.append(paragraph)
+            total += len(paragraph)
+    return "".join(parts)
+
+
+def measure(func: Callable[[], list], repeat: int) -> tuple[float, float, int]:
+    """Best wall time (s), peak traced memory (MB) and number of chunks."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    tracemalloc.start()
+    result = func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak / (1024 * 1024), len(result)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-mb", type=float, default=4.0, help="Input size in MB")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--chunk-size", type=int, default=500, help="Characters for the character-based runs")
+    parser.add_argument("--chunk-overlap", type=int, default=50)
+    args = parser.parse_args()
+
+    text = make_markdown(int(args.size_mb * 1024 * 1024))
+    size, overlap = args.chunk_size, args.chunk_overlap
+    token_chunker = SpanChunker(max(size // 4, 2), max(overlap // 4, 1), unit="tokens", markdown=True)
+    cases = {
+        "chunk_text": lambda: chunk_text(text, chunk_size=size, chunk_overlap=overlap),
+        "span chars (offsets only)": lambda: SpanChunker(size, overlap, unit="chars").split(text),
+        "span chars": lambda: SpanChunker(size, overlap, unit="chars").chunk(text),
+        "span chars + markdown": lambda: SpanChunker(size, overlap, unit="chars", markdown=True).chunk(text),
+        "span tokens + markdown": lambda: token_chunker.chunk(text),
+    }
+
+    print(f"Input: {len(text) / (1024 * 1024):.1f} MB, chunk size {size}, overlap {overlap}")
+    if token_chunker.tokenizer is None:
+        print("Tokenizer unavailable: token run approximates tokens by characters")
+    print(f"{'case':<26}{'time (s)':>10}{'MB/s':>10}{'peak MB':>10}{'chunks':>10}")
+    baseline = None
+    for name, func in cases.items():
+        seconds, peak, count = measure(func, args.repeat)
+        baseline = baseline or seconds
+        throughput = len(text) / (1024 * 1024) / seconds
+        print(f"{name:<26}{seconds:>10.3f}{throughput:>10.1f}{peak:>10.1f}{count:>10}  ({baseline / seconds:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Synthetic TXT, Markdown, PDF and DOCX documents for benchmarks."""
+import textwrap
+from pathlib import Path
+from typing import List
+from backend.benchmarks.chunking import make_markdown
+
+FORMATS = ("txt", "md", "pdf", "docx")
+
+# PDF page layout: 10pt Helvetica on US Letter
+_PDF_LINES_PER_PAGE = 60
+_PDF_LINE_WIDTH = 95
+
+
+def write_txt(path: Path, text: str) -> None:
+    """Plain text: the Markdown with heading markers removed."""
+    lines = (line.lstrip("#").lstrip() for line in text.splitlines())
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def write_md(path: Path, text: str) -> None:
+    path.write_text(text, encoding="utf-8")
+
+
+def write_docx(path: Path, text: str) -> None:
+    """Word document with one heading or paragraph per Markdown block."""
+    import docx
+
+    document = docx.Document()
+    for block in text.split("\n\n"):
+        block = block.strip()
+        if not block:
+            continue
+        if block.startswith("#"):
+            document.add_heading(block.lstrip("#").strip(), level=2)
+        else:
+            document.add_paragraph(block)
+    document.save(path)
+
+
+def _pdf_escape(line: str) -> str:
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(path: Path, text: str) -> None:
+    """Text-only PDF written by hand, so no PDF library is needed.
+
+    Lines are wrapped and laid out 60 per page with the standard Helvetica
+    font, which every PDF reader (and PyPDF2) can extract.
+    """
+    lines: List[str] = []
+    for paragraph in text.splitlines():
+        lines.extend(textwrap.wrap(paragraph, _PDF_LINE_WIDTH) or [""])
+    pages = [lines[i:i + _PDF_LINES_PER_PAGE] for i in range(0, len(lines), _PDF_LINES_PER_PAGE)] or [[]]
+
+    # Object numbers: 1 catalog, 2 page tree, 3 font, then a page and its content per page
+    objects = {
+        1: b"<< /Type /Catalog /Pages 2 0 R >>",
+        3: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    }
+    page_refs = []
+    for idx, page_lines in enumerate(pages):
+        page_num, content_num = 4 + 2 * idx, 5 + 2 * idx
+        page_refs.append(f"{page_num} 0 R")
+        body = "BT /F1 10 Tf 12 TL 50 750 Td\n"
+        body += "".join(f"({_pdf_escape(line)}) Tj T*\n" for line in page_lines)
+        body += "ET"
+        stream = body.encode("latin-1", errors="replace")
+        objects[page_num] = (
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents " + f"{content_num} 0 R".encode() + b" >>"
+        )
+        objects[content_num] = b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream)
+    objects[2] = f"<< /Type /Pages /Kids [{' '.join(page_refs)}] /Count {len(pages)} >>".encode()
+
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.4\n")
+        offsets = {}
+        for num in sorted(objects):
+            offsets[num] = f.tell()
+            f.write(b"%d 0 obj\n%s\nendobj\n" % (num, objects[num]))
+        xref_offset = f.tell()
+        f.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+        for num in sorted(objects):
+            f.write(b"%010d 00000 n \n" % offsets[num])
+        f.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref_offset))
+
+
+_WRITERS = {"txt": write_txt, "md": write_md, "pdf": write_pdf, "docx": write_docx}
+
+
+def generate_corpus(directory: Path, formats: List[str], files_per_format: int, size_bytes: int) -> List[Path]:
+    """Write ``files_per_format`` documents of about ``size_bytes`` of text per format.
+
+    Every file gets different text (seeded by its position), so uploads are
+    never deduplicated against each other.
+
+    Returns:
+        Paths of the generated files
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = []
+    seed = 0
+    for file_format in formats:
+        if file_format not in _WRITERS:
+            raise ValueError(f"Unknown format {file_format}; expected one of {', '.join(FORMATS)}")
+        for idx in range(files_per_format):
+            seed += 1
+            path = directory / f"synthetic_{idx:03d}.{file_format}"
+            _WRITERS[file_format](path, make_markdown(size_bytes, seed=seed))
+            paths.append(path)
+    return paths
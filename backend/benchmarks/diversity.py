@@ -0,0 +1,114 @@
+"""Benchmark MMR diversification against a per-pair Python loop.
+
+Candidates are random vectors clustered around a few centers, with exact
+and slightly perturbed copies mixed in, like overlapping chunks and
+duplicate uploads. Both implementations must pick the same candidates.
+
+Usage:
+    python -m backend.benchmarks.diversity --candidates 20,50,100,200,500 --dim 1536 --k 5
+"""
+import argparse
+import math
+import time
+from typing import Callable, List, Optional
+import numpy as np
+from backend.services.diversity import mmr_select
+
+
+def make_candidates(n: int, dim: int, seed: int = 0) -> tuple[np.ndarray, np.ndarray]:
+    """Query vector and ``n`` candidates, about a quarter of them near duplicates."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(n // 10, 1), dim)).astype(np.float32)
+    candidates = centers[rng.integers(len(centers), size=n)] + rng.standard_normal((n, dim)).astype(np.float32)
+    duplicates = rng.choice(n, size=n // 4, replace=False)
+    candidates[duplicates] = (
+        candidates[rng.integers(n, size=len(duplicates))]
+        + 0.01 * rng.standard_normal((len(duplicates), dim)).astype(np.float32)
+    )
+    query = centers[0] + 0.5 * rng.standard_normal(dim).astype(np.float32)
+    return query, candidates
+
+
+def mmr_select_loop(
+    candidates: np.ndarray,
+    k: int,
+    query: np.ndarray,
+    lambda_mult: float,
+    duplicate_threshold: Optional[float],
+) -> List[int]:
+    """Reference implementation: cosine similarities computed pair by pair in Python."""
+    vectors = [list(map(float, row)) for row in candidates]
+    query_vector = list(map(float, query))
+
+    def cosine(a: List[float], b: List[float]) -> float:
+        dot = sum(x * y for x, y in zip(a, b))
+        norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+        return dot / norm if norm else 0.0
+
+    relevance = [cosine(vector, query_vector) for vector in vectors]
+    selected: List[int] = []
+    dropped: set[int] = set()
+    while len(selected) < k:
+        best, best_score = None, -math.inf
+        for i, vector in enumerate(vectors):
+            if i in dropped or i in selected:
+                continue
+            redundancy = max((cosine(vector, vectors[j]) for j in selected), default=None)
+            score = relevance[i] if redundancy is None else lambda_mult * relevance[i] - (1 - lambda_mult) * redundancy
+            if score > best_score:
+                best, best_score = i, score
+        if best is None:
+            break
+        selected.append(best)
+        if duplicate_threshold is not None:
+            dropped |= {
+                i for i, vector in enumerate(vectors)
+                if i not in selected and cosine(vector, vectors[best]) >= duplicate_threshold
+            }
+    return selected
+
+
+def best_time(func: Callable[[], List[int]], repeat: int) -> tuple[float, List[int]]:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--candidates", default="20,50,100,200,500", help="Comma-separated candidate counts")
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--lambda-mult", type=float, default=0.7)
+    parser.add_argument("--threshold", type=float, default=0.95)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--skip-loop", action="store_true", help="Only time the NumPy implementation")
+    args = parser.parse_args()
+
+    print(f"dim {args.dim}, k {args.k}, lambda {args.lambda_mult}, threshold {args.threshold}")
+    print(f"{'candidates':>10}{'numpy (ms)':>12}{'loop (ms)':>12}{'speedup':>10}")
+    for n in (int(value) for value in args.candidates.split(",")):
+        query, candidates = make_candidates(n, args.dim)
+        numpy_seconds, picked = best_time(
+            lambda: mmr_select(
+                candidates, args.k, query=query, lambda_mult=args.lambda_mult, duplicate_threshold=args.threshold
+            ),
+            args.repeat,
+        )
+        if args.skip_loop:
+            print(f"{n:>10}{numpy_seconds * 1000:>12.3f}{'-':>12}{'-':>10}")
+            continue
+        loop_seconds, expected = best_time(
+            lambda: mmr_select_loop(candidates, args.k, query, args.lambda_mult, args.threshold),
+            1,
+        )
+        if picked != expected:
+            raise SystemExit(f"Results differ for {n} candidates: {picked} != {expected}")
+        print(f"{n:>10}{numpy_seconds * 1000:>12.3f}{loop_seconds * 1000:>12.1f}{loop_seconds / numpy_seconds:>9.0f}x")
+
+
+if __name__ == "__main__":
+    main()
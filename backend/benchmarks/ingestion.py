@@ -0,0 +1,332 @@
+"""Benchmark document ingestion end to end with an offline embedding model.
+
+Generates a synthetic corpus, then runs every file through the real
+``upload_document`` and ``process_document`` path: streaming to storage,
+the extraction pool, chunking, embedding, the pgvector insert and the
+chunk COPY. Embeddings come from the deterministic ``fake`` provider, so
+no network is needed, and the embedding cache is disabled so the real
+cache is left untouched. Vectors go to a separate collection that is
+dropped afterwards, and all rows created by the run are removed.
+
+Stages run concurrently inside the pipeline, so stage times are the time
+spent in each stage summed over all calls and add up to more than the
+wall time.
+
+Needs PostgreSQL with pgvector at ``DATABASE_URL``. Use a database no app
+instance is serving, or its ingestion workers may claim the benchmark's jobs.
+
+Usage:
+    python -m backend.benchmarks.ingestion --formats txt,md,pdf,docx --files 4 --size-mb 1 \\
+        --output results.json [--baseline previous.json]
+"""
+import argparse
+import asyncio
+import json
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+from functools import wraps
+from pathlib import Path
+from typing import Any, Callable, Optional
+from fastapi import UploadFile
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, select
+from backend.benchmarks.corpus import FORMATS, generate_corpus
+from backend.core.config import settings
+from backend.core.db import engine, init_db
+from backend.crud import document_crud, ingestion_crud
+from backend.models.document import Document
+from backend.models.retrieval import CorpusVersion
+from backend.models.user import User
+from backend.services import document_service, ingestion_pipeline, langchain_agent
+from backend.services.embedding_scheduler import embedding_scheduler
+from backend.utils.chunker import StreamingSpanChunker
+from backend.utils.extraction_pool import extraction_pool
+from backend.utils.storage import storage
+
+# Metrics compared against a baseline: name -> whether higher is better
+_TRACKED = {
+    "chunks_per_second": True,
+    "mb_per_second": True,
+    "wall_seconds": False,
+    "db_round_trips": False,
+    "peak_rss_mb": False,
+}
+
+
+class StageTimer:
+    """Accumulates time and calls per stage and counts database round trips."""
+
+    def __init__(self):
+        self.seconds: dict[str, float] = defaultdict(float)
+        self.calls: dict[str, int] = defaultdict(int)
+        self.round_trips = 0
+
+    def wrap(self, stage: str, func: Callable) -> Callable:
+        """Time a sync function."""
+        @wraps(func)
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.seconds[stage] += time.perf_counter() - started
+                self.calls[stage] += 1
+        return timed
+
+    def wrap_async(self, stage: str, func: Callable) -> Callable:
+        """Time a coroutine function."""
+        @wraps(func)
+        async def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                self.seconds[stage] += time.perf_counter() - started
+                self.calls[stage] += 1
+        return timed
+
+    def wrap_iterator(self, stage: str, func: Callable) -> Callable:
+        """Time each step of an async generator function."""
+        @wraps(func)
+        async def timed(*args, **kwargs):
+            iterator = func(*args, **kwargs)
+            try:
+                while True:
+                    started = time.perf_counter()
+                    try:
+                        item = await iterator.__anext__()
+                    except StopAsyncIteration:
+                        return
+                    finally:
+                        self.seconds[stage] += time.perf_counter() - started
+                    self.calls[stage] += 1
+                    yield item
+            finally:
+                await iterator.aclose()
+        return timed
+
+    def count_statement(self, *args) -> None:
+        self.round_trips += 1
+
+
+def instrument(timer: StageTimer) -> None:
+    """Patch the ingestion stages to report into ``timer``."""
+    extraction_pool.iter_segments = timer.wrap_iterator("extract", extraction_pool.iter_segments)
+    StreamingSpanChunker.feed = timer.wrap("chunk", StreamingSpanChunker.feed)
+    StreamingSpanChunker.finish = timer.wrap("chunk", StreamingSpanChunker.finish)
+    embedding_scheduler.embed = timer.wrap_async("embed", embedding_scheduler.embed)
+    ingestion_pipeline.aadd_embedded_documents = timer.wrap_async(
+        "vector_insert", ingestion_pipeline.aadd_embedded_documents
+    )
+    document_crud.insert_document_chunks = timer.wrap("chunk_insert", document_crud.insert_document_chunks)
+    # COPY goes through the raw DBAPI cursor and bypasses the engine events
+    copy_chunks = document_crud._copy_chunks
+
+    def counted_copy(*args, **kwargs):
+        timer.round_trips += 1
+        return copy_chunks(*args, **kwargs)
+
+    document_crud._copy_chunks = counted_copy
+    event.listen(Engine, "before_cursor_execute", timer.count_statement)
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def peak_rss_mb() -> tuple[float, float]:
+    """Peak resident memory of this process and of its reaped children (MB)."""
+    # ru_maxrss is in KB on Linux and bytes on macOS
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / divisor
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / divisor
+    return own, children
+
+
+async def ingest(session: Session, path: Path, user_id: int, timer: StageTimer) -> dict[str, Any]:
+    """Upload and process one file, returning its timings."""
+    started = time.perf_counter()
+    with open(path, "rb") as f:
+        upload = UploadFile(file=f, filename=path.name, size=path.stat().st_size)
+        document = await document_service.upload_document(session, upload, user_id)
+    uploaded = time.perf_counter()
+    timer.seconds["upload"] += uploaded - started
+    timer.calls["upload"] += 1
+
+    job = ingestion_crud.get_latest_job_for_document(session, document.id)
+    await document_service.process_document(session, document.id, job_id=job.id if job else None)
+    finished = time.perf_counter()
+    if job:
+        ingestion_crud.finish_job(session, job.id, "completed")
+
+    chunks = len(document_crud.get_chunk_embedding_ids(session, document.id))
+    return {
+        "file": path.name,
+        "format": path.suffix.lstrip("."),
+        "bytes": path.stat().st_size,
+        "chunks": chunks,
+        "upload_seconds": round(uploaded - started, 4),
+        "process_seconds": round(finished - uploaded, 4),
+    }
+
+
+def cleanup(user_id: int) -> None:
+    """Remove the benchmark user, its documents and files, and the collection."""
+    with Session(engine) as session:
+        documents = session.exec(select(Document).where(Document.owner_id == user_id)).all()
+        paths = {document.storage_path for document in documents}
+        document_crud.purge_documents(session, [document.id for document in documents])
+        corpus_version = session.get(CorpusVersion, user_id)
+        if corpus_version:
+            session.delete(corpus_version)
+        user = session.get(User, user_id)
+        if user:
+            session.delete(user)
+            session.commit()
+    for path in paths:
+        storage.delete_file(path)
+    langchain_agent.get_vector_store().delete_collection()
+
+
+def compare(results: dict[str, Any], baseline: dict[str, Any], tolerance: float) -> dict[str, Any]:
+    """Relative change of the tracked totals against a previous run.
+
+    A change for the worse larger than ``tolerance`` (a fraction) is
+    flagged as a regression.
+    """
+    changes = {}
+    for name, higher_is_better in _TRACKED.items():
+        before, after = baseline.get("totals", {}).get(name), results["totals"].get(name)
+        if not before or after is None:
+            continue
+        change = (after - before) / before
+        changes[name] = {
+            "baseline": before,
+            "current": after,
+            "change": round(change, 4),
+            "regression": change < -tolerance if higher_is_better else change > tolerance,
+        }
+    return changes
+
+
+async def run(args: argparse.Namespace) -> dict[str, Any]:
+    timer = StageTimer()
+    instrument(timer)
+    init_db()
+
+    with tempfile.TemporaryDirectory(prefix="ingestion-benchmark-") as corpus_dir:
+        paths = generate_corpus(Path(corpus_dir), args.formats, args.files, int(args.size_mb * 1024 * 1024))
+        corpus_bytes = sum(path.stat().st_size for path in paths)
+
+        with Session(engine) as session:
+            user = User(email=f"benchmark-{uuid.uuid4().hex[:8]}@example.com", hashed_password="-")
+            session.add(user)
+            session.commit()
+            user_id = user.id
+
+        # Counted from here on: setup statements are not part of ingestion
+        timer.round_trips = 0
+        started = time.perf_counter()
+        files = []
+        try:
+            with Session(engine) as session:
+                for path in paths:
+                    files.append(await ingest(session, path, user_id, timer))
+            wall = time.perf_counter() - started
+            round_trips = timer.round_trips
+        finally:
+            if not args.keep:
+                cleanup(user_id)
+            # Workers only count towards RUSAGE_CHILDREN once they are reaped
+            extraction_pool.shutdown(wait=True)
+
+    own_rss, children_rss = peak_rss_mb()
+    chunks = sum(f["chunks"] for f in files)
+    return {
+        "benchmark": "ingestion",
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "version": settings.APP_VERSION,
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "config": {
+            "formats": args.formats,
+            "files_per_format": args.files,
+            "size_mb": args.size_mb,
+            "chunk_size": settings.CHUNK_SIZE,
+            "chunk_overlap": settings.CHUNK_OVERLAP,
+            "chunk_unit": settings.CHUNK_UNIT,
+            "embedding_batch_size": settings.EMBEDDING_BATCH_SIZE,
+            "pipeline_depth": settings.INGESTION_PIPELINE_DEPTH,
+            "chunk_insert_method": settings.CHUNK_INSERT_METHOD,
+            "extraction_workers": settings.EXTRACTION_WORKERS,
+            "vector_dimension": settings.VECTOR_DIMENSION,
+        },
+        "stages": {
+            stage: {"seconds": round(seconds, 4), "calls": timer.calls[stage]}
+            for stage, seconds in sorted(timer.seconds.items())
+        },
+        "totals": {
+            "files": len(files),
+            "bytes": corpus_bytes,
+            "chunks": chunks,
+            "wall_seconds": round(wall, 4),
+            "chunks_per_second": round(chunks / wall, 2) if wall else None,
+            "mb_per_second": round(corpus_bytes / (1024 * 1024) / wall, 3) if wall else None,
+            "db_round_trips": round_trips,
+            "peak_rss_mb": round(own_rss, 1),
+            "peak_rss_extraction_workers_mb": round(children_rss, 1),
+        },
+        "files": files,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--formats", default=",".join(FORMATS), help="Comma separated: txt,md,pdf,docx")
+    parser.add_argument("--files", type=int, default=2, help="Files per format")
+    parser.add_argument("--size-mb", type=float, default=1.0, help="Text per file in MB")
+    parser.add_argument("--collection", default=f"{settings.VECTOR_COLLECTION_NAME}_benchmark")
+    parser.add_argument("--output", help="Write the JSON results to this file instead of stdout")
+    parser.add_argument("--baseline", help="Earlier JSON results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Relative change tolerated before flagging")
+    parser.add_argument("--keep", action="store_true", help="Keep the documents, vectors and files")
+    args = parser.parse_args()
+    args.formats = [f.strip().lower() for f in args.formats.split(",") if f.strip()]
+
+    # Offline, isolated from the real collection and embedding cache
+    settings.EMBEDDING_PROVIDER = "fake"
+    settings.EMBEDDING_CACHE_ENABLED = False
+    settings.VECTOR_STORE_TYPE = "pgvector"
+    settings.VECTOR_COLLECTION_NAME = args.collection
+
+    results = asyncio.run(run(args))
+    if args.baseline:
+        with open(args.baseline) as f:
+            results["comparison"] = compare(results, json.load(f), args.tolerance)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+    else:
+        print(output)
+    if any(change["regression"] for change in results.get("comparison", {}).values()):
+        print("Regressions against baseline: " + ", ".join(
+            name for name, change in results["comparison"].items() if change["regression"]
+        ), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
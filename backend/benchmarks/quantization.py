@@ -0,0 +1,144 @@
+"""Benchmark quantized HNSW indexes against the full-precision index.
+
+Loads synthetic clustered vectors into a temporary vector table, then for
+each quantization builds the HNSW index and reports build time, index
+size, single-client QPS and recall@k against exact NumPy search. Quantized
+indexes are measured at each rescore factor: the search takes
+``k * factor`` candidates through the quantized index and ranks them by
+full-precision distance (factor 1 shows the quantized ranking alone).
+
+Needs PostgreSQL with pgvector >= 0.7 at ``DATABASE_URL``. The table is
+dropped afterwards.
+
+Usage:
+    python -m backend.benchmarks.quantization --vectors 100000 --queries 200 --k 10 \\
+        --modes none,halfvec,binary --rescore-factors 1,4,10
+"""
+import argparse
+import io
+import time
+import uuid
+from typing import List
+import numpy as np
+from sqlmodel import Session
+from backend.core.config import settings
+from backend.core.db import engine
+from backend.crud import vector_crud
+
+
+def make_vectors(n: int, dim: int, queries: int, seed: int = 0) -> tuple[np.ndarray, np.ndarray]:
+    """Clustered vectors, like embeddings of related chunks, and queries near them."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(n // 100, 1), dim)).astype(np.float32)
+    vectors = centers[rng.integers(len(centers), size=n)] + 0.5 * rng.standard_normal((n, dim)).astype(np.float32)
+    picked = vectors[rng.integers(n, size=queries)]
+    return vectors, picked + 0.3 * rng.standard_normal(picked.shape).astype(np.float32)
+
+
+def exact_neighbors(vectors: np.ndarray, queries: np.ndarray, k: int) -> List[set[int]]:
+    """Exact cosine top-k of each query."""
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    truth = []
+    for query in queries:
+        scores = unit @ (query / np.linalg.norm(query))
+        truth.append(set(np.argpartition(-scores, k - 1)[:k].tolist()))
+    return truth
+
+
+def load(session: Session, table: str, vectors: np.ndarray, batch: int = 10000) -> None:
+    """COPY the vectors into the table, ids being their row numbers."""
+    dbapi_connection = session.connection().connection.dbapi_connection
+    for start in range(0, len(vectors), batch):
+        buffer = io.StringIO()
+        for i, vector in enumerate(vectors[start:start + batch], start=start):
+            buffer.write(f"{i}\t1\tchunk {i}\t{{}}\t{vector_crud.vector_literal(vector)}\n")
+        buffer.seek(0)
+        with dbapi_connection.cursor() as cursor:
+            cursor.copy_expert(f"COPY {table} (id, owner_id, content, metadata, embedding) FROM STDIN", buffer)
+        session.commit()
+
+
+def run_queries(
+    session: Session,
+    table: str,
+    queries: np.ndarray,
+    truth: List[set[int]],
+    k: int,
+    ef_search: int,
+    quantization: str,
+    rescore_factor: int,
+) -> tuple[float, float]:
+    """QPS and mean recall@k of one configuration."""
+    hits = 0
+    started = time.perf_counter()
+    for query, expected in zip(queries, truth):
+        rows = vector_crud.search_vectors(
+            session,
+            table,
+            query.tolist(),
+            k,
+            ef_search=ef_search,
+            quantization=quantization,
+            rescore_factor=rescore_factor,
+        )
+        hits += len(expected & {int(row[0]) for row in rows})
+    seconds = time.perf_counter() - started
+    return len(queries) / seconds, hits / (k * len(queries))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--vectors", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=settings.VECTOR_DIMENSION)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--modes", default="none,halfvec,binary", help="Comma-separated quantizations")
+    parser.add_argument("--rescore-factors", default="1,4,10", help="Comma-separated factors for quantized modes")
+    parser.add_argument("--ef-search", type=int, default=settings.PGVECTOR_HNSW_EF_SEARCH)
+    parser.add_argument("--m", type=int, default=settings.PGVECTOR_HNSW_M)
+    parser.add_argument("--ef-construction", type=int, default=settings.PGVECTOR_HNSW_EF_CONSTRUCTION)
+    args = parser.parse_args()
+
+    modes = args.modes.split(",")
+    for mode in modes:
+        if mode not in vector_crud.QUANTIZATIONS:
+            parser.error(f"Unknown quantization: {mode}")
+    factors = [int(value) for value in args.rescore_factors.split(",")]
+
+    vectors, queries = make_vectors(args.vectors, args.dim, args.queries)
+    truth = exact_neighbors(vectors, queries, args.k)
+    table = f"bench_quantization_{uuid.uuid4().hex[:8]}"
+    print(f"{args.vectors} vectors of dim {args.dim}, {args.queries} queries, k {args.k}, "
+          f"ef_search {args.ef_search}, table {table}")
+
+    with Session(engine) as session:
+        try:
+            vector_crud.create_vector_table(session, table, args.dim, ann_index=False)
+            started = time.perf_counter()
+            load(session, table, vectors)
+            print(f"Loaded in {time.perf_counter() - started:.1f}s")
+
+            print(f"{'index':<9}{'rescore':>8}{'build (s)':>11}{'size (MB)':>11}{'QPS':>9}{'recall@k':>10}")
+            baseline_size = None
+            for mode in modes:
+                started = time.perf_counter()
+                vector_crud.create_ann_index(session, table, args.m, args.ef_construction, mode, args.dim)
+                session.commit()
+                build = time.perf_counter() - started
+                size = vector_crud.get_index_size(session, vector_crud.ann_index_name(table, mode)) / (1024 * 1024)
+                baseline_size = baseline_size or (size if mode == "none" else None)
+                relative = f" ({size / baseline_size:.2f}x)" if baseline_size and mode != "none" else ""
+                for factor in factors if mode != "none" else [1]:
+                    qps, recall = run_queries(
+                        session, table, queries, truth, args.k, args.ef_search, mode, factor
+                    )
+                    rescore = f"{factor}x" if mode != "none" else "-"
+                    print(f"{mode:<9}{rescore:>8}{build:>11.1f}{size:>11.1f}{qps:>9.0f}{recall:>10.3f}{relative}")
+                vector_crud.drop_ann_index(session, table, mode)
+        finally:
+            session.rollback()
+            vector_crud.drop_vector_table(session, table)
+
+
+if __name__ == "__main__":
+    main()
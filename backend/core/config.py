@@ -1,4 +1,5 @@
 """Application configuration using Pydantic Settings."""
+from pydantic import field_validator
 from pydantic_settings import BaseSettings
 from typing import Optional
 
@@ -23,10 +24,36 @@ class Settings(BaseSettings):
     VECTOR_STORE_TYPE: str = "pgvector"  # Options: pgvector, milvus
     VECTOR_DIMENSION: int = 1536  # OpenAI embedding dimension
     VECTOR_COLLECTION_NAME: str = "document_embeddings"
+    # pgvector layout: langchain (LangChain PGVector collection) or table (app-managed table named after
+    # the collection, typed owner/document columns; run backend.scripts.migrate_vectors migrate first)
+    PGVECTOR_SCHEMA: str = "langchain"
+    PGVECTOR_PARTITION_BY_OWNER: bool = False  # List-partition a new vector table by owner
+    PGVECTOR_HNSW_M: int = 16  # HNSW graph degree
+    PGVECTOR_HNSW_EF_CONSTRUCTION: int = 64  # HNSW build candidate list size
+    PGVECTOR_HNSW_EF_SEARCH: int = 40  # HNSW query candidate list size
+    PGVECTOR_ITERATIVE_SCAN: str = ""  # pgvector >= 0.8: relaxed_order or strict_order for filtered queries
+    PGVECTOR_QUANTIZATION: str = "none"  # HNSW index over none, halfvec or binary vectors (rescored on full vectors)
+    PGVECTOR_RESCORE_FACTOR: int = 4  # Quantized index candidates per result (binary needs more, e.g. 10)
+    PGVECTOR_ASYNC_SEARCH: bool = True  # Async searches on the shared psycopg pool instead of executor threads
+    PGVECTOR_PREPARED_QUERIES: bool = False  # Prepare similarity queries (needs a direct connection, session pooling or PgBouncer >= 1.21)
+    PGVECTOR_SEARCH_TIMEOUT_MS: int = 0  # statement_timeout of async similarity queries (0 = server default)
     
     # Embedding
     EMBEDDING_MODEL: str = "text-embedding-3-small"  # OpenAI model
-    EMBEDDING_PROVIDER: str = "openai"  # Options: openai, local
+    EMBEDDING_PROVIDER: str = "openai"  # Options: openai, local, fake (deterministic, offline)
+    LOCAL_EMBEDDING_MODEL_PATH: str = ""  # Model directory for the local provider
+    LOCAL_EMBEDDING_BATCH_SIZE: int = 32  # Texts per local inference call
+    LOCAL_EMBEDDING_MAX_WAIT_MS: float = 5.0  # Time a query waits to be batched with concurrent ones
+    LOCAL_EMBEDDING_WORKERS: int = 0  # Inference threads, 0 = number of CPU cores
+    EMBEDDING_CACHE_ENABLED: bool = True  # Persist document embeddings in Postgres keyed by text hash
+    
+    # Chunking
+    CHUNK_SIZE: int = 500  # Same size as before the span chunker; try 128 with CHUNK_UNIT=tokens
+    CHUNK_OVERLAP: int = 50
+    CHUNK_UNIT: str = "chars"  # Options: chars, tokens (embedding tokenizer; slower, opt-in)
+    CHUNK_TOKENIZER_ENCODING: str = "cl100k_base"  # tiktoken encoding of the embedding model
+    # Per-collection overrides, e.g. {"legal_docs": {"chunk_size": 256, "chunk_overlap": 32}}
+    CHUNKING_OVERRIDES: dict[str, dict[str, int | str]] = {}
     
     # LLM
     LLM_MODEL: str = "gpt-4o-mini"
@@ -56,10 +83,78 @@ class Settings(BaseSettings):
     }
     
     # File Storage
-    STORAGE_TYPE: str = "local"  # Options: local, s3
+    STORAGE_TYPE: str = "local"  # Options: local (S3 is not supported yet)
     UPLOAD_DIR: str = "./data/uploads"
     MAX_UPLOAD_SIZE: int = 1000 * 1024 * 1024  # 1000MB
+    UPLOAD_BLOCK_SIZE: int = 1024 * 1024  # 1MB blocks when streaming uploads to storage
     ALLOWED_EXTENSIONS: list[str] = [".pdf", ".docx", ".txt", ".md"]
+    BULK_UPLOAD_MAX_SIZE: int = 20 * 1024 * 1024 * 1024  # 20GB per bulk request, compressed and decompressed (files are still limited individually)
+    BULK_UPLOAD_MAX_FILES: int = 10000  # Documents per bulk request, archive members included
+    ARCHIVE_MAX_COMPRESSION_RATIO: int = 100  # Archives decompressing to more than this times their size are rejected (0: off)
+
+    # Ingestion
+    INGESTION_WORKERS: int = 2  # Concurrent ingestion jobs per app process
+    INGESTION_POLL_INTERVAL: float = 5.0  # Seconds between queue polls when idle
+    INGESTION_JOB_LEASE_SECONDS: int = 600  # Processing jobs without a heartbeat for this long are requeued
+    INGESTION_MAX_ATTEMPTS: int = 3  # Attempts per job; failed attempts resume from the last stored batch
+    INGESTION_RETRY_BACKOFF_SECONDS: float = 30.0  # Delay before the first retry, doubled on each further attempt
+    INGESTION_RETRY_BACKOFF_MAX_SECONDS: float = 600.0  # Upper bound of the retry delay
+    INGESTION_PIPELINE_DEPTH: int = 2  # Embedded batches in flight per document while streaming
+    CHUNK_INSERT_METHOD: str = "copy"  # Options: copy (PostgreSQL COPY), executemany
+    EXTRACTION_WORKERS: int = 0  # Extraction worker processes, 0 = number of CPU cores
+    EXTRACTION_PAGES_PER_TASK: int = 20  # PDF pages parsed per worker task
+    EXTRACTION_TIMEOUT_SECONDS: float = 300.0  # Time limit for extracting one document
+    EXTRACTION_MEMORY_LIMIT_MB: int = 2048  # Address space limit per extraction worker, 0 = unlimited
+    EMBEDDING_BATCH_SIZE: int = 100  # Chunks per embedding request
+    EMBEDDING_MAX_CONCURRENCY: int = 4  # Concurrent embedding requests per app process
+    EMBEDDING_MIN_CONCURRENCY: int = 1  # Floor when backing off from rate limits
+    EMBEDDING_MAX_RETRIES: int = 5  # Retries per failed batch
+    EMBEDDING_RETRY_BASE_DELAY: float = 1.0  # Seconds, doubled on each retry
+
+    # Deletion
+    BULK_DELETE_MAX_DOCUMENTS: int = 10000  # Documents per bulk delete request
+    VECTOR_GC_INTERVAL: float = 300.0  # Seconds between garbage collection passes when idle
+    VECTOR_GC_BATCH_SIZE: int = 500  # Deleted documents purged (and vector ids deleted) per statement
+    VECTOR_GC_MAX_ORPHANS: int = 10000  # Unreferenced vectors inspected per pass
+    RETRIEVAL_MAX_FETCH_K: int = 100  # Candidates fetched at most when deleted documents crowd out results
+    RETRIEVAL_MODE: str = "vector"  # vector, lexical, or hybrid (lexical + vector by reciprocal rank fusion); lexical/hybrid need python -m backend.scripts.migrate_db
+    RETRIEVAL_HYBRID_CANDIDATES: int = 20  # Candidates taken from each side before fusion
+    RETRIEVAL_RRF_K: int = 60  # Reciprocal rank fusion constant; higher flattens the rank weighting
+    RETRIEVAL_EMBEDDING_TIMEOUT_SECONDS: float = 3.0  # Hybrid search falls back to lexical results after this
+    RETRIEVAL_ROUTER_ENABLED: bool = True  # Skip retrieval for small talk and reformatting follow-ups
+    RETRIEVAL_ROUTER_MODEL: str = ""  # Small model scoring short ambiguous messages (empty = rules only)
+    RETRIEVAL_ROUTER_PROVIDER: str = ""  # Provider of the scoring model (empty = LLM_PROVIDER)
+    RETRIEVAL_ROUTER_THRESHOLD: float = 0.5  # Scores below this skip retrieval
+    RETRIEVAL_ROUTER_MAX_SCORED_WORDS: int = 12  # Longer messages always retrieve
+    RETRIEVAL_ROUTER_TIMEOUT_SECONDS: float = 1.0  # Retrieve if scoring takes longer
+    RETRIEVAL_MULTI_QUERY_ENABLED: bool = False  # Split compound questions and search the parts concurrently
+    RETRIEVAL_MULTI_QUERY_MAX: int = 4  # Most sub-queries per question
+    RETRIEVAL_MULTI_QUERY_MAX_RESULTS: int = 10  # Most fused results of a multi-query retrieval
+    RETRIEVAL_MULTI_QUERY_MODEL: str = ""  # Model splitting questions the rules can't (empty = rules only)
+    RETRIEVAL_MULTI_QUERY_PROVIDER: str = ""  # Provider of the splitting model (empty = LLM_PROVIDER)
+    RETRIEVAL_MULTI_QUERY_MIN_WORDS: int = 8  # Shorter questions are not sent to the splitting model
+    RETRIEVAL_MULTI_QUERY_TIMEOUT_SECONDS: float = 2.0  # Search the question as is if splitting takes longer
+    RETRIEVAL_DIVERSIFY: bool = False  # Re-rank results by MMR and drop near-duplicate chunks (pgvector)
+    RETRIEVAL_DIVERSITY_CANDIDATES: int = 20  # Candidates searched before reducing them to k
+    RETRIEVAL_MMR_LAMBDA: float = 0.7  # Relevance weight against diversity (1 = relevance order only)
+    RETRIEVAL_DUPLICATE_THRESHOLD: float = 0.95  # Cosine similarity from which chunks are near duplicates (0 = off)
+    LEXICAL_SEARCH_MODE: str = "fulltext"  # fulltext (tsvector) or ngram (pg_trgm, for Korean/CJK text)
+    LEXICAL_FULLTEXT_CONFIG: str = "simple"  # PostgreSQL text search configuration for fulltext mode
+    LEXICAL_NGRAM_THRESHOLD: float = 0.3  # Minimum pg_trgm word similarity for ngram mode
+    SEARCH_PLANNER_ENABLED: bool = True  # Pick skip / exact scan / ANN per owner from corpus statistics
+    SEARCH_EXACT_MAX_CHUNKS: int = 5000  # Owners with at most this many chunks get an exact NumPy scan (pgvector)
+    SEARCH_MATRIX_DIR: str = "./data/search_matrices"  # Memory-mapped per-owner vector matrices for exact scans
+    SEARCH_PLANNER_MAX_OWNERS: int = 1024  # Owners whose matrices are kept in memory
+
+    # Retrieval cache
+    RETRIEVAL_CACHE_ENABLED: bool = True  # Cache results per owner; invalidated when the owner's documents change
+    RETRIEVAL_CACHE_MAX_ENTRIES: int = 1024  # Least recently used results are evicted beyond this
+    RETRIEVAL_CACHE_TTL_SECONDS: float = 300.0  # Lifetime of a cached result
+
+    # Query embeddings
+    QUERY_EMBEDDING_CACHE_SIZE: int = 4096  # Query vectors memoized in memory (0 disables)
+    QUERY_EMBEDDING_BATCH_SIZE: int = 64  # Concurrent queries embedded in one provider call at most
+    QUERY_EMBEDDING_MAX_WAIT_MS: float = 5.0  # How long a query waits for others to batch with
 
     # Milvus (optional)
     MILVUS_HOST: str = "localhost"
@@ -70,7 +165,7 @@ class Settings(BaseSettings):
     MILVUS_CONSISTENCY_LEVEL: str = "Session"
     MILVUS_SECURE: bool = False
     
-    # S3 (if STORAGE_TYPE is s3)
+    # S3 (reserved: S3 storage is not implemented yet)
     AWS_ACCESS_KEY_ID: Optional[str] = None
     AWS_SECRET_ACCESS_KEY: Optional[str] = None
     AWS_REGION: Optional[str] = None
@@ -96,10 +191,19 @@ class Settings(BaseSettings):
     POSTGRES_USER: str = "postgres"
     POSTGRES_PASSWORD: str = "postgres"
     POSTGRES_DB: str = "rag_agent"
-    POSTGRES_POOL_SIZE: int = 5
+    POSTGRES_POOL_SIZE: int = 10  # Shared async pool: checkpointer and async vector search
     PROJECT_NAME: str = "LangChain LangGraph Agent"
     CHECKPOINT_TABLES: list[str] = ["checkpoints", "checkpoint_blobs"]
     
+    @field_validator("STORAGE_TYPE")
+    @classmethod
+    def _check_storage_type(cls, value: str) -> str:
+        # Uploads are streamed to and extracted from local paths; fail at startup
+        # rather than on the first upload
+        if value != "local":
+            raise ValueError(f"STORAGE_TYPE={value!r} is not supported; only 'local' storage is implemented")
+        return value
+    
     class Config:
         env_file = ".env"
         case_sensitive = True
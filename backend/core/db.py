@@ -1,6 +1,13 @@
 """Database connection and session management."""
+import asyncio
+import re
+from typing import Optional
+from urllib.parse import quote_plus
+from psycopg_pool import AsyncConnectionPool
 from sqlmodel import SQLModel, create_engine, Session
 from backend.core.config import settings
+from backend.core.logging import logger
+from backend.core.migrations import INDEXES, add_missing_columns, missing_indexes
 
 # Create engine
 engine = create_engine(
@@ -13,8 +20,67 @@ engine = create_engine(
 
 
 def init_db():
-    """Initialize database - create all tables."""
+    """Initialize database - create all tables, and the vector table with ``PGVECTOR_SCHEMA=table``.
+
+    Columns added to existing tables since they were created are added too.
+    Indexes that would have to read a whole table (those of added columns
+    and the lexical search index) are left to
+    ``python -m backend.scripts.migrate_db``; missing ones are logged.
+    """
     SQLModel.metadata.create_all(engine)
+    add_missing_columns(engine)
+    indexes = list(INDEXES)
+    if settings.RETRIEVAL_MODE != "vector":
+        from backend.crud.search_crud import create_lexical_extension, lexical_indexes
+        with Session(engine) as session:
+            create_lexical_extension(session)
+        indexes += lexical_indexes()
+    missing = missing_indexes(engine, indexes)
+    if missing:
+        logger.warning(
+            f"Missing indexes {', '.join(missing)}; build them with python -m backend.scripts.migrate_db"
+        )
+    if settings.VECTOR_STORE_TYPE == "pgvector" and settings.PGVECTOR_SCHEMA == "table":
+        _init_vector_table()
+
+
+def _init_vector_table() -> None:
+    """Create the app-managed vector table and check that the collection was migrated to it.
+
+    Raises:
+        RuntimeError: If the table is empty while the LangChain collection still
+            holds vectors, which would make every search come back empty
+    """
+    from backend.crud import vector_crud
+
+    table = vector_crud.vector_table_name(settings.VECTOR_COLLECTION_NAME)
+    with Session(engine) as session:
+        # The HNSW index comes with a new (empty) table; existing tables keep theirs
+        vector_crud.create_vector_table(
+            session,
+            table,
+            settings.VECTOR_DIMENSION,
+            partitioned=settings.PGVECTOR_PARTITION_BY_OWNER,
+            hnsw_m=settings.PGVECTOR_HNSW_M,
+            hnsw_ef_construction=settings.PGVECTOR_HNSW_EF_CONSTRUCTION,
+            quantization=settings.PGVECTOR_QUANTIZATION,
+        )
+        if not vector_crud.table_has_vectors(session, table) and vector_crud.collection_has_vectors(
+            session, settings.VECTOR_COLLECTION_NAME
+        ):
+            raise RuntimeError(
+                f"PGVECTOR_SCHEMA=table but vector table '{table}' is empty while the LangChain collection "
+                f"'{settings.VECTOR_COLLECTION_NAME}' holds vectors; run "
+                f"python -m backend.scripts.migrate_vectors migrate first, or set PGVECTOR_SCHEMA=langchain"
+            )
+        # A missing quantized index is reported by ChunkVectorStore, which then searches without it
+        if settings.PGVECTOR_QUANTIZATION == "none" and (
+            vector_crud.get_index_size(session, vector_crud.ann_index_name(table)) is None
+        ):
+            logger.warning(
+                f"Vector table '{table}' has no HNSW index; build it with "
+                f"python -m backend.scripts.migrate_vectors quantize --to none"
+            )
 
 
 def get_session():
@@ -23,4 +89,46 @@ def get_session():
         yield session
 
 
+# Shared async pool: LangGraph checkpointer and native async vector search
+_async_pool: Optional[AsyncConnectionPool] = None
+_async_pool_lock = asyncio.Lock()
+
+
+def _psycopg_conninfo() -> str:
+    """Connection URL for psycopg, without a SQLAlchemy driver suffix."""
+    if settings.DATABASE_URL:
+        return re.sub(r"^postgresql\+\w+://", "postgresql://", settings.DATABASE_URL)
+    return (
+        "postgresql://"
+        f"{quote_plus(settings.POSTGRES_USER)}:{quote_plus(settings.POSTGRES_PASSWORD)}"
+        f"@{settings.POSTGRES_HOST}:{settings.POSTGRES_PORT}/{settings.POSTGRES_DB}"
+    )
+
+
+async def get_async_pool() -> AsyncConnectionPool:
+    """Get the process-wide async psycopg connection pool, opening it on first use."""
+    global _async_pool
+    if _async_pool is None:
+        async with _async_pool_lock:
+            if _async_pool is None:
+                pool = AsyncConnectionPool(
+                    _psycopg_conninfo(),
+                    open=False,
+                    max_size=settings.POSTGRES_POOL_SIZE,
+                    kwargs={
+                        "autocommit": True,
+                        "connect_timeout": 5,
+                        # No automatic preparing (PgBouncer safe); queries opt in with prepare=True
+                        "prepare_threshold": None,
+                    },
+                )
+                await pool.open()
+                _async_pool = pool
+    return _async_pool
+
 
+async def close_async_pool() -> None:
+    global _async_pool
+    if _async_pool is not None:
+        await _async_pool.close()
+        _async_pool = None
@@ -1,6 +1,7 @@
 """LangGraph agent implementation with RAG support."""
+import asyncio
+import time
 from typing import AsyncGenerator, Optional, List
-from urllib.parse import quote_plus
 
 from asgiref.sync import sync_to_async
 from langchain_core.messages import (
@@ -32,6 +33,7 @@ from backend.core.config import (
     is_provider_enabled,
     get_available_models_for_provider,
 )
+from backend.core.db import get_async_pool
 from backend.core.langgraph.state import GraphState
 from backend.core.langgraph.tools import tools
 from backend.core.langgraph.utils import (
@@ -40,7 +42,10 @@ from backend.core.langgraph.utils import (
     load_system_prompt,
 )
 from backend.core.logging import logger
+from backend.core.metrics import RETRIEVAL_MULTI_QUERY
 from backend.models.chat import Message
+from backend.services.query_decomposition import decomposition_prompt, parse_sub_queries, split_query
+from backend.services.retrieval_router import SKIP, parse_score, retrieval_router, scoring_prompt
 
 
 class LangGraphAgent:
@@ -69,43 +74,99 @@ class LangGraphAgent:
         )
 
     async def _get_connection_pool(self) -> AsyncConnectionPool:
-        """Get a PostgreSQL connection pool for checkpointing.
+        """Get the PostgreSQL connection pool for checkpointing.
+
+        This is the app's shared async pool, also used by vector search.
 
         Returns:
             AsyncConnectionPool: A connection pool for PostgreSQL database.
         """
         if self._connection_pool is None:
             try:
-                max_size = settings.POSTGRES_POOL_SIZE
-
-                # Use DATABASE_URL if available, otherwise construct from individual settings
-                # This ensures consistency with the main database connection
-                if settings.DATABASE_URL:
-                    connection_url = settings.DATABASE_URL
-                else:
-                    connection_url = (
-                        "postgresql://"
-                        f"{quote_plus(settings.POSTGRES_USER)}:{quote_plus(settings.POSTGRES_PASSWORD)}"
-                        f"@{settings.POSTGRES_HOST}:{settings.POSTGRES_PORT}/{settings.POSTGRES_DB}"
-                    )
-
-                self._connection_pool = AsyncConnectionPool(
-                    connection_url,
-                    open=False,
-                    max_size=max_size,
-                    kwargs={
-                        "autocommit": True,
-                        "connect_timeout": 5,
-                        "prepare_threshold": None,
-                    },
-                )
-                await self._connection_pool.open()
-                logger.info(f"Connection pool created with max_size={max_size} using DATABASE_URL")
+                self._connection_pool = await get_async_pool()
             except Exception as e:
                 logger.error(f"Connection pool creation failed: {str(e)}")
                 raise e
         return self._connection_pool
 
+    async def _route(self, state: GraphState, config: RunnableConfig) -> Command:
+        """Decide whether the turn needs document retrieval.
+
+        Args:
+            state: Current graph state
+            config: Runnable config
+
+        Returns:
+            Command routing to retrieve, or straight to chat without documents
+        """
+        last_message = state["messages"][-1]
+        query = last_message.content if isinstance(last_message.content, str) else str(last_message.content)
+        has_answer = any(isinstance(message, AIMessage) for message in state["messages"][:-1])
+        scorer = self._score_retrieval_need if settings.RETRIEVAL_ROUTER_MODEL else None
+        decision = await retrieval_router.route(query, has_answer=has_answer, scorer=scorer)
+
+        session_id = config.get("configurable", {}).get("thread_id", "unknown")
+        logger.info(
+            f"Retrieval route for session {session_id}: {decision.route} ({decision.reason}"
+            + (f", score {decision.score:.2f})" if decision.score is not None else ")")
+        )
+        if decision.route == SKIP:
+            return Command(update={"retrieved_documents": [], "retrieval_skipped": decision.reason}, goto="chat")
+        return Command(update={"retrieval_skipped": None}, goto="retrieve")
+
+    async def _score_retrieval_need(self, query: str) -> Optional[float]:
+        """Ask the router model how likely ``query`` needs the user's documents."""
+        llm = self._get_llm_for_provider_and_model(
+            settings.RETRIEVAL_ROUTER_PROVIDER or None,
+            settings.RETRIEVAL_ROUTER_MODEL,
+        )
+        # nostream: keep the score out of streamed responses
+        response = await llm.ainvoke([HumanMessage(content=scoring_prompt(query))], config={"tags": ["nostream"]})
+        content = process_llm_response(response).content
+        return parse_score(content if isinstance(content, str) else str(content))
+
+    async def _decompose_query(self, query: str) -> List[str]:
+        """Split a compound question into sub-queries for a multi-query retrieval.
+
+        Rules split first; the splitting model, if configured, gets questions
+        of at least ``RETRIEVAL_MULTI_QUERY_MIN_WORDS`` words the rules leave
+        whole.
+
+        Returns:
+            The sub-queries, or an empty list to search the question as is
+        """
+        max_queries = settings.RETRIEVAL_MULTI_QUERY_MAX
+        sub_queries = split_query(query, max_queries)
+        source = "rules"
+        if (
+            len(sub_queries) < 2
+            and settings.RETRIEVAL_MULTI_QUERY_MODEL
+            and len(query.split()) >= settings.RETRIEVAL_MULTI_QUERY_MIN_WORDS
+        ):
+            try:
+                llm = self._get_llm_for_provider_and_model(
+                    settings.RETRIEVAL_MULTI_QUERY_PROVIDER or None,
+                    settings.RETRIEVAL_MULTI_QUERY_MODEL,
+                )
+                # nostream: keep the sub-queries out of streamed responses
+                response = await asyncio.wait_for(
+                    llm.ainvoke(
+                        [HumanMessage(content=decomposition_prompt(query, max_queries))],
+                        config={"tags": ["nostream"]},
+                    ),
+                    timeout=settings.RETRIEVAL_MULTI_QUERY_TIMEOUT_SECONDS,
+                )
+            except Exception as e:
+                logger.warning(f"Query decomposition failed, searching the question as is: {e!r}")
+                return []
+            content = process_llm_response(response).content
+            sub_queries = parse_sub_queries(content if isinstance(content, str) else str(content), max_queries)
+            source = "model"
+        if len(sub_queries) < 2:
+            return []
+        RETRIEVAL_MULTI_QUERY.labels(source=source).inc()
+        return sub_queries
+
     async def _retrieve_documents(self, state: GraphState, config: RunnableConfig) -> Command:
         """Retrieve relevant documents using RAG tool.
         
@@ -123,14 +184,23 @@ class LangGraphAgent:
         query = last_message.content if hasattr(last_message, "content") else str(last_message)
         
         try:
+            started = time.perf_counter()
+            # Compound questions: search their parts concurrently in this one step
+            sub_queries = await self._decompose_query(query) if settings.RETRIEVAL_MULTI_QUERY_ENABLED else []
+            
             # Use retrieve_documents tool
             retrieve_tool = self.tools_by_name["retrieve_documents"]
             retrieved_docs = await retrieve_tool.ainvoke({
                 "query": query,
+                "sub_queries": sub_queries,
                 "user_id": user_id,
                 "k": 5,
+                "mmr_lambda": state.get("mmr_lambda"),
+                "duplicate_threshold": state.get("duplicate_threshold"),
             })
             
+            retrieval_router.record_retrieval(time.perf_counter() - started)
+            
             session_id = config.get("configurable", {}).get("thread_id", "unknown")
             logger.info(f"Retrieved {len(retrieved_docs)} documents for session {session_id}")
             
@@ -281,11 +351,20 @@ class LangGraphAgent:
         """
         outputs = []
         last_message = state["messages"][-1]
+        update = {}
         
         for tool_call in last_message.tool_calls:
             tool_name = tool_call["name"]
             tool_args = tool_call["args"]
             
+            if tool_name == "retrieve_documents" and tool_args.get("sub_queries"):
+                RETRIEVAL_MULTI_QUERY.labels(source="tool").inc()
+            
+            # The router skipped retrieval, but the model needed documents after all
+            if tool_name == "retrieve_documents" and state.get("retrieval_skipped") and "retrieval_skipped" not in update:
+                retrieval_router.record_false_skip(state["retrieval_skipped"])
+                update["retrieval_skipped"] = None
+            
             # Add user_id to tool args if available
             if "user_id" not in tool_args and state.get("user_id"):
                 tool_args["user_id"] = state["user_id"]
@@ -309,7 +388,7 @@ class LangGraphAgent:
                     )
                 )
         
-        return Command(update={"messages": outputs}, goto="chat")
+        return Command(update={**update, "messages": outputs}, goto="chat")
 
     async def create_graph(self) -> CompiledStateGraph:
         """Create and configure the LangGraph workflow.
@@ -326,8 +405,12 @@ class LangGraphAgent:
                 graph_builder.add_node("chat", self._chat, ends=["tool_call", END])
                 graph_builder.add_node("tool_call", self._tool_call, ends=["chat"])
                 
-                # Set entry point
-                graph_builder.set_entry_point("retrieve")
+                # Set entry point: the router skips retrieval for turns that don't need it
+                if settings.RETRIEVAL_ROUTER_ENABLED:
+                    graph_builder.add_node("route", self._route, ends=["retrieve", "chat"])
+                    graph_builder.set_entry_point("route")
+                else:
+                    graph_builder.set_entry_point("retrieve")
                 
                 # Add edges
                 graph_builder.add_edge("retrieve", "chat")
@@ -356,6 +439,8 @@ class LangGraphAgent:
         user_id: Optional[int] = None,
         provider: Optional[str] = None,
         model: Optional[str] = None,
+        mmr_lambda: Optional[float] = None,
+        duplicate_threshold: Optional[float] = None,
     ) -> dict:
         """Get a response from the LLM.
 
@@ -363,6 +448,8 @@ class LangGraphAgent:
             messages: The messages to send to the LLM
             session_id: The session ID for checkpointing
             user_id: Optional user ID for filtering documents
+            mmr_lambda: Optional MMR relevance weight for retrieval
+            duplicate_threshold: Optional near-duplicate cutoff for retrieval
 
         Returns:
             dict: Response with answer and sources
@@ -398,6 +485,8 @@ class LangGraphAgent:
                     "retrieved_documents": None,
                     "provider": provider_name,
                     "model": model_name,
+                    "mmr_lambda": mmr_lambda,
+                    "duplicate_threshold": duplicate_threshold,
                 },
                 config=config,
             )
@@ -434,6 +523,8 @@ class LangGraphAgent:
         user_id: Optional[int] = None,
         provider: Optional[str] = None,
         model: Optional[str] = None,
+        mmr_lambda: Optional[float] = None,
+        duplicate_threshold: Optional[float] = None,
     ) -> AsyncGenerator[str, None]:
         """Get a stream response from the LLM.
 
@@ -441,6 +532,8 @@ class LangGraphAgent:
             messages: The messages to send to the LLM
             session_id: The session ID for the conversation
             user_id: Optional user ID for filtering documents
+            mmr_lambda: Optional MMR relevance weight for retrieval
+            duplicate_threshold: Optional near-duplicate cutoff for retrieval
 
         Yields:
             str: Tokens of the LLM response
@@ -478,6 +571,8 @@ class LangGraphAgent:
                     "retrieved_documents": None,
                     "provider": provider_name,
                     "model": model_name,
+                    "mmr_lambda": mmr_lambda,
+                    "duplicate_threshold": duplicate_threshold,
                 },
                 config,
                 stream_mode="messages",
@@ -14,10 +14,16 @@ class GraphState(TypedDict):
         retrieved_documents: Retrieved documents from RAG
         provider: Optional provider name to use for this conversation
         model: Optional model name to use for this conversation
+        mmr_lambda: Optional MMR relevance weight for retrieval
+        duplicate_threshold: Optional near-duplicate cutoff for retrieval
+        retrieval_skipped: Why the router skipped retrieval for this turn, if it did
     """
     messages: Annotated[Sequence[BaseMessage], add]
     user_id: int | None
     retrieved_documents: list[dict] | None
     provider: str | None
     model: str | None
+    mmr_lambda: float | None
+    duplicate_threshold: float | None
+    retrieval_skipped: str | None
 
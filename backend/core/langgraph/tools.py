@@ -2,28 +2,53 @@
 from typing import Optional
 from langchain_core.tools import tool
 from langchain_core.documents import Document
+from backend.core.config import settings
 from backend.services.langchain_agent import get_retriever
+from backend.services.query_decomposition import dedupe_queries
+from backend.services.retrieval import multi_query_retrieve
 from backend.core.logging import logger
 
 
 @tool
-async def retrieve_documents(query: str, user_id: Optional[int] = None, k: int = 5) -> list[dict]:
+async def retrieve_documents(
+    query: str,
+    user_id: Optional[int] = None,
+    k: int = 5,
+    mmr_lambda: Optional[float] = None,
+    duplicate_threshold: Optional[float] = None,
+    sub_queries: Optional[list[str]] = None,
+) -> list[dict]:
     """Retrieve relevant documents from the vector store based on the query.
     
     This tool searches the vector store for documents that are relevant to the user's query.
     It filters documents by user_id if provided to ensure users only see their own documents.
+    For a question with several parts, pass the parts as sub_queries: they are searched
+    together in one call.
     
     Args:
         query: The search query string
         user_id: Optional user ID to filter documents by owner
         k: Number of documents to retrieve (default: 5)
+        mmr_lambda: Optional relevance weight against diversity, between 0 and 1
+        duplicate_threshold: Optional similarity from which chunks are left out as near duplicates
+        sub_queries: Optional self-contained queries for the parts of the question
     
     Returns:
         List of dictionaries containing document content and metadata
     """
     try:
-        retriever = get_retriever(k=k, user_id=user_id)
-        documents = await retriever.ainvoke(query)
+        retriever = get_retriever(
+            k=k,
+            user_id=user_id,
+            mmr_lambda=mmr_lambda,
+            duplicate_threshold=duplicate_threshold,
+        )
+        queries = dedupe_queries([query, *(sub_queries or [])], settings.RETRIEVAL_MULTI_QUERY_MAX + 1)
+        if len(queries) > 1:
+            limit = max(k, min(k * len(queries), settings.RETRIEVAL_MULTI_QUERY_MAX_RESULTS))
+            documents = await multi_query_retrieve(retriever, queries, limit, rrf_k=settings.RETRIEVAL_RRF_K)
+        else:
+            documents = await retriever.ainvoke(query)
         
         results = []
         for doc in documents:
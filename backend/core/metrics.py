@@ -1,8 +1,99 @@
 """Prometheus metrics configuration."""
+from prometheus_client import Counter, Gauge
 from prometheus_fastapi_instrumentator import Instrumentator
 from fastapi import FastAPI
 
 
+# Embedding cache
+EMBEDDING_CACHE_HITS = Counter(
+    "embedding_cache_hits_total",
+    "Chunk texts whose embedding was served from the embedding cache",
+)
+EMBEDDING_CACHE_MISSES = Counter(
+    "embedding_cache_misses_total",
+    "Chunk texts that had to be embedded by the provider",
+)
+
+# Embedding scheduler
+EMBEDDED_CHUNKS = Counter(
+    "embedding_chunks_total",
+    "Chunk texts embedded by the ingestion embedding scheduler",
+)
+EMBEDDING_RATE_LIMITED = Counter(
+    "embedding_rate_limited_total",
+    "Embedding batches rejected by the provider with a rate limit",
+)
+EMBEDDING_CONCURRENCY_LIMIT = Gauge(
+    "embedding_concurrency_limit",
+    "Current adaptive limit on concurrent embedding batches",
+)
+
+# Retrieval
+RETRIEVAL_CACHE_HITS = Counter(
+    "retrieval_cache_hits_total",
+    "Retrievals served from the retrieval result cache",
+)
+RETRIEVAL_CACHE_MISSES = Counter(
+    "retrieval_cache_misses_total",
+    "Retrievals that had to search the vector store",
+)
+RETRIEVAL_CACHE_SAVED_SECONDS = Counter(
+    "retrieval_cache_saved_seconds_total",
+    "Search time saved by retrieval cache hits, estimated from the original search",
+)
+RETRIEVAL_LEXICAL_ONLY = Counter(
+    "retrieval_lexical_only_total",
+    "Hybrid retrievals answered from the lexical index alone",
+    ["reason"],
+)
+RETRIEVAL_DUPLICATES_DROPPED = Counter(
+    "retrieval_duplicates_dropped_total",
+    "Retrieval candidates dropped as near duplicates of returned chunks",
+)
+RETRIEVAL_ROUTE_DECISIONS = Counter(
+    "retrieval_route_decisions_total",
+    "Chat turns by whether the retrieval router sent them to retrieval",
+    ["route", "reason"],
+)
+RETRIEVAL_ROUTE_FALSE_SKIPS = Counter(
+    "retrieval_route_false_skips_total",
+    "Chat turns that skipped retrieval but had the model call the retrieval tool",
+    ["reason"],
+)
+RETRIEVAL_ROUTE_SAVED_SECONDS = Counter(
+    "retrieval_route_saved_seconds_total",
+    "Retrieval time saved by skipped turns, estimated from the average retrieval",
+)
+RETRIEVAL_MULTI_QUERY = Counter(
+    "retrieval_multi_query_total",
+    "Retrievals fanned out over several sub-queries, by where the sub-queries came from",
+    ["source"],
+)
+RETRIEVAL_SUB_QUERIES = Counter(
+    "retrieval_sub_queries_total",
+    "Queries searched concurrently by multi-query retrievals",
+)
+SEARCH_PLANS = Counter(
+    "retrieval_search_plans_total",
+    "Vector searches by the strategy the search planner chose",
+    ["strategy"],
+)
+
+# Query embeddings
+QUERY_EMBEDDING_CACHE_HITS = Counter(
+    "query_embedding_cache_hits_total",
+    "Query embeddings served from the in-memory query vector cache",
+)
+QUERY_EMBEDDING_CACHE_MISSES = Counter(
+    "query_embedding_cache_misses_total",
+    "Query embeddings not found in the in-memory query vector cache",
+)
+QUERY_EMBEDDING_BATCHES = Counter(
+    "query_embedding_batches_total",
+    "Batched query embedding requests sent to the provider",
+)
+
+
 def setup_metrics(app: FastAPI):
     """Setup Prometheus metrics for the FastAPI application.
     
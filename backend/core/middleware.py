@@ -1,8 +1,10 @@
 """Custom middleware for FastAPI."""
 import time
 import uuid
-from fastapi import Request
+from fastapi import Request, status
+from fastapi.responses import JSONResponse
 from starlette.middleware.base import BaseHTTPMiddleware
+from backend.core.config import settings
 from backend.core.logging import logger, structured_logger
 
 
@@ -73,3 +75,32 @@ class LoggingMiddleware(BaseHTTPMiddleware):
 
 
 
+
+
+class UploadSizeLimitMiddleware(BaseHTTPMiddleware):
+    """Reject oversized uploads from their Content-Length before the body is read."""
+    
+    UPLOAD_PATH_PREFIX = "/api/v1/upload"
+    BULK_UPLOAD_PATH = "/api/v1/upload/bulk"
+    REINDEX_PATH_SUFFIX = "/reindex"  # POST /api/v1/docs/{id}/reindex accepts a new file
+    # Allowance for multipart boundaries and form field headers
+    MULTIPART_OVERHEAD = 64 * 1024
+    
+    async def dispatch(self, request: Request, call_next):
+        path = request.url.path
+        if request.method == "POST" and (
+            path.startswith(self.UPLOAD_PATH_PREFIX) or path.endswith(self.REINDEX_PATH_SUFFIX)
+        ):
+            content_length = request.headers.get("content-length")
+            max_size = settings.BULK_UPLOAD_MAX_SIZE if path.startswith(self.BULK_UPLOAD_PATH) else settings.MAX_UPLOAD_SIZE
+            limit = max_size + self.MULTIPART_OVERHEAD
+            if content_length and content_length.isdigit() and int(content_length) > limit:
+                logger.warning(
+                    f"Rejected upload to {request.url.path}: Content-Length {content_length} exceeds {limit}"
+                )
+                return JSONResponse(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    content={"detail": f"Upload size exceeds maximum {max_size} bytes"},
+                )
+        
+        return await call_next(request)
@@ -0,0 +1,92 @@
+"""Idempotent schema upgrades for databases created by an earlier version.
+
+``SQLModel.metadata.create_all`` only creates missing tables; it never adds
+columns or indexes to a table that already exists. Columns added to existing
+models are listed here and added by ``init_db`` at startup (adding a column
+with a constant default only touches the catalog). Their indexes can take
+long on large tables, so they are built with ``CREATE INDEX CONCURRENTLY`` by
+``python -m backend.scripts.migrate_db`` instead of at startup.
+
+Every statement is safe to run again.
+"""
+from typing import List, Sequence
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from backend.core.logging import logger
+
+# (table, column, definition) of columns added to existing tables
+COLUMNS: List[tuple[str, str, str]] = [
+    # Upload deduplication
+    ("document", "content_hash", "VARCHAR"),
+    ("document", "canonical_document_id", "INTEGER REFERENCES document (id)"),
+    ("document", "ref_count", "INTEGER NOT NULL DEFAULT 1"),
+    # Tombstones purged by the vector GC
+    ("document", "deleted_at", "TIMESTAMP WITHOUT TIME ZONE"),
+    # Incremental re-indexing; older chunks without a hash are hashed by the database
+    ("documentchunk", "chunk_hash", "VARCHAR"),
+    # Retry backoff of ingestion jobs
+    ("ingestionjob", "available_at", "TIMESTAMP WITHOUT TIME ZONE"),
+    # Search planner statistics, counted when the corpus version is bumped
+    ("corpusversion", "chunks", "INTEGER"),
+]
+
+# (name, table, definition) of indexes on existing tables; names match the ones
+# create_all gives new databases, so an index is never built twice
+INDEXES: List[tuple[str, str, str]] = [
+    ("ix_document_content_hash", "document", "(content_hash)"),
+    ("ix_document_deleted_at", "document", "(deleted_at)"),
+    # Set-based chunk deletes by document
+    ("ix_documentchunk_document_id", "documentchunk", "(document_id)"),
+    # Vector GC lookups of chunks by vector store id
+    ("ix_documentchunk_embedding_id", "documentchunk", "(embedding_id)"),
+]
+
+
+def add_missing_columns(engine: Engine) -> None:
+    """Add the columns of ``COLUMNS`` that the database doesn't have yet."""
+    with engine.begin() as connection:
+        for table, column, definition in COLUMNS:
+            connection.execute(text(
+                f"ALTER TABLE IF EXISTS {table} ADD COLUMN IF NOT EXISTS {column} {definition}"
+            ))
+
+
+def missing_indexes(engine: Engine, indexes: Sequence[tuple[str, str, str]] = INDEXES) -> List[str]:
+    """Names of the given indexes that don't exist or are invalid (an interrupted concurrent build)."""
+    with engine.connect() as connection:
+        valid = set(connection.execute(text(
+            """
+            SELECT c.relname
+            FROM pg_index i
+            JOIN pg_class c ON c.oid = i.indexrelid
+            WHERE c.relname = ANY(:names) AND i.indisvalid
+            """
+        ), {"names": [name for name, _, _ in indexes]}).scalars())
+    return [name for name, _, _ in indexes if name not in valid]
+
+
+def create_indexes_concurrently(
+    engine: Engine,
+    indexes: Sequence[tuple[str, str, str]] = INDEXES,
+) -> List[str]:
+    """Build missing indexes without blocking writes to their tables.
+
+    An invalid index left by an interrupted build is dropped and rebuilt.
+
+    Returns:
+        Names of the indexes built
+    """
+    missing = set(missing_indexes(engine, indexes))
+    built = []
+    # CONCURRENTLY cannot run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        for name, table, definition in indexes:
+            if name not in missing:
+                continue
+            if connection.execute(text("SELECT to_regclass(:table)"), {"table": table}).scalar() is None:
+                continue  # Created with its indexes when the app first starts
+            connection.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+            connection.execute(text(f"CREATE INDEX CONCURRENTLY {name} ON {table} {definition}"))
+            built.append(name)
+            logger.info(f"Built index {name}")
+    return built
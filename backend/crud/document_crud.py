@@ -1,7 +1,14 @@
 """Document CRUD operations."""
+import io
+from sqlalchemy import delete, func, insert, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlmodel import Session, select
-from typing import Optional, List
+from typing import Optional, List, Sequence
+from datetime import datetime
+from backend.core.config import settings
 from backend.models.document import Document, DocumentChunk, DocumentCreate, DocumentUpdate
+from backend.models.ingestion import IngestionJob
+from backend.models.retrieval import CorpusVersion
 
 
 def create_document(session: Session, document_create: DocumentCreate, owner_id: int, storage_path: str) -> Document:
@@ -17,14 +24,101 @@ def create_document(session: Session, document_create: DocumentCreate, owner_id:
     return document
 
 
-def get_document_by_id(session: Session, document_id: int) -> Optional[Document]:
-    """Get document by ID."""
-    return session.get(Document, document_id)
+def create_document_reference(
+    session: Session,
+    document_create: DocumentCreate,
+    owner_id: int,
+    canonical: Document,
+) -> Document:
+    """Create a document that shares the chunks and embeddings of ``canonical``.
+    
+    The new document is immediately ``completed`` and the canonical
+    document's reference count is incremented in the same transaction.
+    """
+    document = Document(
+        **document_create.model_dump(),
+        owner_id=owner_id,
+        storage_path=canonical.storage_path,
+        canonical_document_id=canonical.id,
+        status="completed",
+        processed_at=datetime.utcnow(),
+    )
+    session.add(document)
+    session.execute(
+        update(Document)
+        .where(Document.id == canonical.id)
+        .values(ref_count=Document.ref_count + 1)
+    )
+    session.commit()
+    session.refresh(document)
+    return document
+
+
+def get_indexed_document_by_hash(session: Session, owner_id: int, content_hash: str) -> Optional[Document]:
+    """Get the owner's already-indexed canonical document with the given content hash."""
+    statement = (
+        select(Document)
+        .where(Document.owner_id == owner_id)
+        .where(Document.content_hash == content_hash)
+        .where(Document.status == "completed")
+        .where(Document.canonical_document_id.is_(None))
+        .where(Document.deleted_at.is_(None))
+        .order_by(Document.id)
+        .limit(1)
+    )
+    return session.exec(statement).first()
+
+
+def get_indexed_documents_by_hashes(session: Session, owner_id: int, content_hashes: List[str]) -> dict[str, Document]:
+    """Get the owner's already-indexed canonical documents for many content hashes at once."""
+    if not content_hashes:
+        return {}
+    statement = (
+        select(Document)
+        .where(Document.owner_id == owner_id)
+        .where(Document.content_hash.in_(content_hashes))
+        .where(Document.status == "completed")
+        .where(Document.canonical_document_id.is_(None))
+        .where(Document.deleted_at.is_(None))
+        .order_by(Document.id.desc())
+    )
+    # Oldest document wins, like get_indexed_document_by_hash
+    return {document.content_hash: document for document in session.exec(statement).all()}
+
+
+def get_document_by_id(session: Session, document_id: int, include_deleted: bool = False) -> Optional[Document]:
+    """Get document by ID.
+    
+    Args:
+        include_deleted: Also return tombstoned documents awaiting purge
+    """
+    document = session.get(Document, document_id)
+    if document and document.deleted_at is not None and not include_deleted:
+        return None
+    return document
+
+
+def get_documents_by_ids(session: Session, document_ids: List[int]) -> List[Document]:
+    """Get live (not tombstoned) documents by IDs in one query."""
+    if not document_ids:
+        return []
+    statement = (
+        select(Document)
+        .where(Document.id.in_(document_ids))
+        .where(Document.deleted_at.is_(None))
+    )
+    return list(session.exec(statement).all())
 
 
 def get_documents_by_owner(session: Session, owner_id: int, skip: int = 0, limit: int = 100) -> List[Document]:
     """Get documents by owner."""
-    statement = select(Document).where(Document.owner_id == owner_id).offset(skip).limit(limit)
+    statement = (
+        select(Document)
+        .where(Document.owner_id == owner_id)
+        .where(Document.deleted_at.is_(None))
+        .offset(skip)
+        .limit(limit)
+    )
     return list(session.exec(statement).all())
 
 
@@ -44,36 +138,482 @@ def update_document(session: Session, document_id: int, document_update: Documen
     return document
 
 
-def delete_document(session: Session, document_id: int) -> bool:
-    """Delete document and all associated chunks."""
+def delete_document(session: Session, document_id: int, commit: bool = True) -> bool:
+    """Delete document and all associated chunks.
+    
+    Args:
+        commit: Commit right away; False leaves the delete in the caller's transaction
+    """
     document = session.get(Document, document_id)
     if not document:
         return False
     
     # Delete all associated DocumentChunk records first
     # This is necessary because document_id has a NOT NULL constraint
-    chunks_statement = select(DocumentChunk).where(DocumentChunk.document_id == document_id)
-    chunks = session.exec(chunks_statement).all()
-    for chunk in chunks:
-        session.delete(chunk)
+    session.execute(delete(DocumentChunk).where(DocumentChunk.document_id == document_id))
+    
+    # Delete ingestion jobs that reference the document
+    session.execute(delete(IngestionJob).where(IngestionJob.document_id == document_id))
     
     # Now delete the document
     session.delete(document)
-    session.commit()
+    if commit:
+        session.commit()
+    else:
+        session.flush()
     return True
 
 
-def update_document_status(session: Session, document_id: int, status: str) -> Optional[Document]:
-    """Update document processing status."""
+def tombstone_documents(session: Session, document_ids: List[int], commit: bool = True) -> int:
+    """Mark documents as deleted and cancel their pending ingestion jobs.
+    
+    Tombstoned documents disappear from every lookup immediately; their
+    vectors, chunks and files are purged later by the vector GC.
+    
+    Args:
+        commit: Commit right away; False leaves the updates in the caller's transaction
+    
+    Returns:
+        Number of documents tombstoned
+    """
+    if not document_ids:
+        return 0
+    result = session.execute(
+        update(Document)
+        .where(Document.id.in_(document_ids))
+        .where(Document.deleted_at.is_(None))
+        .values(deleted_at=datetime.utcnow(), status="deleted")
+    )
+    session.execute(
+        update(IngestionJob)
+        .where(IngestionJob.document_id.in_(document_ids))
+        .where(IngestionJob.status == "pending")
+        .values(status="failed", error="Document deleted", finished_at=datetime.utcnow())
+    )
+    if commit:
+        session.commit()
+    return result.rowcount
+
+
+def claim_tombstoned_documents(session: Session, limit: int) -> List[Document]:
+    """Lock a batch of tombstoned documents for purging.
+    
+    Documents whose ingestion job is still running are left for a later
+    pass. ``SKIP LOCKED`` lets several app processes purge concurrently;
+    the locks are held until the caller commits.
+    """
+    running_job = (
+        select(IngestionJob.id)
+        .where(IngestionJob.document_id == Document.id)
+        .where(IngestionJob.status == "processing")
+    )
+    statement = (
+        select(Document)
+        .where(Document.deleted_at.is_not(None))
+        .where(~running_job.exists())
+        .order_by(Document.deleted_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    return list(session.exec(statement).all())
+
+
+def purge_documents(session: Session, document_ids: List[int]) -> None:
+    """Delete documents with their chunks and jobs using set-based statements."""
+    if not document_ids:
+        return
+    session.execute(delete(DocumentChunk).where(DocumentChunk.document_id.in_(document_ids)))
+    session.execute(delete(IngestionJob).where(IngestionJob.document_id.in_(document_ids)))
+    session.execute(delete(Document).where(Document.id.in_(document_ids)))
+    session.commit()
+
+
+def get_live_embedding_ids(session: Session, embedding_ids: List[str]) -> set[str]:
+    """Filter vector store ids down to those backed by a chunk of a live document."""
+    if not embedding_ids:
+        return set()
+    statement = (
+        select(DocumentChunk.embedding_id)
+        .join(Document, Document.id == DocumentChunk.document_id)
+        .where(DocumentChunk.embedding_id.in_(embedding_ids))
+        .where(Document.deleted_at.is_(None))
+    )
+    return set(session.exec(statement).all())
+
+
+def get_corpus_version(session: Session, owner_id: int) -> tuple[int, Optional[int]]:
+    """Get the version counter of an owner's searchable documents.
+    
+    Returns:
+        (version, chunks of live documents as of that version); an owner whose
+        version was never bumped has (0, 0), a row from before chunk counting
+        has a count of None
+    """
+    row = session.exec(
+        select(CorpusVersion.version, CorpusVersion.chunks).where(CorpusVersion.owner_id == owner_id)
+    ).first()
+    return (row[0], row[1]) if row else (0, 0)
+
+
+def bump_corpus_version(session: Session, owner_id: int, commit: bool = True) -> None:
+    """Increment an owner's corpus version, invalidating their cached retrieval results.
+    
+    Also records the owner's live chunk count for the search planner, so
+    queries don't have to count them.
+    
+    Args:
+        commit: Commit right away; False leaves the bump in the caller's transaction
+    """
+    now = datetime.utcnow()
+    chunks = (
+        select(func.count(DocumentChunk.id))
+        .join(Document, Document.id == DocumentChunk.document_id)
+        .where(Document.owner_id == owner_id)
+        .where(Document.deleted_at.is_(None))
+        .scalar_subquery()
+    )
+    statement = pg_insert(CorpusVersion).values(owner_id=owner_id, version=1, chunks=chunks, updated_at=now)
+    statement = statement.on_conflict_do_update(
+        index_elements=[CorpusVersion.owner_id],
+        set_={"version": CorpusVersion.version + 1, "chunks": statement.excluded.chunks, "updated_at": now},
+    )
+    session.execute(statement)
+    if commit:
+        session.commit()
+
+
+def release_document_reference(session: Session, canonical_id: int, commit: bool = True) -> int:
+    """Decrement the reference count of a canonical document.
+    
+    Args:
+        commit: Commit right away; False leaves the update in the caller's transaction
+    
+    Returns:
+        Remaining reference count
+    """
+    remaining = session.execute(
+        update(Document)
+        .where(Document.id == canonical_id)
+        .values(ref_count=Document.ref_count - 1)
+        .returning(Document.ref_count)
+    ).scalar_one()
+    if commit:
+        session.commit()
+    return remaining
+
+
+def promote_document_reference(
+    session: Session,
+    canonical: Document,
+    commit: bool = True,
+) -> Optional[Document]:
+    """Hand the chunks of ``canonical`` over to its oldest referencing document.
+    
+    Used before deleting a canonical document that other documents still
+    point to. The successor becomes the new canonical document, owns the
+    chunks and inherits the remaining reference count. Vector store entries
+    keep their ids, so nothing has to be re-embedded.
+    
+    Args:
+        commit: Commit right away; False leaves the handover in the caller's transaction
+    
+    Returns:
+        The promoted document, or None if no document references ``canonical``
+    """
+    statement = (
+        select(Document)
+        .where(Document.canonical_document_id == canonical.id)
+        .order_by(Document.id)
+        .limit(1)
+    )
+    successor = session.exec(statement).first()
+    if not successor:
+        return None
+    
+    session.execute(
+        update(DocumentChunk)
+        .where(DocumentChunk.document_id == canonical.id)
+        .values(document_id=successor.id)
+    )
+    session.execute(
+        update(Document)
+        .where(Document.canonical_document_id == canonical.id)
+        .where(Document.id != successor.id)
+        .values(canonical_document_id=successor.id)
+    )
+    successor.canonical_document_id = None
+    successor.ref_count = canonical.ref_count - 1
+    session.add(successor)
+    if commit:
+        session.commit()
+        session.refresh(successor)
+    else:
+        session.flush()
+    return successor
+
+
+# Columns written by insert_document_chunks, in COPY order
+CHUNK_COLUMNS = ("document_id", "chunk_text", "chunk_index", "chunk_meta", "chunk_hash", "embedding_id", "created_at")
+# SQLAlchemy drivers insert_document_chunks can COPY with
+COPY_DRIVERS = ("psycopg2", "psycopg")
+
+
+def insert_document_chunks(
+    session: Session,
+    rows: Sequence[dict],
+    method: Optional[str] = None,
+    commit: bool = True,
+) -> int:
+    """Bulk insert chunk rows and commit them.
+    
+    Rows bypass the ORM unit of work: with ``method="copy"`` they are streamed
+    with PostgreSQL ``COPY ... FROM STDIN`` on the session's connection,
+    otherwise inserted with one batched executemany. COPY works with both
+    psycopg2 and psycopg 3 (a plain ``postgresql://`` URL selects psycopg2
+    up to SQLAlchemy 2.0 and psycopg 3 from 2.1); other drivers fall back to
+    executemany.
+    
+    Args:
+        rows: Dicts keyed by ``CHUNK_COLUMNS``; ``created_at`` defaults to now
+        method: "copy" or "executemany" (default: ``settings.CHUNK_INSERT_METHOD``)
+        commit: Commit right away; False leaves the rows in the caller's transaction
+    
+    Returns:
+        Number of inserted rows
+    """
+    if not rows:
+        return 0
+    
+    now = datetime.utcnow()
+    rows = [{**row, "created_at": row.get("created_at") or now} for row in rows]
+    method = method or settings.CHUNK_INSERT_METHOD
+    if method == "copy" and session.get_bind().dialect.driver in COPY_DRIVERS:
+        _copy_chunks(session, rows)
+    else:
+        session.execute(insert(DocumentChunk), rows)
+    if commit:
+        session.commit()
+    return len(rows)
+
+
+def _copy_value(value) -> str:
+    """Encode a value for COPY text format."""
+    if value is None:
+        return "\\N"
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+def _copy_chunks(session: Session, rows: Sequence[dict]) -> None:
+    """Stream rows into the chunk table with COPY inside the session's transaction."""
+    statement = f"COPY {DocumentChunk.__tablename__} ({', '.join(CHUNK_COLUMNS)}) FROM STDIN"
+    dbapi_connection = session.connection().connection.dbapi_connection
+    with dbapi_connection.cursor() as cursor:
+        if hasattr(cursor, "copy_expert"):
+            # psycopg2: COPY text format from a buffer
+            buffer = io.StringIO()
+            for row in rows:
+                buffer.write("\t".join(_copy_value(row.get(column)) for column in CHUNK_COLUMNS))
+                buffer.write("\n")
+            buffer.seek(0)
+            cursor.copy_expert(statement, buffer)
+        else:
+            # psycopg 3: the driver encodes the rows
+            with cursor.copy(statement) as copy:
+                for row in rows:
+                    copy.write_row([row.get(column) for column in CHUNK_COLUMNS])
+
+
+def delete_document_chunks(session: Session, document_id: int, after_id: Optional[int] = None) -> int:
+    """Delete all chunks of a document in one statement.
+    
+    Args:
+        after_id: Only delete chunks with a higher id (inserted later)
+    
+    Returns:
+        Number of deleted chunks
+    """
+    statement = delete(DocumentChunk).where(DocumentChunk.document_id == document_id)
+    if after_id is not None:
+        statement = statement.where(DocumentChunk.id > after_id)
+    result = session.execute(statement)
+    session.commit()
+    return result.rowcount
+
+
+def detach_document(session: Session, document: Document) -> Document:
+    """Stop ``document`` from sharing chunks with other documents.
+    
+    An alias drops its reference to the canonical document; a canonical
+    document still referenced by others hands its chunks to a successor.
+    Either way the document is left without chunks, ready to be indexed.
+    """
+    if document.canonical_document_id is not None:
+        release_document_reference(session, document.canonical_document_id)
+    elif document.ref_count > 1:
+        promote_document_reference(session, document)
+    
+    document.canonical_document_id = None
+    document.ref_count = 1
+    session.add(document)
+    session.commit()
+    session.refresh(document)
+    return document
+
+
+def get_chunk_fingerprints(session: Session, document_id: int) -> List[tuple[int, str, Optional[str]]]:
+    """Get (id, chunk_hash, embedding_id) of all chunks of a document.
+    
+    Chunks stored before hashes were recorded are hashed by the database,
+    so chunk texts are not loaded.
+    """
+    chunk_hash = func.coalesce(
+        DocumentChunk.chunk_hash,
+        func.encode(func.sha256(func.convert_to(DocumentChunk.chunk_text, "UTF8")), "hex"),
+    )
+    statement = (
+        select(DocumentChunk.id, chunk_hash, DocumentChunk.embedding_id)
+        .where(DocumentChunk.document_id == document_id)
+    )
+    return [tuple(row) for row in session.exec(statement).all()]
+
+
+def get_chunk_summary(session: Session, document_id: int) -> tuple[int, int]:
+    """Get the number of chunk rows of a document and the highest chunk index (-1 if none)."""
+    statement = (
+        select(func.count(DocumentChunk.id), func.coalesce(func.max(DocumentChunk.chunk_index), -1))
+        .where(DocumentChunk.document_id == document_id)
+    )
+    count, last_index = session.exec(statement).one()
+    return count, last_index
+
+
+def get_chunk_hash(session: Session, document_id: int, chunk_index: int) -> Optional[str]:
+    """Get the text hash of the chunk at a position of a document."""
+    statement = (
+        select(DocumentChunk.chunk_hash)
+        .where(DocumentChunk.document_id == document_id)
+        .where(DocumentChunk.chunk_index == chunk_index)
+        .limit(1)
+    )
+    return session.exec(statement).first()
+
+
+def update_chunk_positions(session: Session, positions: List[dict]) -> None:
+    """Bulk update ``chunk_index``/``chunk_meta``/``chunk_hash`` of chunks by id.
+    
+    Args:
+        positions: Dicts with ``id`` and the columns to set
+    """
+    if positions:
+        session.execute(update(DocumentChunk), positions)
+    session.commit()
+
+
+def delete_chunks_by_ids(session: Session, chunk_ids: List[int]) -> int:
+    """Delete chunks by primary key.
+    
+    Returns:
+        Number of deleted chunks
+    """
+    if not chunk_ids:
+        return 0
+    result = session.execute(delete(DocumentChunk).where(DocumentChunk.id.in_(chunk_ids)))
+    session.commit()
+    return result.rowcount
+
+
+def update_document_content(
+    session: Session,
+    document_id: int,
+    storage_path: str,
+    file_size: int,
+    content_hash: str,
+    mime_type: Optional[str] = None,
+) -> Optional[Document]:
+    """Point a document at a new version of its file."""
     document = session.get(Document, document_id)
     if not document:
         return None
     
-    document.status = status
+    document.storage_path = storage_path
+    document.file_size = file_size
+    document.content_hash = content_hash
+    if mime_type:
+        document.mime_type = mime_type
+    document.updated_at = datetime.utcnow()
     session.add(document)
     session.commit()
     session.refresh(document)
     return document
 
 
+def get_embedding_ids_for_documents(session: Session, document_ids: List[int]) -> List[str]:
+    """Get vector store ids of all chunks of many documents in one query."""
+    if not document_ids:
+        return []
+    statement = (
+        select(DocumentChunk.embedding_id)
+        .where(DocumentChunk.document_id.in_(document_ids))
+        .where(DocumentChunk.embedding_id.is_not(None))
+    )
+    return list(session.exec(statement).all())
+
+
+def get_chunk_embedding_ids(session: Session, document_id: int, after_id: Optional[int] = None) -> List[str]:
+    """Get vector store ids of all chunks of a document.
+    
+    Args:
+        after_id: Only include chunks with a higher id (inserted later)
+    """
+    statement = (
+        select(DocumentChunk.embedding_id)
+        .where(DocumentChunk.document_id == document_id)
+        .where(DocumentChunk.embedding_id.is_not(None))
+    )
+    if after_id is not None:
+        statement = statement.where(DocumentChunk.id > after_id)
+    return list(session.exec(statement).all())
+
+
+def update_document_status(
+    session: Session,
+    document_id: int,
+    status: str,
+    processed_at: Optional[datetime] = None,
+) -> Optional[Document]:
+    """Update document processing status.
+    
+    The update is conditional on the document not being tombstoned, so an
+    ingestion job finishing after the document was deleted can't overwrite
+    its "deleted" status.
+    
+    Args:
+        processed_at: Also set the processing time
+    
+    Returns:
+        The updated document, or None if it doesn't exist or is tombstoned
+    """
+    values = {"status": status}
+    if processed_at is not None:
+        values["processed_at"] = processed_at
+    result = session.execute(
+        update(Document)
+        .where(Document.id == document_id)
+        .where(Document.deleted_at.is_(None))
+        .values(**values)
+    )
+    session.commit()
+    if not result.rowcount:
+        return None
+    return session.get(Document, document_id)
+
+
 
@@ -0,0 +1,277 @@
+"""Ingestion job CRUD operations."""
+import json
+from sqlalchemy import func, or_, update
+from sqlmodel import Session, select
+from typing import List, Optional
+from datetime import datetime, timedelta
+from backend.models.document import Document, DocumentCreate
+from backend.models.ingestion import IngestionBatch, IngestionJob
+
+
+def create_job(session: Session, document_id: int, kind: str = "index") -> IngestionJob:
+    """Create a pending ingestion job for a document."""
+    job = IngestionJob(document_id=document_id, kind=kind)
+    session.add(job)
+    session.commit()
+    session.refresh(job)
+    return job
+
+
+def get_job_by_id(session: Session, job_id: int) -> Optional[IngestionJob]:
+    """Get ingestion job by ID."""
+    return session.get(IngestionJob, job_id)
+
+
+def get_latest_job_for_document(session: Session, document_id: int) -> Optional[IngestionJob]:
+    """Get the most recent ingestion job for a document."""
+    statement = (
+        select(IngestionJob)
+        .where(IngestionJob.document_id == document_id)
+        .order_by(IngestionJob.id.desc())
+        .limit(1)
+    )
+    return session.exec(statement).first()
+
+
+def claim_next_job(session: Session) -> Optional[IngestionJob]:
+    """Atomically claim the oldest pending job that is due.
+
+    Uses ``FOR UPDATE SKIP LOCKED`` so several app processes can poll the
+    same table without handing out a job twice. Jobs waiting out a retry
+    backoff (``available_at`` in the future) are skipped.
+    """
+    now = datetime.utcnow()
+    statement = (
+        select(IngestionJob)
+        .where(IngestionJob.status == "pending")
+        .where(or_(IngestionJob.available_at.is_(None), IngestionJob.available_at <= now))
+        .order_by(IngestionJob.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    )
+    job = session.exec(statement).first()
+    if not job:
+        session.rollback()
+        return None
+
+    job.status = "processing"
+    job.attempts += 1
+    job.error = None
+    job.started_at = now
+    job.updated_at = now
+    session.add(job)
+    session.commit()
+    session.refresh(job)
+    return job
+
+
+def update_job_progress(
+    session: Session,
+    job_id: int,
+    chunks_embedded: int,
+    chunks_total: Optional[int] = None,
+    chunks_committed: Optional[int] = None,
+    checkpoint_page: Optional[int] = None,
+    checkpoint_page_chunk: int = 0,
+) -> Optional[IngestionJob]:
+    """Record embedding progress; also acts as the job heartbeat.
+
+    Commits the session, so chunk rows added to it before the call are
+    committed together with the checkpoint.
+
+    Args:
+        chunks_committed: New checkpoint: number of chunks stored so far
+        checkpoint_page: Page of the last stored chunk
+        checkpoint_page_chunk: Index of the first chunk on ``checkpoint_page``
+    """
+    job = session.get(IngestionJob, job_id)
+    if not job:
+        return None
+
+    job.chunks_embedded = chunks_embedded
+    if chunks_total is not None:
+        job.chunks_total = chunks_total
+    if chunks_committed is not None:
+        job.chunks_committed = chunks_committed
+        job.checkpoint_page = checkpoint_page
+        job.checkpoint_page_chunk = checkpoint_page_chunk
+    job.updated_at = datetime.utcnow()
+    session.add(job)
+    session.commit()
+    session.refresh(job)
+    return job
+
+
+def finish_job(session: Session, job_id: int, status: str, error: Optional[str] = None) -> Optional[IngestionJob]:
+    """Mark a job as completed or failed."""
+    job = session.get(IngestionJob, job_id)
+    if not job:
+        return None
+
+    now = datetime.utcnow()
+    job.status = status
+    job.error = error
+    job.finished_at = now
+    job.updated_at = now
+    session.add(job)
+    session.commit()
+    session.refresh(job)
+    return job
+
+
+def retry_job(
+    session: Session,
+    job_id: int,
+    error: str,
+    delay_seconds: float = 0,
+) -> Optional[IngestionJob]:
+    """Return a failed job to the queue; its checkpoint is kept for resuming.
+
+    Args:
+        delay_seconds: Backoff before the job can be claimed again
+    """
+    job = session.get(IngestionJob, job_id)
+    if not job:
+        return None
+
+    now = datetime.utcnow()
+    job.status = "pending"
+    job.error = error
+    job.available_at = now + timedelta(seconds=delay_seconds)
+    job.updated_at = now
+    session.add(job)
+    document = session.get(Document, job.document_id)
+    if document:
+        document.status = "pending"
+        session.add(document)
+    session.commit()
+    session.refresh(job)
+    return job
+
+
+def clear_job_checkpoint(session: Session, job_id: int) -> None:
+    """Forget a job's checkpoint, e.g. after its chunks were discarded."""
+    job = session.get(IngestionJob, job_id)
+    if not job:
+        return
+    job.chunks_committed = 0
+    job.checkpoint_page = None
+    job.checkpoint_page_chunk = 0
+    session.add(job)
+    session.commit()
+
+
+def requeue_stale_jobs(session: Session, lease_seconds: int, max_attempts: int) -> List[IngestionJob]:
+    """Return abandoned processing jobs to the queue.
+
+    A job whose heartbeat (``updated_at``) is older than the lease belonged to
+    a worker that crashed or was killed. It is requeued, or failed once it has
+    used up ``max_attempts``.
+
+    Returns:
+        The jobs that were requeued or failed
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=lease_seconds)
+    statement = (
+        select(IngestionJob)
+        .where(IngestionJob.status == "processing")
+        .where(IngestionJob.updated_at < cutoff)
+        .with_for_update(skip_locked=True)
+    )
+    jobs = session.exec(statement).all()
+    for job in jobs:
+        if job.attempts >= max_attempts:
+            job.status = "failed"
+            job.error = "Job abandoned by worker too many times"
+            job.finished_at = datetime.utcnow()
+        else:
+            job.status = "pending"
+        job.updated_at = datetime.utcnow()
+        session.add(job)
+
+        # Keep the document status in step with its job
+        document = session.get(Document, job.document_id)
+        if document:
+            # A failed re-index leaves the previous index in place
+            document.status = "completed" if job.kind == "reindex" and job.status == "failed" else job.status
+            session.add(document)
+    session.commit()
+    return list(jobs)
+
+
+def create_batch(
+    session: Session,
+    owner_id: int,
+    documents: List[tuple[DocumentCreate, str]],
+    canonicals: dict[str, Document],
+    skipped: Optional[List[dict]] = None,
+) -> IngestionBatch:
+    """Create a bulk upload batch with its documents and jobs in one transaction.
+    
+    Args:
+        documents: (document data, storage path) of every stored file
+        canonicals: Already-indexed documents by content hash; matching files
+            become references to them instead of being processed
+        skipped: Files that were not stored, as {"filename", "reason"}
+    """
+    batch = IngestionBatch(
+        owner_id=owner_id,
+        documents_total=len(documents),
+        skipped_files=json.dumps(skipped) if skipped else None,
+    )
+    session.add(batch)
+    session.flush()
+    
+    to_process = []
+    for document_create, storage_path in documents:
+        canonical = canonicals.get(document_create.content_hash)
+        if canonical:
+            document = Document(
+                **document_create.model_dump(),
+                owner_id=owner_id,
+                storage_path=canonical.storage_path,
+                canonical_document_id=canonical.id,
+                status="completed",
+                processed_at=datetime.utcnow(),
+            )
+            session.execute(
+                update(Document)
+                .where(Document.id == canonical.id)
+                .values(ref_count=Document.ref_count + 1)
+            )
+            batch.documents_deduplicated += 1
+        else:
+            document = Document(**document_create.model_dump(), owner_id=owner_id, storage_path=storage_path)
+            to_process.append(document)
+        session.add(document)
+    session.flush()
+    
+    session.add_all(IngestionJob(document_id=document.id, batch_id=batch.id) for document in to_process)
+    session.add(batch)
+    session.commit()
+    session.refresh(batch)
+    return batch
+
+
+def get_batch_by_id(session: Session, batch_id: int) -> Optional[IngestionBatch]:
+    """Get ingestion batch by ID."""
+    return session.get(IngestionBatch, batch_id)
+
+
+def get_batch_job_stats(session: Session, batch_id: int) -> dict[str, tuple[int, int, int]]:
+    """Aggregate the jobs of a batch in one query.
+    
+    Returns:
+        {job status: (jobs, chunks_embedded, chunks_total)}
+    """
+    statement = (
+        select(
+            IngestionJob.status,
+            func.count(IngestionJob.id),
+            func.coalesce(func.sum(IngestionJob.chunks_embedded), 0),
+            func.coalesce(func.sum(IngestionJob.chunks_total), 0),
+        )
+        .where(IngestionJob.batch_id == batch_id)
+        .group_by(IngestionJob.status)
+    )
+    return {status: (count, embedded, total) for status, count, embedded, total in session.exec(statement).all()}
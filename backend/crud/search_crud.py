@@ -0,0 +1,101 @@
+"""Lexical search over document chunks."""
+import re
+from typing import List, Optional
+from sqlalchemy import func, literal_column, text
+from sqlmodel import Session, select
+from backend.core.config import settings
+from backend.models.document import Document, DocumentChunk
+
+_TOKEN_RE = re.compile(r"\w+")
+_CONFIG_RE = re.compile(r"^\w+$")
+
+
+def _fulltext_config() -> str:
+    config = settings.LEXICAL_FULLTEXT_CONFIG
+    if not _CONFIG_RE.match(config):
+        raise ValueError(f"Invalid full-text search configuration: {config}")
+    return config
+
+
+def _chunk_tsvector():
+    # Inlined as a constant so the planner matches the expression index
+    return func.to_tsvector(literal_column(f"'{_fulltext_config()}'::regconfig"), DocumentChunk.chunk_text)
+
+
+def lexical_indexes() -> List[tuple[str, str, str]]:
+    """The index used by ``LEXICAL_SEARCH_MODE``, as (name, table, definition).
+    
+    ``fulltext`` uses a GIN index over the chunk text's ``tsvector``;
+    ``ngram`` uses a ``pg_trgm`` trigram GIN index, which also matches
+    inflected and unsegmented words (Korean, CJK). Building either reads
+    every chunk, so it is left to ``python -m backend.scripts.migrate_db``,
+    which builds it with ``CREATE INDEX CONCURRENTLY``.
+    """
+    if settings.LEXICAL_SEARCH_MODE == "fulltext":
+        config = _fulltext_config()
+        return [(
+            f"ix_documentchunk_chunk_text_fts_{config}",
+            "documentchunk",
+            f"USING gin (to_tsvector('{config}'::regconfig, chunk_text))",
+        )]
+    if settings.LEXICAL_SEARCH_MODE == "ngram":
+        return [("ix_documentchunk_chunk_text_trgm", "documentchunk", "USING gin (chunk_text gin_trgm_ops)")]
+    raise ValueError(f"Unsupported lexical search mode: {settings.LEXICAL_SEARCH_MODE}")
+
+
+def create_lexical_extension(session: Session) -> None:
+    """Create the extension ``LEXICAL_SEARCH_MODE`` needs, if any (``pg_trgm`` for ``ngram``)."""
+    if settings.LEXICAL_SEARCH_MODE == "ngram":
+        session.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        session.commit()
+
+
+def search_chunks(
+    session: Session,
+    query: str,
+    limit: int,
+    owner_id: Optional[int] = None,
+) -> List[tuple[DocumentChunk, Document, float]]:
+    """Find chunks of live documents matching a query, best first.
+    
+    In ``fulltext`` mode a chunk matches if it contains any query term and
+    is ranked by term density (``ts_rank_cd``); in ``ngram`` mode it matches
+    if part of its text is trigram-similar to the query (``word_similarity``).
+    
+    Args:
+        query: Search text; only its word characters are used
+        limit: Maximum number of chunks
+        owner_id: Only search documents of this owner
+    
+    Returns:
+        (chunk, document, score) tuples
+    """
+    terms = _TOKEN_RE.findall(query.lower())
+    if not terms:
+        return []
+    
+    if settings.LEXICAL_SEARCH_MODE == "ngram":
+        normalized = " ".join(terms)
+        session.execute(
+            text("SELECT set_config('pg_trgm.word_similarity_threshold', :threshold, true)"),
+            {"threshold": str(settings.LEXICAL_NGRAM_THRESHOLD)},
+        )
+        score = func.word_similarity(normalized, DocumentChunk.chunk_text)
+        # chunk_text %> query: word_similarity(query, chunk_text) above the threshold
+        condition = DocumentChunk.chunk_text.bool_op("%>")(normalized)
+    else:
+        tsquery = func.to_tsquery(literal_column(f"'{_fulltext_config()}'::regconfig"), " | ".join(terms))
+        score = func.ts_rank_cd(_chunk_tsvector(), tsquery)
+        condition = _chunk_tsvector().bool_op("@@")(tsquery)
+    
+    statement = (
+        select(DocumentChunk, Document, score.label("score"))
+        .join(Document, Document.id == DocumentChunk.document_id)
+        .where(Document.deleted_at.is_(None))
+        .where(condition)
+        .order_by(score.desc(), DocumentChunk.id)
+        .limit(limit)
+    )
+    if owner_id is not None:
+        statement = statement.where(Document.owner_id == owner_id)
+    return [(chunk, document, float(rank)) for chunk, document, rank in session.exec(statement).all()]
@@ -0,0 +1,693 @@
+"""Queries against the pgvector tables.
+
+With ``PGVECTOR_SCHEMA=table`` vectors live in an app-managed table named
+after the collection, with typed ``owner_id`` and ``document_id`` columns
+(see ``create_vector_table``). With ``PGVECTOR_SCHEMA=langchain`` they live
+in LangChain's ``langchain_pg_embedding`` / ``langchain_pg_collection``
+tables.
+"""
+import json
+import re
+from typing import Any, List, Optional, Sequence
+from psycopg import AsyncConnection
+from sqlalchemy import text
+from sqlmodel import Session
+from backend.core.config import settings
+
+_IDENTIFIER_RE = re.compile(r"^[a-z_][a-z0-9_]{0,62}$")
+
+# Vector forms the HNSW index can be built over; the table always keeps full precision
+QUANTIZATIONS = ("none", "halfvec", "binary")
+
+
+def vector_table_name(collection_name: str) -> str:
+    """Name of the app-managed vector table of a collection.
+
+    Raises:
+        ValueError: If the collection name is not a plain lowercase identifier
+    """
+    if not _IDENTIFIER_RE.match(collection_name):
+        raise ValueError(f"Collection name is not usable as a table name: {collection_name}")
+    return collection_name
+
+
+def _uses_vector_table() -> bool:
+    return settings.PGVECTOR_SCHEMA == "table"
+
+
+def vector_literal(vector: Sequence[float]) -> str:
+    """Text form of a vector, cast with ``CAST(... AS vector)`` in statements."""
+    return "[" + ",".join(repr(float(value)) for value in vector) + "]"
+
+
+def _ann_index_spec(quantization: str, dimension: Optional[int]) -> tuple[str, str, str]:
+    """Index name suffix, indexed expression and operator class of an HNSW index.
+
+    Raises:
+        ValueError: If the quantization is unknown, or quantized without a dimension
+    """
+    if quantization not in QUANTIZATIONS:
+        raise ValueError(f"Unsupported vector quantization: {quantization}")
+    if quantization == "none":
+        return "hnsw", "embedding", "vector_cosine_ops"
+    if not dimension:
+        raise ValueError("Quantized indexes need the vector dimension")
+    if quantization == "halfvec":
+        return "halfvec_hnsw", f"(embedding::halfvec({int(dimension)}))", "halfvec_cosine_ops"
+    return "binary_hnsw", f"(binary_quantize(embedding)::bit({int(dimension)}))", "bit_hamming_ops"
+
+
+def _ann_order(quantization: str, dimension: int, embedding: str) -> str:
+    """ORDER BY expression of an ANN search that can use the ``quantization`` index."""
+    if quantization == "halfvec":
+        return f"embedding::halfvec({dimension}) <=> CAST({embedding} AS halfvec({dimension}))"
+    if quantization == "binary":
+        return (
+            f"binary_quantize(embedding)::bit({dimension}) "
+            f"<~> binary_quantize(CAST({embedding} AS vector))::bit({dimension})"
+        )
+    return f"embedding <=> CAST({embedding} AS vector)"
+
+
+def create_vector_table(
+    session: Session,
+    table: str,
+    dimension: int,
+    partitioned: bool = False,
+    ann_index: bool = True,
+    hnsw_m: int = 16,
+    hnsw_ef_construction: int = 64,
+    quantization: str = "none",
+) -> None:
+    """Create a vector table and its indexes if they don't exist.
+
+    The primary key is ``(owner_id, id)`` so that the table can be list
+    partitioned by owner; ``id`` gets its own index for deletes by id.
+    Searches filtered by owner use the primary key (or the owner's
+    partition, or a partial index from ``create_owner_ann_index``).
+
+    Args:
+        partitioned: Partition by owner; owners go to the default partition
+            until ``create_owner_partition`` gives them their own
+        ann_index: Create the HNSW index with a new table (bulk loads create it
+            afterwards; ``migrate_vectors quantize`` adds it to existing tables)
+        quantization: Vector form the HNSW index is built over (see ``create_ann_index``)
+    """
+    session.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+    exists = session.execute(text("SELECT to_regclass(:table) IS NOT NULL"), {"table": table}).scalar()
+    session.execute(text(
+        f"""
+        CREATE TABLE IF NOT EXISTS {table} (
+            id TEXT NOT NULL,
+            owner_id BIGINT NOT NULL,
+            document_id BIGINT,
+            chunk_index INTEGER,
+            content TEXT NOT NULL,
+            metadata JSONB NOT NULL DEFAULT '{{}}',
+            embedding vector({int(dimension)}) NOT NULL,
+            PRIMARY KEY (owner_id, id)
+        ) {"PARTITION BY LIST (owner_id)" if partitioned else ""}
+        """
+    ))
+    if partitioned:
+        session.execute(text(f"CREATE TABLE IF NOT EXISTS {table}_default PARTITION OF {table} DEFAULT"))
+    session.execute(text(f"CREATE INDEX IF NOT EXISTS {table}_id_idx ON {table} (id)"))
+    session.execute(text(f"CREATE INDEX IF NOT EXISTS {table}_document_id_idx ON {table} (document_id)"))
+    if ann_index and not exists:
+        create_ann_index(session, table, hnsw_m, hnsw_ef_construction, quantization, dimension)
+    session.commit()
+
+
+def ann_index_name(table: str, quantization: str = "none", owner_id: Optional[int] = None) -> str:
+    suffix, _, _ = _ann_index_spec(quantization, 1)
+    if owner_id is not None:
+        return f"{table}_owner_{int(owner_id)}_{suffix}_idx"
+    return f"{table}_embedding_{suffix}_idx"
+
+
+def create_ann_index(
+    session: Session,
+    table: str,
+    hnsw_m: int = 16,
+    hnsw_ef_construction: int = 64,
+    quantization: str = "none",
+    dimension: Optional[int] = None,
+) -> None:
+    """Create the HNSW cosine index over all vectors of a table.
+
+    Args:
+        quantization: ``none`` indexes the float32 vectors; ``halfvec`` indexes
+            them at half precision (half the size) and ``binary`` as one bit
+            per dimension (1/32 of the size, searched by Hamming distance).
+            Quantized searches rescore their candidates on the full vectors
+            (see ``search_vectors``).
+        dimension: Vector dimension, needed for quantized indexes
+    """
+    _, expression, opclass = _ann_index_spec(quantization, dimension)
+    session.execute(text(
+        f"CREATE INDEX IF NOT EXISTS {ann_index_name(table, quantization)} ON {table} "
+        f"USING hnsw ({expression} {opclass}) "
+        f"WITH (m = {int(hnsw_m)}, ef_construction = {int(hnsw_ef_construction)})"
+    ))
+
+
+def drop_ann_index(session: Session, table: str, quantization: str = "none") -> None:
+    session.execute(text(f"DROP INDEX IF EXISTS {ann_index_name(table, quantization)}"))
+    session.commit()
+
+
+def create_owner_ann_index(
+    session: Session,
+    table: str,
+    owner_id: int,
+    hnsw_m: int = 16,
+    hnsw_ef_construction: int = 64,
+    quantization: str = "none",
+    dimension: Optional[int] = None,
+) -> None:
+    """Create a partial HNSW index over one owner's vectors.
+
+    Searches filtered to the owner use it instead of post-filtering the
+    shared index, so they keep full recall however large the table gets.
+    """
+    _, expression, opclass = _ann_index_spec(quantization, dimension)
+    session.execute(text(
+        f"CREATE INDEX IF NOT EXISTS {ann_index_name(table, quantization, owner_id)} ON {table} "
+        f"USING hnsw ({expression} {opclass}) "
+        f"WITH (m = {int(hnsw_m)}, ef_construction = {int(hnsw_ef_construction)}) "
+        f"WHERE owner_id = {int(owner_id)}"
+    ))
+    session.commit()
+
+
+def get_index_size(session: Session, index: str) -> Optional[int]:
+    """Size of an index in bytes, or None if it doesn't exist."""
+    return session.execute(
+        text("SELECT pg_relation_size(to_regclass(:index))"), {"index": index}
+    ).scalar()
+
+
+def usable_quantization(session: Session, table: str, quantization: str) -> str:
+    """The quantization searches of ``table`` can use: ``quantization`` if its index exists, else ``none``.
+
+    A quantized search orders by the quantized expression, which without its
+    index means a sequential scan; ordering by the full vectors is then at
+    least as fast and exact.
+    """
+    if quantization == "none":
+        return quantization
+    if get_index_size(session, ann_index_name(table, quantization)) is None:
+        return "none"
+    return quantization
+
+
+def create_owner_partition(session: Session, table: str, owner_id: int) -> int:
+    """Move an owner's vectors out of the default partition into their own.
+
+    Returns:
+        Number of vectors moved
+    """
+    partition = f"{table}_owner_{int(owner_id)}"
+    session.execute(text(f"CREATE TABLE {partition} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    result = session.execute(text(
+        f"WITH moved AS (DELETE FROM {table}_default WHERE owner_id = :owner_id RETURNING *) "
+        f"INSERT INTO {partition} SELECT * FROM moved"
+    ), {"owner_id": owner_id})
+    # Attaching builds the partition's share of the parent's indexes
+    session.execute(text(f"ALTER TABLE {table} ATTACH PARTITION {partition} FOR VALUES IN ({int(owner_id)})"))
+    session.commit()
+    return result.rowcount
+
+
+def drop_vector_table(session: Session, table: str) -> None:
+    session.execute(text(f"DROP TABLE IF EXISTS {table} CASCADE"))
+    session.commit()
+
+
+def upsert_vectors(session: Session, table: str, rows: List[dict[str, Any]]) -> None:
+    """Insert vectors, replacing those with the same owner and id.
+
+    Args:
+        rows: Dicts with ``id``, ``owner_id``, ``document_id``, ``chunk_index``,
+            ``content``, ``metadata`` (dict) and ``embedding`` (list of floats)
+    """
+    if not rows:
+        return
+    session.execute(
+        text(
+            f"""
+            INSERT INTO {table} (id, owner_id, document_id, chunk_index, content, metadata, embedding)
+            VALUES (:id, :owner_id, :document_id, :chunk_index, :content,
+                    CAST(:metadata AS jsonb), CAST(:embedding AS vector))
+            ON CONFLICT (owner_id, id) DO UPDATE SET
+                document_id = EXCLUDED.document_id,
+                chunk_index = EXCLUDED.chunk_index,
+                content = EXCLUDED.content,
+                metadata = EXCLUDED.metadata,
+                embedding = EXCLUDED.embedding
+            """
+        ),
+        [
+            {
+                **row,
+                "metadata": json.dumps(row["metadata"]),
+                "embedding": vector_literal(row["embedding"]),
+            }
+            for row in rows
+        ],
+    )
+    session.commit()
+
+
+def delete_vectors(session: Session, table: str, ids: List[str]) -> int:
+    if not ids:
+        return 0
+    result = session.execute(text(f"DELETE FROM {table} WHERE id = ANY(:ids)"), {"ids": list(ids)})
+    session.commit()
+    return result.rowcount
+
+
+def _search_statement(
+    table: str,
+    embedding: Sequence[float],
+    k: int,
+    owner_id: Optional[int],
+    document_ids: Optional[List[int]],
+    metadata: Optional[dict],
+    placeholder: str,
+    quantization: str = "none",
+    rescore_factor: int = 4,
+) -> tuple[str, dict[str, Any]]:
+    """Similarity query and its parameters.
+
+    ``placeholder`` formats a parameter name in the driver's style
+    (``":{}"`` for SQLAlchemy, ``"%({})s"`` for psycopg). The statement only
+    varies with the filters used, so prepared statements get reused.
+
+    With a quantized index, ``k * rescore_factor`` candidates are taken in
+    quantized order through the index, then ranked by their full-precision
+    distance.
+    """
+    param = placeholder.format
+    conditions = []
+    params: dict[str, Any] = {"embedding": vector_literal(embedding), "k": k}
+    if owner_id is not None:
+        conditions.append(f"owner_id = {param('owner_id')}")
+        params["owner_id"] = owner_id
+    if document_ids is not None:
+        conditions.append(f"document_id = ANY({param('document_ids')})")
+        params["document_ids"] = list(document_ids)
+    if metadata:
+        conditions.append(f"metadata @> CAST({param('metadata')} AS jsonb)")
+        params["metadata"] = json.dumps(metadata)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    distance = f"embedding <=> CAST({param('embedding')} AS vector)"
+    if quantization == "none":
+        statement = f"""
+            SELECT id, content, metadata, {distance} AS distance
+            FROM {table}
+            {where}
+            ORDER BY {distance}
+            LIMIT {param('k')}
+            """
+        return statement, params
+
+    _ann_index_spec(quantization, len(embedding))
+    params["candidates"] = k * max(rescore_factor, 1)
+    statement = f"""
+        WITH candidates AS MATERIALIZED (
+            SELECT id, content, metadata, embedding
+            FROM {table}
+            {where}
+            ORDER BY {_ann_order(quantization, len(embedding), param('embedding'))}
+            LIMIT {param('candidates')}
+        )
+        SELECT id, content, metadata, {distance} AS distance
+        FROM candidates
+        ORDER BY distance
+        LIMIT {param('k')}
+        """
+    return statement, params
+
+
+def _ef_search(ef_search: Optional[int], params: dict[str, Any]) -> Optional[int]:
+    # An HNSW scan returns at most ef_search rows (1000 at most): let it cover the rescoring candidates
+    if "candidates" in params:
+        return min(max(ef_search or 40, params["candidates"]), 1000)
+    return ef_search
+
+
+def search_vectors(
+    session: Session,
+    table: str,
+    embedding: Sequence[float],
+    k: int,
+    owner_id: Optional[int] = None,
+    document_ids: Optional[List[int]] = None,
+    metadata: Optional[dict] = None,
+    ef_search: Optional[int] = None,
+    iterative_scan: Optional[str] = None,
+    quantization: str = "none",
+    rescore_factor: int = 4,
+) -> List[tuple[str, str, dict, float]]:
+    """Nearest vectors by cosine distance.
+
+    Args:
+        owner_id: Only search this owner's vectors
+        document_ids: Only search vectors of these documents
+        metadata: Only search vectors whose metadata contains these key/values
+        ef_search: HNSW candidate list size for this query
+        iterative_scan: pgvector >= 0.8 ``hnsw.iterative_scan`` mode, which keeps
+            scanning the index until ``k`` rows pass the filters
+        quantization: Search through the ``halfvec`` or ``binary`` index and
+            rescore ``k * rescore_factor`` candidates on the full vectors
+
+    Returns:
+        (id, content, metadata, distance) tuples, nearest first
+    """
+    statement, params = _search_statement(
+        table, embedding, k, owner_id, document_ids, metadata, ":{}", quantization, rescore_factor
+    )
+    ef_search = _ef_search(ef_search, params)
+
+    # SET LOCAL: only for this transaction
+    if ef_search:
+        session.execute(text("SELECT set_config('hnsw.ef_search', :value, true)"), {"value": str(ef_search)})
+    if iterative_scan:
+        session.execute(text("SELECT set_config('hnsw.iterative_scan', :value, true)"), {"value": iterative_scan})
+    result = session.execute(text(statement), params)
+    rows = [(row[0], row[1], row[2] or {}, float(row[3])) for row in result]
+    session.commit()
+    return rows
+
+
+async def asearch_vectors(
+    conn: AsyncConnection,
+    table: str,
+    embedding: Sequence[float],
+    k: int,
+    owner_id: Optional[int] = None,
+    document_ids: Optional[List[int]] = None,
+    metadata: Optional[dict] = None,
+    ef_search: Optional[int] = None,
+    iterative_scan: Optional[str] = None,
+    prepare: bool = True,
+    timeout_ms: Optional[int] = None,
+    quantization: str = "none",
+    rescore_factor: int = 4,
+) -> List[tuple[str, str, dict, float]]:
+    """Async ``search_vectors`` on a psycopg connection.
+
+    Cancelling the awaiting task also cancels the query on the server:
+    psycopg sends a cancel request when a wait is interrupted, so the
+    connection goes back to the pool idle instead of running the scan to
+    the end.
+
+    Args:
+        conn: Connection from the shared async pool (autocommit)
+        prepare: Run the similarity query as a server-side prepared statement
+        timeout_ms: ``statement_timeout`` for the query
+        quantization, rescore_factor: See ``search_vectors``
+
+    Returns:
+        (id, content, metadata, distance) tuples, nearest first
+    """
+    statement, params = _search_statement(
+        table, embedding, k, owner_id, document_ids, metadata, "%({})s", quantization, rescore_factor
+    )
+    ef_search = _ef_search(ef_search, params)
+    settings_sql = []
+    settings_params: dict[str, Any] = {}
+    if ef_search:
+        settings_sql.append("set_config('hnsw.ef_search', %(ef_search)s, true)")
+        settings_params["ef_search"] = str(ef_search)
+    if iterative_scan:
+        settings_sql.append("set_config('hnsw.iterative_scan', %(iterative_scan)s, true)")
+        settings_params["iterative_scan"] = iterative_scan
+    if timeout_ms:
+        settings_sql.append("set_config('statement_timeout', %(timeout)s, true)")
+        settings_params["timeout"] = str(timeout_ms)
+
+    # The connection is in autocommit mode; the transaction scopes the SET LOCALs
+    async with conn.transaction():
+        if settings_sql:
+            await conn.execute(f"SELECT {', '.join(settings_sql)}", settings_params)
+        cursor = await conn.execute(statement, params, prepare=prepare)
+        rows = await cursor.fetchall()
+    return [(row[0], row[1], row[2] or {}, float(row[3])) for row in rows]
+
+
+def copy_collection_to_table(session: Session, collection_name: str, table: str, owner_id: int) -> int:
+    """Copy one owner's vectors from a LangChain PGVector collection to a vector table.
+
+    Owner and document come from the chunk and document rows referencing
+    each vector, not from its JSON metadata; vectors no chunk references
+    are not copied. Already copied vectors are left alone, so an interrupted
+    migration can be run again.
+
+    Returns:
+        Number of vectors copied
+    """
+    result = session.execute(
+        text(
+            f"""
+            INSERT INTO {table} (id, owner_id, document_id, chunk_index, content, metadata, embedding)
+            SELECT e.custom_id, d.owner_id, dc.document_id, dc.chunk_index, e.document,
+                   COALESCE(e.cmetadata::jsonb, '{{}}'::jsonb), e.embedding
+            FROM langchain_pg_embedding e
+            JOIN langchain_pg_collection c ON c.uuid = e.collection_id
+            JOIN documentchunk dc ON dc.embedding_id = e.custom_id
+            JOIN document d ON d.id = dc.document_id
+            WHERE c.name = :collection_name
+              AND d.owner_id = :owner_id
+            ON CONFLICT (owner_id, id) DO NOTHING
+            """
+        ),
+        {"collection_name": collection_name, "owner_id": owner_id},
+    )
+    session.commit()
+    return result.rowcount
+
+
+def count_collection_vectors(session: Session, collection_name: str) -> tuple[int, int]:
+    """Count the vectors of a LangChain PGVector collection.
+
+    Returns:
+        (all vectors, vectors referenced by a chunk)
+    """
+    row = session.execute(
+        text(
+            """
+            SELECT count(*),
+                   count(*) FILTER (WHERE EXISTS (
+                       SELECT 1 FROM documentchunk dc WHERE dc.embedding_id = e.custom_id
+                   ))
+            FROM langchain_pg_embedding e
+            JOIN langchain_pg_collection c ON c.uuid = e.collection_id
+            WHERE c.name = :collection_name
+            """
+        ),
+        {"collection_name": collection_name},
+    ).one()
+    return row[0], row[1]
+
+
+def count_table_vectors(session: Session, table: str) -> int:
+    return session.execute(text(f"SELECT count(*) FROM {table}")).one()[0]
+
+
+def table_has_vectors(session: Session, table: str) -> bool:
+    """Whether a vector table holds any row, without counting them."""
+    return session.execute(text(f"SELECT EXISTS (SELECT 1 FROM {table})")).scalar()
+
+
+def collection_has_vectors(session: Session, collection_name: str) -> bool:
+    """Whether a LangChain PGVector collection exists and holds any vector."""
+    if session.execute(text("SELECT to_regclass('langchain_pg_embedding') IS NULL")).scalar():
+        return False
+    return session.execute(
+        text(
+            """
+            SELECT EXISTS (
+                SELECT 1
+                FROM langchain_pg_embedding e
+                JOIN langchain_pg_collection c ON c.uuid = e.collection_id
+                WHERE c.name = :collection_name
+            )
+            """
+        ),
+        {"collection_name": collection_name},
+    ).scalar()
+
+
+def find_orphan_vector_ids(session: Session, collection_name: str, limit: int) -> List[str]:
+    """Get ids of vectors in a collection that no chunk references.
+
+    Vectors are stored before their chunk rows are committed, so a vector
+    of a document being ingested right now can show up here as well.
+    """
+    if _uses_vector_table():
+        statement = text(
+            f"""
+            SELECT v.id
+            FROM {vector_table_name(collection_name)} v
+            WHERE NOT EXISTS (
+                SELECT 1 FROM documentchunk dc WHERE dc.embedding_id = v.id
+            )
+            LIMIT :limit
+            """
+        )
+        result = session.execute(statement, {"limit": limit})
+        return [row[0] for row in result]
+
+    statement = text(
+        """
+        SELECT e.custom_id
+        FROM langchain_pg_embedding e
+        JOIN langchain_pg_collection c ON c.uuid = e.collection_id
+        WHERE c.name = :collection_name
+          AND e.custom_id IS NOT NULL
+          AND NOT EXISTS (
+              SELECT 1 FROM documentchunk dc WHERE dc.embedding_id = e.custom_id
+          )
+        LIMIT :limit
+        """
+    )
+    result = session.execute(statement, {"collection_name": collection_name, "limit": limit})
+    return [row[0] for row in result]
+
+
+def get_owner_vectors(session: Session, collection_name: str, owner_id: int) -> List[tuple[str, str]]:
+    """Get the vectors of all chunks of an owner's live documents.
+
+    Returns:
+        (vector id, vector in pgvector text form) tuples
+    """
+    if _uses_vector_table():
+        statement = text(
+            f"""
+            SELECT v.id, v.embedding::text
+            FROM {vector_table_name(collection_name)} v
+            JOIN documentchunk dc ON dc.embedding_id = v.id
+            JOIN document d ON d.id = dc.document_id
+            WHERE v.owner_id = :owner_id
+              AND d.deleted_at IS NULL
+            ORDER BY dc.id
+            """
+        )
+        result = session.execute(statement, {"owner_id": owner_id})
+        return [(row[0], row[1]) for row in result]
+
+    statement = text(
+        """
+        SELECT e.custom_id, e.embedding::text
+        FROM langchain_pg_embedding e
+        JOIN langchain_pg_collection c ON c.uuid = e.collection_id
+        JOIN documentchunk dc ON dc.embedding_id = e.custom_id
+        JOIN document d ON d.id = dc.document_id
+        WHERE c.name = :collection_name
+          AND d.owner_id = :owner_id
+          AND d.deleted_at IS NULL
+        ORDER BY dc.id
+        """
+    )
+    result = session.execute(statement, {"collection_name": collection_name, "owner_id": owner_id})
+    return [(row[0], row[1]) for row in result]
+
+
+def get_vector_documents(session: Session, collection_name: str, ids: List[str]) -> dict[str, tuple[str, dict]]:
+    """Get the text and metadata stored with vectors.
+
+    Returns:
+        Vector id -> (text, metadata)
+    """
+    if not ids:
+        return {}
+    if _uses_vector_table():
+        statement = text(
+            f"SELECT id, content, metadata FROM {vector_table_name(collection_name)} WHERE id = ANY(:ids)"
+        )
+        result = session.execute(statement, {"ids": list(ids)})
+        return {row[0]: (row[1], row[2] or {}) for row in result}
+
+    statement = text(
+        """
+        SELECT e.custom_id, e.document, e.cmetadata
+        FROM langchain_pg_embedding e
+        JOIN langchain_pg_collection c ON c.uuid = e.collection_id
+        WHERE c.name = :collection_name
+          AND e.custom_id = ANY(:ids)
+        """
+    )
+    result = session.execute(statement, {"collection_name": collection_name, "ids": list(ids)})
+    return {row[0]: (row[1], row[2] or {}) for row in result}
+
+
+def get_vectors(session: Session, collection_name: str, ids: List[str]) -> dict[str, str]:
+    """Get stored vectors by id.
+
+    Returns:
+        Vector id -> vector in pgvector text form
+    """
+    if not ids:
+        return {}
+    if _uses_vector_table():
+        statement = text(
+            f"SELECT id, embedding::text FROM {vector_table_name(collection_name)} WHERE id = ANY(:ids)"
+        )
+        result = session.execute(statement, {"ids": list(ids)})
+        return {row[0]: row[1] for row in result}
+
+    statement = text(
+        """
+        SELECT e.custom_id, e.embedding::text
+        FROM langchain_pg_embedding e
+        JOIN langchain_pg_collection c ON c.uuid = e.collection_id
+        WHERE c.name = :collection_name
+          AND e.custom_id = ANY(:ids)
+        """
+    )
+    result = session.execute(statement, {"collection_name": collection_name, "ids": list(ids)})
+    return {row[0]: row[1] for row in result}
+
+
+def count_owner_vectors(session: Session, table: str, min_vectors: int = 0) -> List[tuple[int, int]]:
+    """Count vectors per owner in a vector table.
+
+    Returns:
+        (owner id, vectors) tuples for owners with at least ``min_vectors``, largest first
+    """
+    result = session.execute(
+        text(
+            f"""
+            SELECT owner_id, count(*) AS vectors FROM {table}
+            GROUP BY owner_id HAVING count(*) >= :min_vectors
+            ORDER BY vectors DESC
+            """
+        ),
+        {"min_vectors": min_vectors},
+    )
+    return [(row[0], row[1]) for row in result]
+
+
+def drop_collection(session: Session, collection_name: str) -> int:
+    """Delete a LangChain PGVector collection and its vectors.
+
+    Returns:
+        Number of vectors deleted
+    """
+    result = session.execute(
+        text(
+            """
+            DELETE FROM langchain_pg_embedding
+            WHERE collection_id IN (SELECT uuid FROM langchain_pg_collection WHERE name = :collection_name)
+            """
+        ),
+        {"collection_name": collection_name},
+    )
+    session.execute(
+        text("DELETE FROM langchain_pg_collection WHERE name = :collection_name"),
+        {"collection_name": collection_name},
+    )
+    session.commit()
+    return result.rowcount
@@ -5,12 +5,15 @@ from fastapi import FastAPI
 from fastapi.openapi.utils import get_openapi
 from fastapi.middleware.cors import CORSMiddleware
 from backend.core.config import settings
-from backend.core.db import init_db, get_session
+from backend.core.db import init_db, get_session, close_async_pool
 from backend.core.limiter import setup_rate_limiter
-from backend.core.middleware import RequestIDMiddleware, LoggingMiddleware
+from backend.core.middleware import RequestIDMiddleware, LoggingMiddleware, UploadSizeLimitMiddleware
 from backend.core.logging import logger
 from backend.core.metrics import setup_metrics
 from backend.api.v1.routers import api_router
+from backend.services.ingestion_queue import ingestion_queue
+from backend.services.vector_gc import vector_gc
+from backend.utils.extraction_pool import extraction_pool
 
 # Suppress Pydantic V1 compatibility warning for Python 3.14+
 # This is safe as LangChain uses Pydantic V2 for actual functionality
@@ -28,9 +31,15 @@ async def lifespan(app: FastAPI):
     logger.info("Starting application...")
     init_db()
     logger.info("Database initialized")
+    await ingestion_queue.start()
+    await vector_gc.start()
     yield
     # Shutdown
     logger.info("Shutting down application...")
+    await vector_gc.stop()
+    await ingestion_queue.stop()
+    extraction_pool.shutdown()
+    await close_async_pool()
 
 
 def custom_openapi():
@@ -68,6 +77,7 @@ app.add_middleware(
 # Setup custom middleware
 app.add_middleware(RequestIDMiddleware)
 app.add_middleware(LoggingMiddleware)
+app.add_middleware(UploadSizeLimitMiddleware)
 
 # Setup rate limiting
 setup_rate_limiter(app)
@@ -69,6 +69,8 @@ class ChatRequest(SQLModel):
     stream: bool = False
     provider: Optional[str] = None  # Optional provider name (e.g., 'openai', 'anthropic')
     model: Optional[str] = None  # Optional model name, uses default if not provided
+    mmr_lambda: Optional[float] = Field(default=None, ge=0.0, le=1.0)  # Retrieval relevance vs. diversity weight
+    duplicate_threshold: Optional[float] = Field(default=None, ge=0.0, le=1.0)  # Near-duplicate chunk cutoff
 
 
 class ChatResponse(SQLModel):
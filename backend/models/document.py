@@ -17,6 +17,13 @@ class Document(DocumentBase, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     owner_id: int = Field(foreign_key="user.id")
     storage_path: str
+    content_hash: Optional[str] = Field(default=None, index=True)  # SHA-256 of file content
+    # Set when this document reuses the chunks/embeddings of an identical upload
+    canonical_document_id: Optional[int] = Field(default=None, foreign_key="document.id")
+    # On canonical documents: number of live documents sharing its chunks (itself included)
+    ref_count: int = 1
+    # Tombstone: set on deletion, hides the document at once; the vector GC purges it
+    deleted_at: Optional[datetime] = Field(default=None, index=True)
     uploaded_at: Optional[datetime] = Field(default_factory=datetime.utcnow)
     processed_at: Optional[datetime] = None
     created_at: Optional[datetime] = Field(default_factory=datetime.utcnow)
@@ -29,11 +36,12 @@ class Document(DocumentBase, table=True):
 class DocumentChunk(SQLModel, table=True):
     """Document chunk model for vector storage."""
     id: Optional[int] = Field(default=None, primary_key=True)
-    document_id: int = Field(foreign_key="document.id")
+    document_id: int = Field(foreign_key="document.id", index=True)
     chunk_text: str
     chunk_index: int
     chunk_meta: Optional[str] = None  # JSON string for metadata
-    embedding_id: Optional[str] = None  # Reference to embedding in vector store
+    chunk_hash: Optional[str] = None  # SHA-256 of chunk_text, matched on re-index
+    embedding_id: Optional[str] = Field(default=None, index=True)  # Reference to embedding in vector store
     created_at: Optional[datetime] = Field(default_factory=datetime.utcnow)
     
     # Relationships
@@ -45,6 +53,7 @@ class DocumentCreate(SQLModel):
     filename: str
     file_size: Optional[int] = None
     mime_type: Optional[str] = None
+    content_hash: Optional[str] = None
 
 
 class DocumentRead(DocumentBase):
@@ -52,12 +61,25 @@ class DocumentRead(DocumentBase):
     id: int
     owner_id: int
     storage_path: str
+    content_hash: Optional[str] = None
+    canonical_document_id: Optional[int] = None
     uploaded_at: datetime
     processed_at: Optional[datetime] = None
     created_at: datetime
     updated_at: datetime
 
 
+class DocumentBulkDelete(SQLModel):
+    """Schema for deleting many documents at once."""
+    document_ids: List[int]
+
+
+class DocumentBulkDeleteRead(SQLModel):
+    """Result of a bulk deletion."""
+    deleted: int
+    not_found: List[int] = []
+
+
 class DocumentUpdate(SQLModel):
     """Schema for updating document metadata."""
     filename: Optional[str] = None
@@ -0,0 +1,18 @@
+"""Embedding cache model."""
+from sqlalchemy import Column, LargeBinary
+from sqlmodel import SQLModel, Field
+from typing import Optional
+from datetime import datetime
+
+
+class EmbeddingCache(SQLModel, table=True):
+    """Cached embedding vector for a chunk of text.
+    
+    Keyed by the SHA-256 of the text, the embedding model and the vector
+    dimension, so changing either setting never serves stale vectors.
+    """
+    text_hash: str = Field(primary_key=True, max_length=64)
+    model: str = Field(primary_key=True)
+    dimension: int = Field(primary_key=True)
+    embedding: bytes = Field(sa_column=Column(LargeBinary, nullable=False))  # float32 array
+    created_at: Optional[datetime] = Field(default_factory=datetime.utcnow)
@@ -0,0 +1,89 @@
+"""Ingestion job model."""
+from sqlmodel import SQLModel, Field
+from typing import List, Optional
+from datetime import datetime
+
+
+class IngestionBatch(SQLModel, table=True):
+    """A group of documents uploaded together through the bulk endpoint."""
+    id: Optional[int] = Field(default=None, primary_key=True)
+    owner_id: int = Field(foreign_key="user.id", index=True)
+    documents_total: int = 0
+    documents_deduplicated: int = 0  # Created as references, nothing to process
+    skipped_files: Optional[str] = None  # JSON list of {"filename", "reason"}
+    created_at: Optional[datetime] = Field(default_factory=datetime.utcnow)
+
+
+class IngestionJobBase(SQLModel):
+    """Base ingestion job schema."""
+    status: str = "pending"  # pending, processing, completed, failed
+    kind: str = "index"  # index: first ingestion, reindex: refresh an indexed document
+    chunks_total: int = 0
+    chunks_embedded: int = 0
+    chunks_committed: int = 0  # Checkpoint: chunks 0..n-1 are stored with their vectors
+    attempts: int = 0
+    error: Optional[str] = None
+
+
+class IngestionJob(IngestionJobBase, table=True):
+    """Ingestion job database model.
+
+    The table doubles as a persistent work queue: app workers claim pending
+    rows with ``SELECT ... FOR UPDATE SKIP LOCKED`` so jobs survive restarts
+    and are never processed twice concurrently.
+    """
+    id: Optional[int] = Field(default=None, primary_key=True)
+    document_id: int = Field(foreign_key="document.id", index=True)
+    batch_id: Optional[int] = Field(default=None, foreign_key="ingestionbatch.id", index=True)
+    # Where a retry resumes extraction: page of the last committed chunk and
+    # index of the first chunk on that page (PDFs only)
+    checkpoint_page: Optional[int] = None
+    checkpoint_page_chunk: int = 0
+    available_at: Optional[datetime] = None  # Not claimed before this time (retry backoff)
+    created_at: Optional[datetime] = Field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = Field(default_factory=datetime.utcnow)
+
+
+class IngestionJobRead(IngestionJobBase):
+    """Schema for reading ingestion job data."""
+    id: int
+    document_id: int
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
+class DocumentStatusRead(SQLModel):
+    """Schema for reporting document processing progress."""
+    document_id: int
+    status: str
+    chunks_embedded: int = 0
+    chunks_total: int = 0
+    progress: float = 0.0  # chunks_embedded / chunks_total, 0.0 - 1.0
+    error: Optional[str] = None
+    job: Optional[IngestionJobRead] = None
+
+
+class SkippedFile(SQLModel):
+    """A file of a bulk upload that was not ingested."""
+    filename: str
+    reason: str
+
+
+class IngestionBatchRead(SQLModel):
+    """Schema for reporting aggregate progress of a bulk upload."""
+    id: int
+    status: str  # pending, processing, completed, completed_with_errors, failed
+    created_at: datetime
+    documents_total: int = 0
+    documents_pending: int = 0
+    documents_processing: int = 0
+    documents_completed: int = 0  # Includes deduplicated documents
+    documents_failed: int = 0
+    documents_deduplicated: int = 0
+    chunks_embedded: int = 0
+    chunks_total: int = 0
+    progress: float = 0.0  # Finished documents / documents_total, 0.0 - 1.0
+    skipped: List[SkippedFile] = []
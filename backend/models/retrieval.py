@@ -0,0 +1,18 @@
+"""Retrieval model."""
+from sqlmodel import SQLModel, Field
+from typing import Optional
+from datetime import datetime
+
+
+class CorpusVersion(SQLModel, table=True):
+    """Version counter of a user's searchable documents.
+    
+    Bumped whenever documents of the owner are indexed, re-indexed or
+    deleted; cached retrieval results are keyed by it, so a change makes
+    every cached result of the owner unreachable at once. The search
+    planner reads the chunk count from here instead of counting per query.
+    """
+    owner_id: int = Field(foreign_key="user.id", primary_key=True)
+    version: int = 0
+    chunks: Optional[int] = None  # Chunks of live documents as of this version (None: not counted yet)
+    updated_at: Optional[datetime] = Field(default_factory=datetime.utcnow)
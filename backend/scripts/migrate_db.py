@@ -0,0 +1,41 @@
+"""Upgrade the schema of a database created by an earlier version.
+
+Adds missing columns to existing tables (also done by ``init_db`` at app
+startup) and builds their indexes, and the lexical search index unless
+``RETRIEVAL_MODE=vector``, with ``CREATE INDEX CONCURRENTLY``, so the app
+can keep serving and ingesting while they build.
+Safe to re-run; an interrupted build is resumed by running it again.
+
+Usage:
+    python -m backend.scripts.migrate_db
+"""
+import sys
+import time
+from sqlmodel import Session
+from backend.core.config import settings
+from backend.core.db import engine
+from backend.core.migrations import INDEXES, add_missing_columns, create_indexes_concurrently
+from backend.crud.search_crud import create_lexical_extension, lexical_indexes
+
+
+def main() -> int:
+    add_missing_columns(engine)
+    print("Columns up to date")
+
+    indexes = list(INDEXES)
+    if settings.RETRIEVAL_MODE != "vector":
+        with Session(engine) as session:
+            create_lexical_extension(session)
+        indexes += lexical_indexes()
+
+    started = time.perf_counter()
+    built = create_indexes_concurrently(engine, indexes)
+    if built:
+        print(f"Built {', '.join(built)} in {time.perf_counter() - started:.1f}s")
+    else:
+        print("Indexes up to date")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
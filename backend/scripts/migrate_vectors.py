@@ -0,0 +1,189 @@
+"""Manage the app-managed pgvector table (``PGVECTOR_SCHEMA=table``).
+
+Commands:
+    migrate            Copy the LangChain PGVector collection into the vector table,
+                       owner by owner, then build the HNSW index. Safe to re-run.
+    partition-owner    Give owners their own partition (table created with
+                       ``PGVECTOR_PARTITION_BY_OWNER=true`` or ``migrate --partitioned``)
+    index-owner        Create partial HNSW indexes for owners
+    quantize           Build the HNSW index over halfvec or binary vectors
+                       (``PGVECTOR_QUANTIZATION``) and optionally drop the others
+
+Usage:
+    python -m backend.scripts.migrate_vectors migrate [--partitioned] [--drop-source]
+    python -m backend.scripts.migrate_vectors partition-owner 42 [43 ...]
+    python -m backend.scripts.migrate_vectors index-owner --min-vectors 100000
+    python -m backend.scripts.migrate_vectors quantize --to halfvec [--drop-other]
+"""
+import argparse
+import sys
+import time
+from sqlmodel import Session, select
+from backend.core.config import settings
+from backend.core.db import engine
+from backend.crud import vector_crud
+from backend.models.document import Document
+
+
+def migrate(args: argparse.Namespace) -> int:
+    table = vector_crud.vector_table_name(args.collection)
+    with Session(engine) as session:
+        # The HNSW index is built once at the end, much faster than row by row
+        vector_crud.create_vector_table(
+            session,
+            table,
+            settings.VECTOR_DIMENSION,
+            partitioned=args.partitioned,
+            ann_index=False,
+        )
+        total, referenced = vector_crud.count_collection_vectors(session, args.collection)
+        owner_ids = session.exec(select(Document.owner_id).distinct().order_by(Document.owner_id)).all()
+    print(f"Collection '{args.collection}': {total} vectors, {referenced} referenced by chunks; "
+          f"{len(owner_ids)} owners")
+
+    copied = 0
+    started = time.perf_counter()
+    for owner_id in owner_ids:
+        with Session(engine) as session:
+            count = vector_crud.copy_collection_to_table(session, args.collection, table, owner_id)
+        copied += count
+        if count:
+            print(f"  owner {owner_id}: {count} vectors")
+    print(f"Copied {copied} vectors in {time.perf_counter() - started:.1f}s")
+
+    print(f"Building the HNSW index ({args.quantization})...")
+    with Session(engine) as session:
+        vector_crud.create_ann_index(
+            session,
+            table,
+            settings.PGVECTOR_HNSW_M,
+            settings.PGVECTOR_HNSW_EF_CONSTRUCTION,
+            args.quantization,
+            settings.VECTOR_DIMENSION,
+        )
+        session.commit()
+        in_table = vector_crud.count_table_vectors(session, table)
+    if in_table < referenced:
+        print(f"Vector table has {in_table} vectors, fewer than the {referenced} to migrate", file=sys.stderr)
+        return 1
+    if total > referenced:
+        print(f"{total - referenced} unreferenced vectors were not copied")
+
+    if args.drop_source:
+        with Session(engine) as session:
+            dropped = vector_crud.drop_collection(session, args.collection)
+        print(f"Dropped collection '{args.collection}' ({dropped} vectors)")
+    print("Done. Set PGVECTOR_SCHEMA=table to serve from the vector table.")
+    return 0
+
+
+def partition_owner(args: argparse.Namespace) -> int:
+    table = vector_crud.vector_table_name(args.collection)
+    for owner_id in args.owner_ids:
+        with Session(engine) as session:
+            moved = vector_crud.create_owner_partition(session, table, owner_id)
+        print(f"Owner {owner_id}: moved {moved} vectors to {table}_owner_{owner_id}")
+    return 0
+
+
+def index_owner(args: argparse.Namespace) -> int:
+    table = vector_crud.vector_table_name(args.collection)
+    owner_ids = list(args.owner_ids)
+    if args.min_vectors is not None:
+        with Session(engine) as session:
+            owner_ids += [
+                owner_id
+                for owner_id, _ in vector_crud.count_owner_vectors(session, table, args.min_vectors)
+                if owner_id not in owner_ids
+            ]
+    if not owner_ids:
+        print("No owners to index")
+        return 0
+    for owner_id in owner_ids:
+        started = time.perf_counter()
+        with Session(engine) as session:
+            vector_crud.create_owner_ann_index(
+                session,
+                table,
+                owner_id,
+                settings.PGVECTOR_HNSW_M,
+                settings.PGVECTOR_HNSW_EF_CONSTRUCTION,
+                args.quantization,
+                settings.VECTOR_DIMENSION,
+            )
+        print(f"Owner {owner_id}: partial HNSW index built in {time.perf_counter() - started:.1f}s")
+    return 0
+
+
+def quantize(args: argparse.Namespace) -> int:
+    table = vector_crud.vector_table_name(args.collection)
+    started = time.perf_counter()
+    print(f"Building the {args.to} HNSW index of {table}...")
+    with Session(engine) as session:
+        vector_crud.create_ann_index(
+            session,
+            table,
+            settings.PGVECTOR_HNSW_M,
+            settings.PGVECTOR_HNSW_EF_CONSTRUCTION,
+            args.to,
+            settings.VECTOR_DIMENSION,
+        )
+        session.commit()
+        for quantization in vector_crud.QUANTIZATIONS:
+            size = vector_crud.get_index_size(session, vector_crud.ann_index_name(table, quantization))
+            if size is not None:
+                print(f"  {quantization:<8} index: {size / (1024 * 1024):.1f} MB")
+    print(f"Built in {time.perf_counter() - started:.1f}s")
+
+    if args.drop_other:
+        with Session(engine) as session:
+            for quantization in vector_crud.QUANTIZATIONS:
+                if quantization != args.to:
+                    vector_crud.drop_ann_index(session, table, quantization)
+        print("Dropped the other HNSW indexes")
+    if args.to != settings.PGVECTOR_QUANTIZATION:
+        print(f"Set PGVECTOR_QUANTIZATION={args.to} to search through the new index.")
+    else:
+        print("Restart the app to search through the new index.")
+    return 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--collection", default=settings.VECTOR_COLLECTION_NAME,
+                        help="Collection to migrate; also the vector table name")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    migrate_parser = commands.add_parser("migrate", help="Copy the LangChain collection into the vector table")
+    migrate_parser.add_argument("--partitioned", action="store_true", default=settings.PGVECTOR_PARTITION_BY_OWNER,
+                                help="Create the vector table list-partitioned by owner")
+    migrate_parser.add_argument("--drop-source", action="store_true",
+                                help="Delete the LangChain collection after a complete copy")
+    migrate_parser.add_argument("--quantization", choices=vector_crud.QUANTIZATIONS,
+                                default=settings.PGVECTOR_QUANTIZATION, help="Vector form of the HNSW index")
+    migrate_parser.set_defaults(func=migrate)
+
+    partition_parser = commands.add_parser("partition-owner", help="Move owners into their own partitions")
+    partition_parser.add_argument("owner_ids", type=int, nargs="+")
+    partition_parser.set_defaults(func=partition_owner)
+
+    index_parser = commands.add_parser("index-owner", help="Create partial HNSW indexes for owners")
+    index_parser.add_argument("owner_ids", type=int, nargs="*")
+    index_parser.add_argument("--min-vectors", type=int, help="Also index every owner with at least this many vectors")
+    index_parser.add_argument("--quantization", choices=vector_crud.QUANTIZATIONS,
+                              default=settings.PGVECTOR_QUANTIZATION, help="Vector form of the HNSW indexes")
+    index_parser.set_defaults(func=index_owner)
+
+    quantize_parser = commands.add_parser("quantize", help="Build the HNSW index over quantized vectors")
+    quantize_parser.add_argument("--to", choices=vector_crud.QUANTIZATIONS, default=settings.PGVECTOR_QUANTIZATION,
+                                 help="Vector form of the new index")
+    quantize_parser.add_argument("--drop-other", action="store_true",
+                                 help="Drop the table's HNSW indexes over other vector forms")
+    quantize_parser.set_defaults(func=quantize)
+
+    args = parser.parse_args()
+    sys.exit(args.func(args))
+
+
+if __name__ == "__main__":
+    main()
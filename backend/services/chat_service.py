@@ -72,6 +72,8 @@ async def send_message(
             session_id=session_id_str,
             provider=chat_request.provider,
             model=chat_request.model,
+            mmr_lambda=chat_request.mmr_lambda,
+            duplicate_threshold=chat_request.duplicate_threshold,
         )
     else:
         # Use LangChain chain-based agent
@@ -84,6 +86,8 @@ async def send_message(
                 question=chat_request.message,
                 chat_history=chat_history if chat_history else None,
                 user_id=user_id,
+                mmr_lambda=chat_request.mmr_lambda,
+                duplicate_threshold=chat_request.duplicate_threshold,
             )
         )
     
@@ -185,6 +189,8 @@ async def send_message_stream(
             session_id=session_id_str,
             provider=chat_request.provider,
             model=chat_request.model,
+            mmr_lambda=chat_request.mmr_lambda,
+            duplicate_threshold=chat_request.duplicate_threshold,
         )
     else:
         # Use LangChain chain-based agent
@@ -193,6 +199,8 @@ async def send_message_stream(
             question=chat_request.message,
             chat_history=chat_history if chat_history else None,
             user_id=user_id,
+            mmr_lambda=chat_request.mmr_lambda,
+            duplicate_threshold=chat_request.duplicate_threshold,
         )
     
     return chat_session, stream
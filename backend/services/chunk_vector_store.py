@@ -0,0 +1,286 @@
+"""Vector store over an app-managed pgvector table."""
+import uuid
+from typing import Any, Awaitable, Callable, Iterable, List, Optional
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+from psycopg_pool import AsyncConnectionPool
+from sqlalchemy.engine import Engine
+from sqlmodel import Session
+from backend.core.logging import logger
+from backend.crud import vector_crud
+
+
+class ChunkVectorStore(VectorStore):
+    """pgvector store with typed ``owner_id`` / ``document_id`` columns.
+
+    LangChain's PGVector keeps metadata in a JSONB column, so an owner
+    filter cannot use an index together with the HNSW index. Here owner and
+    document are real columns (taken from each document's metadata), the
+    table can be list partitioned by owner and large owners can get partial
+    HNSW indexes (see ``backend.scripts.migrate_vectors``). Filters on
+    ``owner_id`` and ``document_id`` become column predicates; other filter
+    keys are matched against the JSONB metadata.
+
+    The table is created by ``init_db`` (or ``migrate_vectors migrate``);
+    the store only reads and writes it.
+
+    Args:
+        engine: SQLAlchemy engine of the database
+        table: Table name (the collection name)
+        embedding_function: Model used by ``add_texts`` and ``similarity_search``
+        dimension: Vector dimension of the table
+        ef_search: HNSW candidate list size per query
+        iterative_scan: pgvector >= 0.8 iterative index scan mode for filtered queries
+        async_pool: Returns the async psycopg pool used by the ``asimilarity_*``
+            methods; without it they run the sync methods in a thread
+        prepared: Run async similarity queries as prepared statements
+        timeout_ms: Statement timeout of async similarity queries
+        quantization: ``none``, or ``halfvec`` / ``binary`` to build the HNSW index
+            over quantized vectors and rescore ``k * rescore_factor`` candidates
+            on the full-precision vectors the table keeps; without that index
+            searches order by the full-precision vectors
+        rescore_factor: Candidates per result taken from a quantized index
+    """
+
+    def __init__(
+        self,
+        engine: Engine,
+        table: str,
+        embedding_function: Embeddings,
+        dimension: int,
+        ef_search: Optional[int] = None,
+        iterative_scan: Optional[str] = None,
+        async_pool: Optional[Callable[[], Awaitable[AsyncConnectionPool]]] = None,
+        prepared: bool = False,
+        timeout_ms: Optional[int] = None,
+        quantization: str = "none",
+        rescore_factor: int = 4,
+    ):
+        self.engine = engine
+        self.table = vector_crud.vector_table_name(table)
+        self.embedding_function = embedding_function
+        self.dimension = dimension
+        self.ef_search = ef_search
+        self.iterative_scan = iterative_scan or None
+        self.async_pool = async_pool
+        self.prepared = prepared
+        self.timeout_ms = timeout_ms
+        with Session(engine) as session:
+            self.quantization = vector_crud.usable_quantization(session, self.table, quantization)
+        if self.quantization != quantization:
+            logger.warning(
+                f"Vector table '{self.table}' has no {quantization} HNSW index; searching full-precision "
+                f"vectors until it is built with python -m backend.scripts.migrate_vectors quantize --to {quantization}"
+            )
+        self.rescore_factor = rescore_factor
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding_function
+
+    def add_embeddings(
+        self,
+        texts: Iterable[str],
+        embeddings: List[List[float]],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        """Store texts with precomputed embeddings.
+
+        Raises:
+            ValueError: If a metadata dict has no ``owner_id``
+        """
+        texts = list(texts)
+        metadatas = metadatas or [{} for _ in texts]
+        ids = ids or [str(uuid.uuid4()) for _ in texts]
+        rows = []
+        for vector_id, text, embedding, metadata in zip(ids, texts, embeddings, metadatas):
+            owner_id = metadata.get("owner_id", metadata.get("user_id"))
+            if owner_id is None:
+                raise ValueError("Vectors need an owner_id in their metadata")
+            rows.append({
+                "id": str(vector_id),
+                "owner_id": int(owner_id),
+                "document_id": metadata.get("document_id"),
+                "chunk_index": metadata.get("chunk_index"),
+                "content": text,
+                "metadata": metadata,
+                "embedding": embedding,
+            })
+        with Session(self.engine) as session:
+            vector_crud.upsert_vectors(session, self.table, rows)
+        return [row["id"] for row in rows]
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        texts = list(texts)
+        embeddings = self.embedding_function.embed_documents(texts)
+        return self.add_embeddings(texts, embeddings, metadatas=metadatas, ids=ids)
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        if not ids:
+            return None
+        with Session(self.engine) as session:
+            vector_crud.delete_vectors(session, self.table, ids)
+        return True
+
+    def delete_collection(self) -> None:
+        """Drop the table."""
+        with Session(self.engine) as session:
+            vector_crud.drop_vector_table(session, self.table)
+
+    @staticmethod
+    def _split_filter(filter: Optional[dict]) -> dict[str, Any]:
+        """Turn a filter dict into ``search_vectors`` arguments."""
+        arguments: dict[str, Any] = {}
+        metadata = {}
+        for key, value in (filter or {}).items():
+            if key == "owner_id":
+                arguments["owner_id"] = int(value)
+            elif key == "document_id":
+                values = value.get("$in") if isinstance(value, dict) else [value]
+                arguments["document_ids"] = [int(v) for v in values]
+            else:
+                metadata[key] = value
+        if metadata:
+            arguments["metadata"] = metadata
+        return arguments
+
+    def similarity_search_with_score_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        filter: Optional[dict] = None,
+        **kwargs: Any,
+    ) -> List[tuple[Document, float]]:
+        """Nearest documents with their cosine distance."""
+        with Session(self.engine) as session:
+            rows = vector_crud.search_vectors(
+                session,
+                self.table,
+                embedding,
+                k,
+                ef_search=self.ef_search,
+                iterative_scan=self.iterative_scan,
+                quantization=self.quantization,
+                rescore_factor=self.rescore_factor,
+                **self._split_filter(filter),
+            )
+        return [
+            (Document(page_content=content, metadata=metadata), distance)
+            for _, content, metadata, distance in rows
+        ]
+
+    def similarity_search_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        filter: Optional[dict] = None,
+        **kwargs: Any,
+    ) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k, filter=filter)]
+
+    async def asimilarity_search_with_score_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        filter: Optional[dict] = None,
+        **kwargs: Any,
+    ) -> List[tuple[Document, float]]:
+        """Nearest documents with their cosine distance, queried on the async pool."""
+        if self.async_pool is None:
+            return await super().asimilarity_search_with_score_by_vector(embedding, k, filter=filter)
+        pool = await self.async_pool()
+        async with pool.connection() as conn:
+            rows = await vector_crud.asearch_vectors(
+                conn,
+                self.table,
+                embedding,
+                k,
+                ef_search=self.ef_search,
+                iterative_scan=self.iterative_scan,
+                quantization=self.quantization,
+                rescore_factor=self.rescore_factor,
+                prepare=self.prepared,
+                timeout_ms=self.timeout_ms,
+                **self._split_filter(filter),
+            )
+        return [
+            (Document(page_content=content, metadata=metadata), distance)
+            for _, content, metadata, distance in rows
+        ]
+
+    async def asimilarity_search_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        filter: Optional[dict] = None,
+        **kwargs: Any,
+    ) -> List[Document]:
+        return [doc for doc, _ in await self.asimilarity_search_with_score_by_vector(embedding, k, filter=filter)]
+
+    async def asimilarity_search_with_score(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[dict] = None,
+        **kwargs: Any,
+    ) -> List[tuple[Document, float]]:
+        embedding = await self.embedding_function.aembed_query(query)
+        return await self.asimilarity_search_with_score_by_vector(embedding, k, filter=filter)
+
+    async def asimilarity_search(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[dict] = None,
+        **kwargs: Any,
+    ) -> List[Document]:
+        return [doc for doc, _ in await self.asimilarity_search_with_score(query, k, filter=filter)]
+
+    def similarity_search_with_score(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[dict] = None,
+        **kwargs: Any,
+    ) -> List[tuple[Document, float]]:
+        embedding = self.embedding_function.embed_query(query)
+        return self.similarity_search_with_score_by_vector(embedding, k, filter=filter)
+
+    def similarity_search(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[dict] = None,
+        **kwargs: Any,
+    ) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, filter=filter)]
+
+    def _select_relevance_score_fn(self):
+        # Cosine distance in [0, 2] -> relevance in [0, 1]
+        return self._cosine_relevance_score_fn
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[dict]] = None,
+        *,
+        engine: Engine,
+        table: str,
+        dimension: int,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> "ChunkVectorStore":
+        store = cls(engine, table, embedding, dimension, **kwargs)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        return store
@@ -0,0 +1,93 @@
+"""Maximal marginal relevance and near-duplicate suppression for retrieved chunks."""
+from typing import List, Optional
+import numpy as np
+
+
+def parse_vector(value: str) -> np.ndarray:
+    """Parse the pgvector text form ``"[0.1,0.2,...]"``."""
+    return np.array(value.strip("[]").split(","), dtype=np.float32)
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """Scale rows to unit length (zero rows stay zero)."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def rank_relevance(n: int) -> np.ndarray:
+    """Relevance from rank alone, 1 for the first candidate down to 1/n for the last.
+
+    Used when the candidate order does not come from query similarity, such
+    as after reciprocal rank fusion with lexical hits.
+    """
+    return np.linspace(1.0, 1.0 / n, n, dtype=np.float32) if n else np.zeros(0, dtype=np.float32)
+
+
+def mmr_select(
+    candidates: np.ndarray,
+    k: int,
+    query: Optional[np.ndarray] = None,
+    relevance: Optional[np.ndarray] = None,
+    lambda_mult: float = 0.5,
+    duplicate_threshold: Optional[float] = None,
+    dropped: Optional[List[int]] = None,
+) -> List[int]:
+    """Pick up to ``k`` candidates by maximal marginal relevance.
+
+    Each step takes the candidate maximizing
+    ``lambda_mult * relevance - (1 - lambda_mult) * max cosine similarity
+    to the candidates already taken``, so ``lambda_mult=1`` keeps the
+    relevance order and lower values favour diversity. Once a candidate is
+    taken, every candidate with a cosine similarity of at least
+    ``duplicate_threshold`` to it is dropped.
+
+    Only one matrix-vector product per step is computed (the similarities
+    to the candidate just taken), not the full pairwise matrix, so a step
+    costs ``O(n * dim)``.
+
+    Args:
+        candidates: (n, dim) candidate vectors
+        k: Candidates to pick
+        query: Query vector; relevance is its cosine similarity to each candidate
+        relevance: Relevance per candidate, used instead of ``query``
+        lambda_mult: Weight of relevance against diversity, in [0, 1]
+        duplicate_threshold: Cosine similarity from which candidates are near duplicates
+        dropped: If given, the indices of candidates dropped as near duplicates
+            are appended to it
+
+    Returns:
+        Indices of the picked candidates, in pick order
+    """
+    vectors = normalize_rows(candidates)
+    n = len(vectors)
+    if n == 0 or k <= 0:
+        return []
+    if relevance is None:
+        if query is None:
+            raise ValueError("mmr_select needs a query vector or relevance scores")
+        query = np.asarray(query, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        relevance = vectors @ (query / norm if norm else query)
+    relevance = np.asarray(relevance, dtype=np.float32)
+
+    selected: List[int] = []
+    available = np.ones(n, dtype=bool)
+    max_similarity = np.full(n, -np.inf, dtype=np.float32)
+    scores = relevance.copy()
+    while len(selected) < k:
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        if not available[best]:
+            break
+        selected.append(best)
+        available[best] = False
+        similarity = vectors @ vectors[best]
+        if duplicate_threshold is not None:
+            duplicates = available & (similarity >= duplicate_threshold)
+            if dropped is not None:
+                dropped.extend(np.flatnonzero(duplicates).tolist())
+            available &= ~duplicates
+        np.maximum(max_similarity, similarity, out=max_similarity)
+        scores = lambda_mult * relevance - (1.0 - lambda_mult) * max_similarity
+    return selected
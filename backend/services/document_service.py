@@ -1,17 +1,40 @@
 """Document service for file upload and processing."""
 import json
+import mimetypes
 import uuid
-from pathlib import Path
+from datetime import datetime
+from pathlib import Path, PurePosixPath
+from typing import AsyncIterator, List, Optional
 from sqlmodel import Session
 from fastapi import UploadFile
-from langchain_core.documents import Document as LangChainDocument
 from backend.core.config import settings
 from backend.core.logging import logger
-from backend.crud import document_crud
-from backend.models.document import Document, DocumentChunk, DocumentCreate, DocumentUpdate
-from backend.utils.extractor import extract_text_from_file, chunk_text
-from backend.utils.storage import storage
+from backend.crud import document_crud, ingestion_crud
+from backend.models.document import Document, DocumentBulkDeleteRead, DocumentCreate, DocumentUpdate
+from backend.models.ingestion import DocumentStatusRead, IngestionBatchRead, IngestionJobRead
+from backend.utils.archive import is_archive, iter_archive_members
+from backend.utils.storage import storage, iter_upload, FileTooLargeError
 from backend.services.langchain_agent import get_vector_store
+from backend.services.ingestion_pipeline import (
+    CheckpointMismatchError,
+    IngestionPipeline,
+    ReindexPipeline,
+    ResumePoint,
+)
+from backend.services.ingestion_queue import ingestion_queue
+from backend.services.search_planner import search_planner
+from backend.services.vector_gc import vector_gc
+
+
+def _validate_upload(file: UploadFile) -> None:
+    """Check the extension and, when already known, the size of an upload."""
+    file_ext = Path(file.filename).suffix.lower()
+    if file_ext not in settings.ALLOWED_EXTENSIONS:
+        raise ValueError(f"File type {file_ext} not allowed")
+    
+    # Reject early when the multipart parser already knows the size
+    if file.size is not None and file.size > settings.MAX_UPLOAD_SIZE:
+        raise FileTooLargeError(f"File size exceeds maximum {settings.MAX_UPLOAD_SIZE} bytes")
 
 
 async def upload_document(
@@ -19,129 +42,456 @@ async def upload_document(
     file: UploadFile,
     user_id: int
 ) -> Document:
-    """Upload and process a document."""
-    # Validate file
-    file_ext = Path(file.filename).suffix.lower()
-    if file_ext not in settings.ALLOWED_EXTENSIONS:
-        raise ValueError(f"File type {file_ext} not allowed")
-    
-    # Read file content
-    content = await file.read()
-    if len(content) > settings.MAX_UPLOAD_SIZE:
-        raise ValueError(f"File size exceeds maximum {settings.MAX_UPLOAD_SIZE} bytes")
+    """Upload a document and queue it for background processing.
+
+    Returns immediately with the document in ``pending`` status; progress can
+    be followed with ``get_document_status``.
+    """
+    _validate_upload(file)
     
-    # Save file
-    file_path = f"{file.filename}"
-    storage_path = storage.save_file(content, file_path, user_id)
+    # Stream file to storage block by block (size and hash computed on the fly).
+    # Unique name: a stored file may be shared by dedup references and read by
+    # later jobs, so a same-named upload must never replace it
+    stored = await storage.save_stream(
+        iter_upload(file),
+        f"{uuid.uuid4().hex[:8]}_{file.filename}",
+        user_id,
+        max_size=settings.MAX_UPLOAD_SIZE,
+    )
     
     # Create document record
     document_create = DocumentCreate(
         filename=file.filename,
-        file_size=len(content),
+        file_size=stored.size,
         mime_type=file.content_type,
+        content_hash=stored.content_hash,
     )
-    document = document_crud.create_document(session, document_create, user_id, storage_path)
     
-    # Process document asynchronously (in background task)
-    # For now, we'll process it synchronously
-    try:
-        process_document(session, document.id)
-    except Exception as e:
-        logger.error(f"Error processing document {document.id}: {e}")
-        document_crud.update_document_status(session, document.id, "failed")
+    # Identical content already indexed for this owner: reuse its chunks and embeddings
+    canonical = document_crud.get_indexed_document_by_hash(session, user_id, stored.content_hash)
+    if canonical:
+        storage.delete_file(stored.path)
+        document = document_crud.create_document_reference(session, document_create, user_id, canonical)
+        logger.info(
+            f"Document {document.id} deduplicated against document {canonical.id} "
+            f"(content hash {stored.content_hash[:12]})"
+        )
+        return document
+    
+    document = document_crud.create_document(session, document_create, user_id, stored.path)
+    
+    # Queue document for processing by the ingestion workers
+    ingestion_crud.create_job(session, document.id)
+    ingestion_queue.notify()
     
     return document
 
 
-def process_document(session: Session, document_id: int):
-    """Process document: extract text, chunk, and index."""
+async def upload_documents_bulk(
+    session: Session,
+    files: List[UploadFile],
+    user_id: int
+) -> IngestionBatchRead:
+    """Upload many files and zip/tar archives as one ingestion batch.
+    
+    Archive members are streamed from the upload straight to storage. All
+    documents and their jobs are created in a single transaction and the
+    workers are woken once. Files with unsupported types, oversized files
+    and files beyond ``BULK_UPLOAD_MAX_FILES`` are reported as skipped.
+    
+    The stored (decompressed) files of a batch add up to at most
+    ``BULK_UPLOAD_MAX_SIZE``, like the request itself: the file that crosses
+    it and every file after it are skipped.
+    """
+    # Unique folder: archive members from different directories may share a name
+    folder = f"bulk-{uuid.uuid4().hex[:12]}"
+    stored_files: list[tuple[DocumentCreate, str]] = []
+    skipped: list[dict] = []
+    stored_bytes = 0
+    
+    async def store(filename: str, content_type: Optional[str], blocks: AsyncIterator[bytes]) -> None:
+        nonlocal stored_bytes
+        name = PurePosixPath(filename).name
+        remaining = settings.BULK_UPLOAD_MAX_SIZE - stored_bytes
+        reason = None
+        if Path(name).suffix.lower() not in settings.ALLOWED_EXTENSIONS:
+            reason = "File type not allowed"
+        elif len(stored_files) >= settings.BULK_UPLOAD_MAX_FILES:
+            reason = "Too many files in batch"
+        elif remaining <= 0:
+            reason = "Batch size limit reached"
+        if reason:
+            skipped.append({"filename": filename, "reason": reason})
+            await blocks.aclose()
+            return
+        try:
+            stored = await storage.save_stream(
+                blocks,
+                f"{folder}/{len(stored_files):05d}_{name}",
+                user_id,
+                max_size=min(settings.MAX_UPLOAD_SIZE, remaining),
+            )
+        except FileTooLargeError as e:
+            reason = str(e)
+            if remaining < settings.MAX_UPLOAD_SIZE:
+                # Over the batch budget: nothing more is stored for this request
+                stored_bytes = settings.BULK_UPLOAD_MAX_SIZE
+                reason = f"Batch size limit of {settings.BULK_UPLOAD_MAX_SIZE} bytes reached"
+            skipped.append({"filename": filename, "reason": reason})
+            return
+        stored_bytes += stored.size
+        stored_files.append((
+            DocumentCreate(
+                filename=name,
+                file_size=stored.size,
+                mime_type=content_type or mimetypes.guess_type(name)[0],
+                content_hash=stored.content_hash,
+            ),
+            stored.path,
+        ))
+    
+    try:
+        for file in files:
+            if is_archive(file.filename):
+                async for member in iter_archive_members(file.file, file.filename):
+                    await store(member.name, None, member.blocks)
+            else:
+                await store(file.filename, file.content_type, iter_upload(file))
+    except Exception:
+        # Don't leave the files of a half-read request behind
+        for _, path in stored_files:
+            storage.delete_file(path)
+        raise
+    
+    if not stored_files:
+        raise ValueError("No supported files in upload")
+    
+    # Content already indexed for this owner is shared instead of processed
+    canonicals = document_crud.get_indexed_documents_by_hashes(
+        session, user_id, [document_create.content_hash for document_create, _ in stored_files]
+    )
+    for document_create, path in stored_files:
+        if document_create.content_hash in canonicals:
+            storage.delete_file(path)
+    
+    batch = ingestion_crud.create_batch(session, user_id, stored_files, canonicals, skipped)
+    ingestion_queue.notify()
+    logger.info(
+        f"Bulk upload batch {batch.id}: {batch.documents_total} documents "
+        f"({batch.documents_deduplicated} deduplicated), {len(skipped)} skipped"
+    )
+    return get_batch_status(session, batch.id, user_id)
+
+
+def get_batch_status(session: Session, batch_id: int, user_id: int) -> IngestionBatchRead:
+    """Get aggregate processing progress of a bulk upload batch."""
+    batch = ingestion_crud.get_batch_by_id(session, batch_id)
+    if not batch:
+        raise ValueError(f"Batch {batch_id} not found")
+    
+    if batch.owner_id != user_id:
+        raise ValueError("Not authorized to access this batch")
+    
+    stats = ingestion_crud.get_batch_job_stats(session, batch_id)
+    pending, processing, completed, failed = (
+        stats.get(status, (0, 0, 0))[0] for status in ("pending", "processing", "completed", "failed")
+    )
+    completed += batch.documents_deduplicated
+    
+    if pending + processing:
+        status = "processing" if processing or completed or failed else "pending"
+    elif failed:
+        status = "failed" if not completed else "completed_with_errors"
+    else:
+        status = "completed"
+    
+    return IngestionBatchRead(
+        id=batch.id,
+        status=status,
+        created_at=batch.created_at,
+        documents_total=batch.documents_total,
+        documents_pending=pending,
+        documents_processing=processing,
+        documents_completed=completed,
+        documents_failed=failed,
+        documents_deduplicated=batch.documents_deduplicated,
+        chunks_embedded=sum(embedded for _, embedded, _ in stats.values()),
+        chunks_total=sum(total for _, _, total in stats.values()),
+        progress=(completed + failed) / batch.documents_total if batch.documents_total else 1.0,
+        skipped=json.loads(batch.skipped_files) if batch.skipped_files else [],
+    )
+
+
+async def process_document(session: Session, document_id: int, job_id: Optional[int] = None):
+    """Process document: extract text, chunk, and index.
+    
+    Batches are committed with a checkpoint on the job as they are stored. If
+    a previous attempt of the job got partway, this one resumes after its
+    last checkpoint; a failure keeps the stored batches for the next attempt.
+    
+    Args:
+        session: Database session
+        document_id: Document to process
+        job_id: Ingestion job to report progress on (optional)
+    """
     document = document_crud.get_document_by_id(session, document_id)
     if not document:
         raise ValueError(f"Document {document_id} not found")
+    owner_id = document.owner_id
     
     # Update status to processing
     document_crud.update_document_status(session, document_id, "processing")
     
+    resume = _get_resume_point(session, document_id, job_id)
+    if resume is None:
+        # Chunks not covered by a checkpoint can't be trusted; start from scratch
+        _discard_document_chunks(session, document_id)
+    elif resume.chunks_committed:
+        logger.info(f"Resuming document {document_id} after {resume.chunks_committed} stored chunks")
+    
     try:
-        # Extract text
-        text = extract_text_from_file(document.storage_path, document.mime_type)
-        if not text:
-            raise ValueError("No text extracted from document")
-        
-        # Chunk text
-        text_chunks = chunk_text(text, chunk_size=500, chunk_overlap=50)
-        
-        if not text_chunks:
+        # Stream extraction, chunking, embedding and storage in bounded batches
+        try:
+            pipeline = IngestionPipeline(session, document, job_id=job_id, resume=resume)
+            chunk_count = await pipeline.run()
+        except CheckpointMismatchError as e:
+            logger.warning(f"Cannot resume document {document_id} ({e}); starting over")
+            session.rollback()
+            _discard_document_chunks(session, document_id)
+            ingestion_crud.clear_job_checkpoint(session, job_id)
+            pipeline = IngestionPipeline(session, document, job_id=job_id, resume=ResumePoint(0))
+            chunk_count = await pipeline.run()
+        if not chunk_count:
             raise ValueError("No chunks created from document")
         
-        # Create LangChain Document objects with metadata
-        # Generate unique IDs for each chunk to track them in vector store
-        langchain_docs = []
-        chunk_uuids = []
-        for idx, chunk_content in enumerate(text_chunks):
-            chunk_uuid = str(uuid.uuid4())
-            chunk_uuids.append(chunk_uuid)
-            
-            metadata = {
-                "document_id": document_id,
-                "owner_id": document.owner_id,
-                "filename": document.filename,
-                "chunk_index": idx,
-                "chunk_id": chunk_uuid,  # Store UUID in metadata for tracking
-            }
-            langchain_docs.append(
-                LangChainDocument(
-                    page_content=chunk_content,
-                    metadata=metadata
-                )
-            )
-        
-        # Store in vector store
-        vector_store = get_vector_store()
-        # PGVector's add_documents returns a list of IDs (UUIDs)
-        embedding_ids = vector_store.add_documents(langchain_docs)
+        # Update document status to completed, unless it was deleted meanwhile
+        if not document_crud.update_document_status(
+            session, document_id, "completed", processed_at=datetime.utcnow()
+        ):
+            logger.info(f"Document {document_id} was deleted while processing")
         
-        # If add_documents doesn't return IDs, use our generated UUIDs
-        if not embedding_ids or len(embedding_ids) != len(chunk_uuids):
-            embedding_ids = chunk_uuids
+        logger.info(
+            f"Processed document {document_id}: {chunk_count} chunks indexed and stored"
+        )
         
-        # Create DocumentChunk records
-        from datetime import datetime
-        document_chunks = []
-        for idx, (chunk_content, embedding_id) in enumerate(zip(text_chunks, embedding_ids)):
-            chunk_meta = json.dumps({
-                "filename": document.filename,
-                "mime_type": document.mime_type,
-            })
-            
-            document_chunk = DocumentChunk(
-                document_id=document_id,
-                chunk_text=chunk_content,
-                chunk_index=idx,
-                chunk_meta=chunk_meta,
-                embedding_id=str(embedding_id) if embedding_id else None,
+    except Exception as e:
+        logger.error(f"Error processing document {document_id}: {e}")
+        session.rollback()
+        # Committed batches stay for the next attempt (see abandon_document_ingestion)
+        document_crud.update_document_status(session, document_id, "failed")
+        document_crud.bump_corpus_version(session, owner_id)
+        raise
+    
+    # Cached retrievals may predate some of the document's chunks
+    document_crud.bump_corpus_version(session, owner_id)
+    _prepare_search(owner_id)
+
+
+def _get_resume_point(session: Session, document_id: int, job_id: Optional[int]) -> Optional[ResumePoint]:
+    """Where a retry of the job continues, or None to start from scratch."""
+    job = ingestion_crud.get_job_by_id(session, job_id) if job_id is not None else None
+    if job is None or job.attempts <= 1:
+        return None
+    
+    count, last_index = document_crud.get_chunk_summary(session, document_id)
+    if not job.chunks_committed:
+        # Nothing committed, but the last attempt may have added vectors of its first batch
+        return ResumePoint(0) if count == 0 else None
+    if count != job.chunks_committed or last_index != job.chunks_committed - 1:
+        logger.warning(f"Stored chunks of document {document_id} don't match the checkpoint of job {job_id}")
+        return None
+    return ResumePoint(
+        chunks_committed=job.chunks_committed,
+        page=job.checkpoint_page,
+        page_chunk=job.checkpoint_page_chunk,
+        last_hash=document_crud.get_chunk_hash(session, document_id, last_index),
+    )
+
+
+def abandon_document_ingestion(session: Session, document_id: int, job_id: int) -> None:
+    """Drop the partial index of a document whose ingestion failed for good."""
+    _discard_document_chunks(session, document_id)
+    ingestion_crud.clear_job_checkpoint(session, job_id)
+    document = document_crud.get_document_by_id(session, document_id, include_deleted=True)
+    if document:
+        document_crud.bump_corpus_version(session, document.owner_id)
+
+
+async def request_reindex(
+    session: Session,
+    document_id: int,
+    user_id: int,
+    file: Optional[UploadFile] = None,
+) -> Document:
+    """Queue a re-index of a document, optionally replacing its file first.
+    
+    Args:
+        session: Database session
+        document_id: Document to re-index
+        user_id: Requesting user
+        file: New version of the document (optional); without it the stored
+            file is re-chunked, e.g. after chunking settings changed
+    """
+    document = document_crud.get_document_by_id(session, document_id)
+    if not document:
+        raise ValueError(f"Document {document_id} not found")
+    
+    if document.owner_id != user_id:
+        raise ValueError("Not authorized to re-index this document")
+    
+    if document.status in ("pending", "processing"):
+        raise ValueError(f"Document {document_id} is already being processed")
+    
+    if file is None:
+        if document.canonical_document_id is not None:
+            raise ValueError(
+                f"Document {document_id} shares the content of document "
+                f"{document.canonical_document_id}; re-index that document instead"
             )
-            document_chunks.append(document_chunk)
+    else:
+        _validate_upload(file)
+        # Unique name: the current file may be shared with other documents
+        stored = await storage.save_stream(
+            iter_upload(file),
+            f"{uuid.uuid4().hex[:8]}_{file.filename}",
+            user_id,
+            max_size=settings.MAX_UPLOAD_SIZE,
+        )
+        
+        shared = document.canonical_document_id is not None or document.ref_count > 1
+        if shared:
+            # New content: stop sharing chunks, the re-index starts from scratch
+            document = document_crud.detach_document(session, document)
+        else:
+            storage.delete_file(document.storage_path)
+        document = document_crud.update_document_content(
+            session,
+            document_id,
+            storage_path=stored.path,
+            file_size=stored.size,
+            content_hash=stored.content_hash,
+            mime_type=file.content_type,
+        )
+    
+    document_crud.update_document_status(session, document_id, "pending")
+    ingestion_crud.create_job(session, document_id, kind="reindex")
+    ingestion_queue.notify()
+    session.refresh(document)
+    return document
+
+
+async def reindex_document(session: Session, document_id: int, job_id: Optional[int] = None):
+    """Re-extract and re-chunk a document, embedding only changed chunks.
+    
+    Chunks whose text hash matches a stored chunk keep their row and vector
+    store entry; new chunks are embedded and inserted; stored chunks that no
+    longer occur are deleted.
+    
+    Args:
+        session: Database session
+        document_id: Document to re-index
+        job_id: Ingestion job to report progress on (optional)
+    """
+    document = document_crud.get_document_by_id(session, document_id)
+    if not document:
+        raise ValueError(f"Document {document_id} not found")
+    
+    owner_id = document.owner_id
+    document_crud.update_document_status(session, document_id, "processing")
+    existing = document_crud.get_chunk_fingerprints(session, document_id)
+    # Rows inserted by this run have higher ids
+    last_chunk_id = max((chunk_id for chunk_id, _, _ in existing), default=0)
+    
+    try:
+        pipeline = ReindexPipeline(session, document, existing, job_id=job_id)
+        chunk_count = await pipeline.run()
+        if not chunk_count:
+            raise ValueError("No chunks created from document")
         
-        # Save chunks to database
-        for chunk in document_chunks:
-            session.add(chunk)
+        removed = pipeline.removed_chunks
+        document_crud.update_chunk_positions(session, pipeline.positions)
+        removed_embedding_ids = [embedding_id for _, embedding_id in removed if embedding_id]
+        if removed_embedding_ids:
+            try:
+                get_vector_store().delete(ids=removed_embedding_ids)
+            except Exception as e:
+                logger.warning(f"Error deleting removed vectors of document {document_id}: {e}")
+        document_crud.delete_chunks_by_ids(session, [chunk_id for chunk_id, _ in removed])
         
-        # Update document status to completed
-        document.status = "completed"
-        document.processed_at = datetime.utcnow()
-        session.add(document)
-        session.commit()
+        if not document_crud.update_document_status(
+            session, document_id, "completed", processed_at=datetime.utcnow()
+        ):
+            logger.info(f"Document {document_id} was deleted while re-indexing")
         
         logger.info(
-            f"Processed document {document_id}: {len(text_chunks)} chunks indexed and stored"
+            f"Re-indexed document {document_id}: {pipeline.chunks_reused} chunks unchanged, "
+            f"{pipeline.chunks_stored} embedded, {len(removed)} removed"
         )
-        
+    
     except Exception as e:
-        logger.error(f"Error processing document {document_id}: {e}")
-        document_crud.update_document_status(session, document_id, "failed")
+        logger.error(f"Error re-indexing document {document_id}: {e}")
         session.rollback()
+        _discard_document_chunks(session, document_id, after_id=last_chunk_id)
+        # The previous index is still complete
+        document_crud.update_document_status(session, document_id, "completed" if existing else "failed")
+        document_crud.bump_corpus_version(session, owner_id)
         raise
+    
+    document_crud.bump_corpus_version(session, owner_id)
+    _prepare_search(owner_id)
+
+
+def _discard_document_chunks(session: Session, document_id: int, after_id: Optional[int] = None) -> None:
+    """Delete the vectors and chunk rows already stored for a document.
+    
+    Args:
+        after_id: Only discard chunks inserted after this chunk id
+    """
+    embedding_ids = document_crud.get_chunk_embedding_ids(session, document_id, after_id=after_id)
+    if embedding_ids:
+        try:
+            get_vector_store().delete(ids=embedding_ids)
+        except Exception as e:
+            logger.warning(f"Error deleting partial vectors of document {document_id}: {e}")
+    document_crud.delete_document_chunks(session, document_id, after_id=after_id)
+
+
+def _prepare_search(owner_id: int) -> None:
+    """Build the owner's exact search matrix for their new corpus version in the background."""
+    if settings.SEARCH_PLANNER_ENABLED:
+        search_planner.schedule_build(owner_id)
+
+
+def get_document_status(session: Session, document_id: int, user_id: int) -> DocumentStatusRead:
+    """Get processing status and embedding progress for a document."""
+    document = document_crud.get_document_by_id(session, document_id)
+    if not document:
+        raise ValueError(f"Document {document_id} not found")
+    
+    if document.owner_id != user_id:
+        raise ValueError("Not authorized to access this document")
+    
+    job = ingestion_crud.get_latest_job_for_document(session, document_id)
+    if not job:
+        # Deduplicated documents are never processed themselves
+        return DocumentStatusRead(
+            document_id=document_id,
+            status=document.status,
+            progress=1.0 if document.status == "completed" else 0.0,
+        )
+    
+    progress = job.chunks_embedded / job.chunks_total if job.chunks_total else 0.0
+    if document.status == "completed":
+        progress = 1.0
+    return DocumentStatusRead(
+        document_id=document_id,
+        status=document.status,
+        chunks_embedded=job.chunks_embedded,
+        chunks_total=job.chunks_total,
+        progress=progress,
+        error=job.error,
+        job=IngestionJobRead.model_validate(job),
+    )
 
 
 def get_user_documents(session: Session, user_id: int, skip: int = 0, limit: int = 100) -> list[Document]:
@@ -171,7 +521,14 @@ def update_document_metadata(
 
 
 def delete_document(session: Session, document_id: int, user_id: int) -> bool:
-    """Delete document."""
+    """Delete document.
+    
+    Documents sharing content are reference counted: vectors, chunks and the
+    stored file are only removed when the last referencing document is deleted.
+    The last reference is tombstoned, which hides it from listings and
+    retrieval at once; the vector GC then deletes its vectors by the ids
+    stored on its chunks and purges the rows and the file.
+    """
     document = document_crud.get_document_by_id(session, document_id)
     if not document:
         raise ValueError(f"Document {document_id} not found")
@@ -180,31 +537,96 @@ def delete_document(session: Session, document_id: int, user_id: int) -> bool:
         raise ValueError("Not authorized to delete this document")
     
     try:
-        # Delete from vector store using metadata filter
-        vector_store = get_vector_store()
-        try:
-            # PGVector supports delete by metadata filter
-            # Delete all chunks associated with this document
-            if hasattr(vector_store, 'delete'):
-                # Try to delete using metadata filter
-                vector_store.delete(filter={"document_id": document_id})
-            else:
-                # If delete method doesn't exist, log a warning
-                logger.warning(
-                    f"Vector store does not support delete method. "
-                    f"Chunks for document {document_id} may remain in vector store."
-                )
-        except Exception as e:
-            logger.warning(f"Error deleting from vector store: {e}. Continuing with document deletion.")
-        
-        # Delete file from storage
-        storage.delete_file(document.storage_path)
-        
-        # Delete document record (this will cascade delete DocumentChunk records)
-        return document_crud.delete_document(session, document_id)
+        if not _release_document(session, document):
+            document_crud.tombstone_documents(session, [document_id])
+            vector_gc.notify()
+        document_crud.bump_corpus_version(session, user_id)
+        _prepare_search(user_id)
+        return True
     except Exception as e:
         logger.error(f"Error deleting document {document_id}: {e}")
         raise
 
 
+def delete_documents(session: Session, document_ids: List[int], user_id: int) -> DocumentBulkDeleteRead:
+    """Delete many documents of a user at once.
+    
+    Ids that don't exist or belong to another user are reported as not
+    found. All documents are released in one transaction; those holding
+    the last reference to their content are tombstoned in a single
+    statement and purged by the vector GC.
+    
+    Args:
+        session: Database session
+        document_ids: Documents to delete
+        user_id: Requesting user
+    
+    Returns:
+        Number of deleted documents and the ids that were not found
+    """
+    requested = list(dict.fromkeys(document_ids))
+    documents = [
+        document
+        for document in document_crud.get_documents_by_ids(session, requested)
+        if document.owner_id == user_id
+    ]
+    found = {document.id for document in documents}
+    not_found = [document_id for document_id in requested if document_id not in found]
+    
+    # Aliases first, so canonicals deleted in the same request see their final ref_count
+    documents.sort(key=lambda document: document.canonical_document_id is None)
+    to_tombstone = []
+    # One transaction: a failure part way leaves every document and reference count as it was
+    try:
+        for document in documents:
+            session.refresh(document)
+            if not _release_document(session, document, commit=False):
+                to_tombstone.append(document.id)
+        document_crud.tombstone_documents(session, to_tombstone, commit=False)
+        if documents:
+            document_crud.bump_corpus_version(session, user_id, commit=False)
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Error deleting documents of user {user_id}: {e}")
+        raise
+    
+    if to_tombstone:
+        vector_gc.notify()
+    if documents:
+        _prepare_search(user_id)
+    logger.info(
+        f"Deleted {len(documents)} documents of user {user_id} "
+        f"({len(to_tombstone)} tombstoned for purging)"
+    )
+    return DocumentBulkDeleteRead(deleted=len(documents), not_found=not_found)
+
 
+def _release_document(session: Session, document: Document, commit: bool = True) -> bool:
+    """Delete a document right away if other documents still use its content.
+    
+    Args:
+        commit: Commit right away; False leaves the changes in the caller's transaction
+    
+    Returns:
+        True if the document was deleted, False if it holds the last
+        reference and its vectors have to be purged
+    """
+    # Reference to another document's content: just drop the reference
+    if document.canonical_document_id is not None:
+        remaining = document_crud.release_document_reference(
+            session, document.canonical_document_id, commit=commit
+        )
+        logger.info(
+            f"Released reference of document {document.id} to document "
+            f"{document.canonical_document_id} ({remaining} remaining)"
+        )
+        return document_crud.delete_document(session, document.id, commit=commit)
+    
+    # Canonical document still referenced: hand its chunks to a successor
+    if document.ref_count > 1:
+        successor = document_crud.promote_document_reference(session, document, commit=commit)
+        if successor:
+            logger.info(f"Chunks of document {document.id} handed over to document {successor.id}")
+            return document_crud.delete_document(session, document.id, commit=commit)
+    return False
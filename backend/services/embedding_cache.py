@@ -0,0 +1,129 @@
+"""Persistent embedding cache wrapping the configured embedding model."""
+import asyncio
+import hashlib
+from array import array
+from typing import List, Optional
+from langchain_core.embeddings import Embeddings
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import Session, select
+from backend.core.config import settings
+from backend.core.db import engine
+from backend.core.logging import logger
+from backend.core.metrics import EMBEDDING_CACHE_HITS, EMBEDDING_CACHE_MISSES
+from backend.models.embedding import EmbeddingCache
+
+# Keep IN (...) lists and bulk inserts to a reasonable statement size
+_LOOKUP_BATCH_SIZE = 1000
+
+
+def hash_text(text: str) -> str:
+    """Cache key for a text: SHA-256 hex digest of its UTF-8 bytes."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _encode(vector: List[float]) -> bytes:
+    return array("f", vector).tobytes()
+
+
+def _decode(data: bytes) -> List[float]:
+    vector = array("f")
+    vector.frombytes(data)
+    return vector.tolist()
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that serves document embeddings from Postgres.
+    
+    ``embed_documents`` looks all texts up in one batch, embeds only the
+    misses with the wrapped model and writes the new vectors back in bulk.
+    Query embeddings are passed straight through.
+    """
+    
+    def __init__(self, embeddings: Embeddings, model: Optional[str] = None, dimension: Optional[int] = None):
+        self.embeddings = embeddings
+        self.model = model or settings.EMBEDDING_MODEL
+        self.dimension = dimension or settings.VECTOR_DIMENSION
+    
+    def _lookup(self, hashes: List[str]) -> dict[str, List[float]]:
+        """Fetch cached vectors for the given text hashes."""
+        found = {}
+        with Session(engine) as session:
+            for start in range(0, len(hashes), _LOOKUP_BATCH_SIZE):
+                statement = (
+                    select(EmbeddingCache.text_hash, EmbeddingCache.embedding)
+                    .where(EmbeddingCache.model == self.model)
+                    .where(EmbeddingCache.dimension == self.dimension)
+                    .where(EmbeddingCache.text_hash.in_(hashes[start:start + _LOOKUP_BATCH_SIZE]))
+                )
+                for text_hash, data in session.exec(statement).all():
+                    found[text_hash] = _decode(data)
+        return found
+    
+    def _store(self, vectors: dict[str, List[float]]) -> None:
+        """Write new vectors to the cache, ignoring keys another worker already wrote."""
+        rows = [
+            {
+                "text_hash": text_hash,
+                "model": self.model,
+                "dimension": self.dimension,
+                "embedding": _encode(vector),
+            }
+            for text_hash, vector in vectors.items()
+        ]
+        with Session(engine) as session:
+            for start in range(0, len(rows), _LOOKUP_BATCH_SIZE):
+                statement = insert(EmbeddingCache).values(rows[start:start + _LOOKUP_BATCH_SIZE])
+                session.execute(statement.on_conflict_do_nothing())
+            session.commit()
+    
+    def _plan(self, texts: List[str]) -> tuple[List[str], dict[str, List[float]], dict[str, str]]:
+        """Look up cached vectors and collect the distinct texts still to embed."""
+        hashes = [hash_text(text) for text in texts]
+        try:
+            cached = self._lookup(list(set(hashes)))
+        except Exception as e:
+            logger.warning(f"Embedding cache lookup failed, embedding all texts: {e}")
+            cached = {}
+        
+        misses = {}
+        for text, text_hash in zip(texts, hashes):
+            if text_hash not in cached:
+                misses.setdefault(text_hash, text)
+        
+        miss_count = sum(1 for text_hash in hashes if text_hash not in cached)
+        EMBEDDING_CACHE_HITS.inc(len(texts) - miss_count)
+        EMBEDDING_CACHE_MISSES.inc(miss_count)
+        return hashes, cached, misses
+    
+    def _save(self, misses: dict[str, str], new_vectors: List[List[float]], cached: dict[str, List[float]]) -> None:
+        """Merge newly embedded vectors into ``cached`` and persist them."""
+        fresh = dict(zip(misses.keys(), new_vectors))
+        cached.update(fresh)
+        try:
+            self._store(fresh)
+        except Exception as e:
+            logger.warning(f"Embedding cache write failed: {e}")
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed documents, reusing cached vectors where possible."""
+        hashes, cached, misses = self._plan(texts)
+        if misses:
+            new_vectors = self.embeddings.embed_documents(list(misses.values()))
+            self._save(misses, new_vectors, cached)
+        return [cached[text_hash] for text_hash in hashes]
+    
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Async variant of ``embed_documents``; database work runs in a thread."""
+        hashes, cached, misses = await asyncio.to_thread(self._plan, texts)
+        if misses:
+            new_vectors = await self.embeddings.aembed_documents(list(misses.values()))
+            await asyncio.to_thread(self._save, misses, new_vectors, cached)
+        return [cached[text_hash] for text_hash in hashes]
+    
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a query with the wrapped model (not cached)."""
+        return self.embeddings.embed_query(text)
+    
+    async def aembed_query(self, text: str) -> List[float]:
+        """Async variant of ``embed_query``."""
+        return await self.embeddings.aembed_query(text)
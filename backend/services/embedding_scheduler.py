@@ -0,0 +1,187 @@
+"""Batched, concurrency-limited embedding scheduler with adaptive backpressure."""
+import asyncio
+import random
+from typing import Callable, List, Optional
+from langchain_core.embeddings import Embeddings
+from backend.core.config import settings
+from backend.core.logging import logger
+from backend.core.metrics import (
+    EMBEDDING_CONCURRENCY_LIMIT,
+    EMBEDDING_RATE_LIMITED,
+    EMBEDDED_CHUNKS,
+)
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """Check whether an embedding provider error is a rate limit (HTTP 429)."""
+    if type(error).__name__ == "RateLimitError":
+        return True
+    status_code = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    return status_code == 429
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Read a Retry-After hint (seconds) from a provider error, if present."""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class EmbeddingScheduler:
+    """Process-wide scheduler for document embedding calls.
+
+    Chunk lists are split into batches that run concurrently, but never more
+    than the current concurrency limit across all documents being ingested in
+    this process. The limit is halved whenever the provider answers with a
+    rate limit and grows back by one after a full window of successful
+    batches (AIMD). Failed batches are retried on their own, so batches that
+    already succeeded are never embedded twice.
+    """
+
+    def __init__(
+        self,
+        batch_size: int,
+        max_concurrency: int,
+        min_concurrency: int = 1,
+        max_retries: int = 5,
+        retry_base_delay: float = 1.0,
+    ):
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self._limit = max_concurrency
+        self._active = 0
+        self._successes = 0
+        self._epoch = 0  # Bumped on every back-off
+        self._condition: Optional[asyncio.Condition] = None
+        EMBEDDING_CONCURRENCY_LIMIT.set(self._limit)
+
+    @property
+    def concurrency_limit(self) -> int:
+        """Current adaptive concurrency limit."""
+        return self._limit
+
+    def _get_condition(self) -> asyncio.Condition:
+        # Created lazily so the scheduler can be instantiated at import time
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    async def _acquire(self) -> int:
+        """Wait for a free slot; returns the back-off epoch the batch started in."""
+        condition = self._get_condition()
+        async with condition:
+            await condition.wait_for(lambda: self._active < self._limit)
+            self._active += 1
+            return self._epoch
+
+    async def _release(self, epoch: int, rate_limited: bool = False, succeeded: bool = False) -> None:
+        condition = self._get_condition()
+        async with condition:
+            self._active -= 1
+            # Batches already in flight when we backed off don't halve the limit again
+            if rate_limited and epoch == self._epoch:
+                self._epoch += 1
+                self._successes = 0
+                new_limit = max(self.min_concurrency, self._limit // 2)
+                if new_limit != self._limit:
+                    logger.warning(f"Embedding rate limited, concurrency {self._limit} -> {new_limit}")
+                self._limit = new_limit
+            elif succeeded:
+                self._successes += 1
+                if self._successes >= self._limit and self._limit < self.max_concurrency:
+                    self._successes = 0
+                    self._limit += 1
+            EMBEDDING_CONCURRENCY_LIMIT.set(self._limit)
+            condition.notify_all()
+
+    async def _embed_batch(self, embeddings: Embeddings, texts: List[str]) -> List[List[float]]:
+        """Embed one batch, retrying it until it succeeds or runs out of attempts."""
+        attempt = 0
+        while True:
+            epoch = await self._acquire()
+            error: Optional[Exception] = None
+            succeeded = False
+            try:
+                vectors = await embeddings.aembed_documents(texts)
+                succeeded = True
+            except Exception as e:
+                error = e
+            finally:
+                # Always hand the slot back, including on cancellation
+                await self._release(
+                    epoch,
+                    rate_limited=error is not None and is_rate_limit_error(error),
+                    succeeded=succeeded,
+                )
+            
+            if succeeded:
+                EMBEDDED_CHUNKS.inc(len(texts))
+                return vectors
+            
+            if is_rate_limit_error(error):
+                EMBEDDING_RATE_LIMITED.inc()
+            attempt += 1
+            if attempt > self.max_retries:
+                raise error
+            delay = _retry_after(error) or self.retry_base_delay * (2 ** (attempt - 1))
+            delay *= 1 + random.random() * 0.25  # jitter so retries don't align
+            logger.warning(
+                f"Embedding batch of {len(texts)} failed ({error}), retry {attempt}/{self.max_retries} in {delay:.1f}s"
+            )
+            await asyncio.sleep(delay)
+
+    async def embed(
+        self,
+        embeddings: Embeddings,
+        texts: List[str],
+        on_progress: Optional[Callable[[int], None]] = None,
+    ) -> List[List[float]]:
+        """Embed texts in concurrent batches.
+
+        Args:
+            embeddings: Embedding model to call
+            texts: Texts to embed
+            on_progress: Called with the number of texts embedded so far after each batch
+
+        Returns:
+            Embedding vectors in the same order as ``texts``
+
+        Raises:
+            Exception: The first error of a batch that ran out of retries,
+                raised once all other batches have finished
+        """
+        batches = [texts[start:start + self.batch_size] for start in range(0, len(texts), self.batch_size)]
+        done = 0
+
+        async def run(batch: List[str]) -> List[List[float]]:
+            nonlocal done
+            vectors = await self._embed_batch(embeddings, batch)
+            done += len(batch)
+            if on_progress is not None:
+                on_progress(done)
+            return vectors
+
+        # A batch that exhausts its retries doesn't cancel the others: every batch
+        # that succeeds reaches the embedding cache, so the retry of the document
+        # only embeds the failed batches again
+        results = await asyncio.gather(*(run(batch) for batch in batches), return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        return [vector for result in results for vector in result]
+
+
+embedding_scheduler = EmbeddingScheduler(
+    batch_size=settings.EMBEDDING_BATCH_SIZE,
+    max_concurrency=settings.EMBEDDING_MAX_CONCURRENCY,
+    min_concurrency=settings.EMBEDDING_MIN_CONCURRENCY,
+    max_retries=settings.EMBEDDING_MAX_RETRIES,
+    retry_base_delay=settings.EMBEDDING_RETRY_BASE_DELAY,
+)
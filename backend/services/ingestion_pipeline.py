@@ -0,0 +1,351 @@
+"""Streaming ingestion pipeline: extract → chunk → embed → insert."""
+import asyncio
+import json
+import uuid
+from contextlib import aclosing
+from typing import AsyncIterator, List, NamedTuple, Optional
+from sqlmodel import Session
+from langchain_core.documents import Document as LangChainDocument
+from backend.core.config import settings
+from backend.crud import document_crud, ingestion_crud
+from backend.models.document import Document
+from backend.utils.chunker import SpanChunker, StreamingSpanChunker, TextChunk, get_chunking_config
+from backend.utils.extractor import detect_file_type
+from backend.utils.extraction_pool import extraction_pool
+from backend.services.langchain_agent import get_document_embedding_model, get_vector_store, aadd_embedded_documents
+from backend.services.embedding_scheduler import embedding_scheduler
+from backend.services.embedding_cache import hash_text
+
+# Namespace of the deterministic vector store ids of chunks
+VECTOR_ID_NAMESPACE = uuid.UUID("6234cd40-9308-40d8-bdd7-0546c5685e26")
+
+
+def vector_id(document_id: int, chunk_index: int, chunk_hash: str, run: Optional[str] = None) -> str:
+    """Vector store id of a chunk, derived from its document, position and text.
+
+    A retry that embeds the same chunk again writes it under the same id, so
+    vectors left behind by an interrupted batch are replaced, not duplicated.
+
+    Args:
+        run: Mixed into the id when the document already has vectors whose ids
+            were derived from other chunk positions (re-indexing)
+    """
+    name = f"{document_id}:{chunk_index}:{chunk_hash}"
+    return str(uuid.uuid5(VECTOR_ID_NAMESPACE, f"{name}:{run}" if run else name))
+
+
+class CheckpointMismatchError(Exception):
+    """Raised when a resumed document no longer chunks like the run that checkpointed it."""
+
+
+class ResumePoint(NamedTuple):
+    """Where a retried ingestion continues."""
+    chunks_committed: int  # Chunks 0..n-1 are already stored
+    page: Optional[int] = None  # Extraction restarts at this PDF page
+    page_chunk: int = 0  # Index of the first chunk on ``page``
+    last_hash: Optional[str] = None  # Hash of chunk n-1, to verify the chunking is unchanged
+
+
+class PendingChunk(NamedTuple):
+    """A chunk on its way through the pipeline."""
+    index: int
+    text: str
+    page: Optional[int]
+    section: Optional[str]
+    chunk_id: str
+    chunk_hash: str
+
+
+class IngestionPipeline:
+    """Streams one document through extraction, chunking, embedding and storage.
+
+    Extracted text is chunked as it arrives and chunks are grouped into
+    batches. Each batch starts embedding as soon as it is complete while the
+    next batches are being extracted; finished batches are written to the
+    vector store and the database in order. At most ``depth`` batches are in
+    flight, so memory stays bounded by the batch size rather than the
+    document size.
+
+    When run for a job, each batch's chunk rows are committed together with
+    a checkpoint on the job. A retry passes a ``ResumePoint``: extraction of
+    a PDF restarts at the page of the last stored chunk, chunks up to the
+    checkpoint are skipped instead of embedded, and the first batch after
+    it replaces any vectors the interrupted attempt added for it.
+    """
+
+    # Whether batches are stored in chunk order, so a stored prefix is a valid checkpoint
+    checkpoints = True
+
+    def __init__(
+        self,
+        session: Session,
+        document: Document,
+        job_id: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        depth: Optional[int] = None,
+        resume: Optional[ResumePoint] = None,
+    ):
+        self.session = session
+        self.document = document
+        self.job_id = job_id
+        self.batch_size = batch_size or settings.EMBEDDING_BATCH_SIZE
+        self.depth = depth or settings.INGESTION_PIPELINE_DEPTH
+        self.resume = resume
+        self.chunks_produced = resume.page_chunk if resume else 0
+        self.chunks_resumed = resume.chunks_committed if resume else 0
+        self.chunks_stored = 0
+        self.chunks_reused = 0
+        # Nothing to verify when the previous attempt stored no chunks
+        self._verified = not self.chunks_resumed
+        self._replace_vectors = resume is not None
+        # Page -> index of its first chunk, for pages not yet checkpointed
+        self._page_starts: dict[int, int] = {}
+
+    async def run(self) -> int:
+        """Run the pipeline to completion.
+
+        Returns:
+            Number of chunks of the document
+
+        Raises:
+            CheckpointMismatchError: If resuming and the document no longer
+                chunks as it did before; the caller should start over
+            Exception: The first error of any stage; the other stages are cancelled
+        """
+        embeddings = get_document_embedding_model()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.depth)
+        in_flight: set[asyncio.Future] = set()
+
+        async def produce():
+            async with aclosing(self._iter_batches()) as batches:
+                async for batch in batches:
+                    task = asyncio.ensure_future(embedding_scheduler.embed(embeddings, [c.text for c in batch]))
+                    in_flight.add(task)
+                    task.add_done_callback(in_flight.discard)
+                    # Blocks while `depth` batches are waiting to be stored
+                    await queue.put((batch, task))
+            await queue.put(None)
+
+        async def consume():
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                batch, task = item
+                await self._store_batch(batch, await task)
+
+        try:
+            async with asyncio.TaskGroup() as group:
+                group.create_task(produce())
+                group.create_task(consume())
+        except BaseExceptionGroup as e:
+            raise e.exceptions[0]
+        finally:
+            # Embedding batches still running when a stage failed
+            for task in list(in_flight):
+                task.cancel()
+        return self.chunks_produced
+
+    async def _iter_chunks(self) -> AsyncIterator[TextChunk]:
+        """Chunk the extracted text as it streams out of the extraction pool."""
+        file_type = detect_file_type(self.document.storage_path, self.document.mime_type)
+        chunker = StreamingSpanChunker(
+            SpanChunker.from_config(get_chunking_config(), markdown=file_type == "md")
+        )
+        start_page = self.resume.page if self.resume and self.resume.page else 1
+        segments = extraction_pool.iter_segments(
+            self.document.storage_path, self.document.mime_type, start_page=start_page
+        )
+        async with aclosing(segments):
+            async for segment in segments:
+                # Tokenizing is CPU bound; keep it off the event loop
+                for chunk in await asyncio.to_thread(chunker.feed, segment.text, segment.page):
+                    yield chunk
+        for chunk in await asyncio.to_thread(chunker.finish):
+            yield chunk
+
+    async def _iter_batches(self) -> AsyncIterator[List[PendingChunk]]:
+        batch: List[PendingChunk] = []
+        async with aclosing(self._iter_chunks()) as chunks:
+            async for chunk in chunks:
+                chunk_hash = hash_text(chunk.text)
+                pending = PendingChunk(
+                    self.chunks_produced,
+                    chunk.text,
+                    chunk.page,
+                    chunk.section,
+                    self._vector_id(self.chunks_produced, chunk_hash),
+                    chunk_hash,
+                )
+                self.chunks_produced += 1
+                if pending.page is not None:
+                    self._page_starts.setdefault(pending.page, pending.index)
+                if self._skip_committed(pending) or self._reuse_existing(pending):
+                    continue
+                batch.append(pending)
+                if len(batch) >= self.batch_size:
+                    yield batch
+                    batch = []
+        if not self._verified:
+            raise CheckpointMismatchError(
+                f"Document {self.document.id} has fewer chunks than its checkpoint ({self.chunks_resumed})"
+            )
+        if batch:
+            yield batch
+
+    def _skip_committed(self, chunk: PendingChunk) -> bool:
+        """Whether the chunk was stored by a previous attempt."""
+        if chunk.index >= self.chunks_resumed:
+            if not self._verified:
+                raise CheckpointMismatchError(f"Checkpoint of document {self.document.id} not reproduced")
+            return False
+        if chunk.index == self.chunks_resumed - 1:
+            if chunk.chunk_hash != self.resume.last_hash:
+                raise CheckpointMismatchError(
+                    f"Chunk {chunk.index} of document {self.document.id} changed since the last attempt"
+                )
+            self._verified = True
+        return True
+
+    def _vector_id(self, chunk_index: int, chunk_hash: str) -> str:
+        return vector_id(self.document.id, chunk_index, chunk_hash)
+
+    def _reuse_existing(self, chunk: PendingChunk) -> bool:
+        """Whether the chunk is already indexed and needs no embedding."""
+        return False
+
+    @staticmethod
+    def _chunk_meta(document: Document, chunk: PendingChunk) -> str:
+        chunk_meta = {
+            "filename": document.filename,
+            "mime_type": document.mime_type,
+        }
+        if chunk.page is not None:
+            chunk_meta["page"] = chunk.page
+        if chunk.section:
+            chunk_meta["section"] = chunk.section
+        return json.dumps(chunk_meta)
+
+    async def _store_batch(self, batch: List[PendingChunk], vectors: List[List[float]]) -> None:
+        """Write one embedded batch to the vector store and the database."""
+        document = self.document
+        langchain_docs = []
+        for chunk in batch:
+            metadata = {
+                "document_id": document.id,
+                "owner_id": document.owner_id,
+                "filename": document.filename,
+                "chunk_index": chunk.index,
+                "chunk_id": chunk.chunk_id,  # Store UUID in metadata for tracking
+            }
+            if chunk.page is not None:
+                metadata["page"] = chunk.page
+            if chunk.section:
+                metadata["section"] = chunk.section
+            langchain_docs.append(LangChainDocument(page_content=chunk.text, metadata=metadata))
+
+        chunk_ids = [chunk.chunk_id for chunk in batch]
+        if self._replace_vectors:
+            # The interrupted attempt may have added this batch without committing its rows
+            await asyncio.to_thread(get_vector_store().delete, ids=chunk_ids)
+            self._replace_vectors = False
+        embedding_ids = await aadd_embedded_documents(langchain_docs, vectors, chunk_ids)
+        # If add_documents doesn't return IDs, use our generated UUIDs
+        if not embedding_ids or len(embedding_ids) != len(chunk_ids):
+            embedding_ids = chunk_ids
+
+        rows = [
+            {
+                "document_id": document.id,
+                "chunk_text": chunk.text,
+                "chunk_index": chunk.index,
+                "chunk_meta": self._chunk_meta(document, chunk),
+                "chunk_hash": chunk.chunk_hash,
+                "embedding_id": str(embedding_id) if embedding_id else None,
+            }
+            for chunk, embedding_id in zip(batch, embedding_ids)
+        ]
+        checkpointed = self.checkpoints and self.job_id is not None
+        # With a checkpoint, the rows are committed together with it below
+        document_crud.insert_document_chunks(self.session, rows, commit=not checkpointed)
+
+        self.chunks_stored += len(batch)
+        if self.job_id is not None:
+            checkpoint = {}
+            if checkpointed:
+                last = batch[-1]
+                checkpoint = {
+                    "chunks_committed": last.index + 1,
+                    "checkpoint_page": last.page,
+                    "checkpoint_page_chunk": self._page_starts.get(last.page, 0),
+                }
+                # Earlier pages can't be resumed from anymore
+                for page in [page for page in self._page_starts if last.page is not None and page < last.page]:
+                    del self._page_starts[page]
+            # The total grows while the document is still being extracted
+            ingestion_crud.update_job_progress(
+                self.session,
+                self.job_id,
+                chunks_embedded=self.chunks_resumed + self.chunks_stored + self.chunks_reused,
+                chunks_total=self.chunks_produced,
+                **checkpoint,
+            )
+
+
+class ReindexPipeline(IngestionPipeline):
+    """Re-chunks an indexed document and embeds only chunks that changed.
+
+    Every new chunk whose text hash matches a stored chunk reuses that row
+    and its vector; only the rest go through embedding. Stored chunks left
+    unmatched at the end are the ones removed from the document. Row
+    positions and deletions are applied by the caller once the run succeeds,
+    so a failed run only has to drop the rows it inserted (ids above the
+    highest existing chunk id).
+
+    Vector store metadata of reused chunks (``chunk_index``, ``page``) keeps
+    the values from when they were embedded; the database rows are updated.
+    """
+
+    # Reused chunks leave gaps in the stored rows, so there is no prefix to resume from
+    checkpoints = False
+
+    def __init__(
+        self,
+        session: Session,
+        document: Document,
+        existing: List[tuple[int, str, Optional[str]]],
+        job_id: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        depth: Optional[int] = None,
+    ):
+        super().__init__(session, document, job_id=job_id, batch_size=batch_size, depth=depth)
+        # chunk_hash -> [(chunk id, embedding id)]; identical chunks may repeat
+        self._existing: dict[str, list[tuple[int, Optional[str]]]] = {}
+        for chunk_id, chunk_hash, embedding_id in existing:
+            self._existing.setdefault(chunk_hash, []).append((chunk_id, embedding_id))
+        self.positions: List[dict] = []
+        # Reused rows keep ids derived from their old positions, which a new chunk
+        # with the same text at such a position would collide with
+        self._run = uuid.uuid4().hex
+
+    def _vector_id(self, chunk_index: int, chunk_hash: str) -> str:
+        return vector_id(self.document.id, chunk_index, chunk_hash, run=self._run)
+
+    def _reuse_existing(self, chunk: PendingChunk) -> bool:
+        rows = self._existing.get(chunk.chunk_hash)
+        if not rows:
+            return False
+        chunk_id, _ = rows.pop()
+        self.positions.append({
+            "id": chunk_id,
+            "chunk_index": chunk.index,
+            "chunk_meta": self._chunk_meta(self.document, chunk),
+            "chunk_hash": chunk.chunk_hash,
+        })
+        self.chunks_reused += 1
+        return True
+
+    @property
+    def removed_chunks(self) -> List[tuple[int, Optional[str]]]:
+        """(chunk id, embedding id) of stored chunks no longer in the document."""
+        return [row for rows in self._existing.values() for row in rows]
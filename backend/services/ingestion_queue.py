@@ -0,0 +1,170 @@
+"""Background ingestion queue with a bounded async worker pool."""
+import asyncio
+from typing import Optional
+from sqlmodel import Session
+from backend.core.config import settings
+from backend.core.db import engine
+from backend.core.logging import logger
+from backend.crud import ingestion_crud
+from backend.models.ingestion import IngestionJob
+
+
+def retry_delay(attempts: int) -> float:
+    """Exponential backoff before retrying a job that failed ``attempts`` times."""
+    delay = settings.INGESTION_RETRY_BACKOFF_SECONDS * 2 ** (attempts - 1)
+    return min(delay, settings.INGESTION_RETRY_BACKOFF_MAX_SECONDS)
+
+
+class IngestionQueue:
+    """Runs ingestion jobs in the background of the app process.
+
+    Jobs are persisted in the ``ingestionjob`` table, so the queue survives
+    restarts and is shared by every app process. Each process runs a fixed
+    number of worker coroutines that claim jobs from the table; ``notify()``
+    wakes them immediately after an upload instead of waiting for the next poll.
+    """
+
+    def __init__(self, concurrency: int, poll_interval: float):
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self._wakeup: Optional[asyncio.Event] = None
+        self._workers: list[asyncio.Task] = []
+
+    @property
+    def running(self) -> bool:
+        """Whether the worker pool has been started."""
+        return bool(self._workers)
+
+    async def start(self) -> None:
+        """Requeue abandoned jobs and spawn the worker pool."""
+        if self.running:
+            return
+
+        self._wakeup = asyncio.Event()
+        self._requeue_stale_jobs()
+
+        self._workers = [
+            asyncio.create_task(self._worker(idx), name=f"ingestion-worker-{idx}")
+            for idx in range(self.concurrency)
+        ]
+        self._workers.append(asyncio.create_task(self._sweeper(), name="ingestion-lease-sweeper"))
+        logger.info(f"Ingestion queue started with {self.concurrency} workers")
+
+    async def stop(self) -> None:
+        """Cancel the worker pool.
+
+        Jobs interrupted here stay in ``processing`` and are requeued by the
+        lease sweep of any running process once their lease expires.
+        """
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        logger.info("Ingestion queue stopped")
+
+    def notify(self) -> None:
+        """Wake idle workers because a new job was enqueued."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _requeue_stale_jobs(self) -> int:
+        """Requeue jobs whose worker stopped renewing its lease.
+
+        Index jobs failed for good get the same cleanup as in ``_run_job``.
+        """
+        # Imported here to avoid a circular import with document_service
+        from backend.services.document_service import abandon_document_ingestion
+
+        with Session(engine) as session:
+            jobs = ingestion_crud.requeue_stale_jobs(
+                session,
+                lease_seconds=settings.INGESTION_JOB_LEASE_SECONDS,
+                max_attempts=settings.INGESTION_MAX_ATTEMPTS,
+            )
+            for job in jobs:
+                if job.status == "failed" and job.kind == "index":
+                    abandon_document_ingestion(session, job.document_id, job.id)
+                    logger.error(f"Ingestion job {job.id} failed: {job.error}")
+        if jobs:
+            logger.info(f"Recovered {len(jobs)} abandoned ingestion jobs")
+            self.notify()
+        return len(jobs)
+
+    async def _sweeper(self) -> None:
+        """Requeue abandoned jobs every lease period until cancelled.
+
+        Jobs left in ``processing`` by a crashed peer process are recovered
+        without waiting for a restart; the sweep locks rows with SKIP LOCKED,
+        so processes sweeping at the same time don't conflict.
+        """
+        while True:
+            await asyncio.sleep(settings.INGESTION_JOB_LEASE_SECONDS)
+            try:
+                self._requeue_stale_jobs()
+            except Exception as e:
+                logger.error(f"Ingestion lease sweep error: {e}")
+
+    async def _worker(self, idx: int) -> None:
+        """Claim and run jobs until cancelled."""
+        while True:
+            try:
+                with Session(engine) as session:
+                    job = ingestion_crud.claim_next_job(session)
+                if job is None:
+                    await self._wait_for_work()
+                    continue
+                await self._run_job(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Ingestion worker {idx} error: {e}")
+                await asyncio.sleep(self.poll_interval)
+
+    async def _wait_for_work(self) -> None:
+        """Sleep until notified or until the next poll is due."""
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+    async def _run_job(self, job: IngestionJob) -> None:
+        """Process the job's document and record the outcome."""
+        # Imported here to avoid a circular import with document_service
+        from backend.services.document_service import (
+            abandon_document_ingestion,
+            process_document,
+            reindex_document,
+        )
+
+        run = reindex_document if job.kind == "reindex" else process_document
+        logger.info(
+            f"Starting {job.kind} job {job.id} for document {job.document_id} (attempt {job.attempts})"
+        )
+        with Session(engine) as session:
+            try:
+                await run(session, job.document_id, job_id=job.id)
+            except Exception as e:
+                # ValueError means the document itself is unusable; anything else
+                # (provider timeouts, crashed workers) is worth another attempt
+                if job.kind == "index" and not isinstance(e, ValueError) and job.attempts < settings.INGESTION_MAX_ATTEMPTS:
+                    delay = retry_delay(job.attempts)
+                    ingestion_crud.retry_job(session, job.id, error=str(e), delay_seconds=delay)
+                    logger.warning(
+                        f"Ingestion job {job.id} failed on attempt {job.attempts}: {e}; "
+                        f"retrying from its last checkpoint in {delay:.0f}s"
+                    )
+                    return
+                if job.kind == "index":
+                    abandon_document_ingestion(session, job.document_id, job.id)
+                ingestion_crud.finish_job(session, job.id, "failed", error=str(e))
+                logger.error(f"Ingestion job {job.id} failed: {e}")
+                return
+            ingestion_crud.finish_job(session, job.id, "completed")
+        logger.info(f"Ingestion job {job.id} completed")
+
+
+ingestion_queue = IngestionQueue(
+    concurrency=settings.INGESTION_WORKERS,
+    poll_interval=settings.INGESTION_POLL_INTERVAL,
+)
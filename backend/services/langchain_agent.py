@@ -1,17 +1,27 @@
 """LangChain chain-based agent service."""
+import asyncio
 from typing import List, Optional, AsyncIterator
 from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 from langchain_community.vectorstores import PGVector, Milvus
 from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
 from langchain_classic.memory import ConversationBufferMemory
 from langchain_classic.chains.conversational_retrieval.base import ConversationalRetrievalChain
 from backend.core.config import settings
+from backend.core.db import engine, get_async_pool
 from backend.core.logging import logger
+from backend.services.chunk_vector_store import ChunkVectorStore
+from backend.services.embedding_cache import CachedEmbeddings
+from backend.services.local_embeddings import LocalEmbeddings
+from backend.services.query_embeddings import QueryEmbeddings
+from backend.services.retrieval import create_live_retriever
 
 
 # Global instances (singleton pattern)
 _llm = None
 _embeddings = None
+_document_embeddings = None
+_query_embeddings = None
 _vector_store = None
 
 
@@ -39,17 +49,82 @@ def get_embedding_model():
                 model=settings.EMBEDDING_MODEL,
                 api_key=settings.OPENAI_API_KEY,
             )
+        elif settings.EMBEDDING_PROVIDER == "local":
+            if not settings.LOCAL_EMBEDDING_MODEL_PATH:
+                raise ValueError("LOCAL_EMBEDDING_MODEL_PATH must be set for the local embedding provider")
+            _embeddings = LocalEmbeddings(
+                settings.LOCAL_EMBEDDING_MODEL_PATH,
+                batch_size=settings.LOCAL_EMBEDDING_BATCH_SIZE,
+                max_wait_ms=settings.LOCAL_EMBEDDING_MAX_WAIT_MS,
+                workers=settings.LOCAL_EMBEDDING_WORKERS or None,
+            )
+            if _embeddings.dimension != settings.VECTOR_DIMENSION:
+                raise ValueError(
+                    f"Local embedding model {_embeddings.model_name} produces {_embeddings.dimension}-dimensional "
+                    f"vectors but VECTOR_DIMENSION is {settings.VECTOR_DIMENSION}"
+                )
+        elif settings.EMBEDDING_PROVIDER == "fake":
+            # Deterministic hash-seeded vectors, no network (benchmarks and local testing)
+            _embeddings = DeterministicFakeEmbedding(size=settings.VECTOR_DIMENSION)
         else:
             raise ValueError(f"Unsupported embedding provider: {settings.EMBEDDING_PROVIDER}")
     return _embeddings
 
 
+def get_document_embedding_model():
+    """Get the embedding model used to index documents.
+    
+    This is the base embedding model, wrapped by the persistent embedding
+    cache when ``EMBEDDING_CACHE_ENABLED`` is set.
+    """
+    global _document_embeddings
+    if _document_embeddings is None:
+        _document_embeddings = get_embedding_model()
+        if settings.EMBEDDING_CACHE_ENABLED:
+            # Local models are keyed by their own name, not the OpenAI model setting
+            model = getattr(_document_embeddings, "model_name", None)
+            _document_embeddings = CachedEmbeddings(_document_embeddings, model=model)
+    return _document_embeddings
+
+
+def get_query_embedding_model():
+    """Get the embedding model used to embed search queries.
+    
+    This is the base embedding model, wrapped by an in-memory memo of recent
+    query vectors that also batches concurrent queries into one request.
+    """
+    global _query_embeddings
+    if _query_embeddings is None:
+        _query_embeddings = QueryEmbeddings(
+            get_embedding_model(),
+            cache_size=settings.QUERY_EMBEDDING_CACHE_SIZE,
+            batch_size=settings.QUERY_EMBEDDING_BATCH_SIZE,
+            max_wait_ms=settings.QUERY_EMBEDDING_MAX_WAIT_MS,
+        )
+    return _query_embeddings
+
+
 def get_vector_store():
     """Get or create vector store instance."""
     global _vector_store
     if _vector_store is None:
-        embeddings = get_embedding_model()
-        if settings.VECTOR_STORE_TYPE == "pgvector":
+        embeddings = get_document_embedding_model()
+        if settings.VECTOR_STORE_TYPE == "pgvector" and settings.PGVECTOR_SCHEMA == "table":
+            _vector_store = ChunkVectorStore(
+                engine,
+                settings.VECTOR_COLLECTION_NAME,
+                embedding_function=embeddings,
+                dimension=settings.VECTOR_DIMENSION,
+                ef_search=settings.PGVECTOR_HNSW_EF_SEARCH,
+                iterative_scan=settings.PGVECTOR_ITERATIVE_SCAN,
+                async_pool=get_async_pool if settings.PGVECTOR_ASYNC_SEARCH else None,
+                prepared=settings.PGVECTOR_PREPARED_QUERIES,
+                timeout_ms=settings.PGVECTOR_SEARCH_TIMEOUT_MS or None,
+                quantization=settings.PGVECTOR_QUANTIZATION,
+                rescore_factor=settings.PGVECTOR_RESCORE_FACTOR,
+            )
+            logger.info("Using pgvector table '%s'", settings.VECTOR_COLLECTION_NAME)
+        elif settings.VECTOR_STORE_TYPE == "pgvector":
             _vector_store = PGVector(
                 connection_string=settings.DATABASE_URL,
                 embedding_function=embeddings,
@@ -87,36 +162,61 @@ def get_vector_store():
     return _vector_store
 
 
-def get_retriever(k: int = 5, user_id: Optional[int] = None):
+def get_retriever(
+    k: int = 5,
+    user_id: Optional[int] = None,
+    mmr_lambda: Optional[float] = None,
+    duplicate_threshold: Optional[float] = None,
+):
     """Get retriever from vector store.
     
+    Hits of deleted documents whose vectors haven't been purged yet are
+    filtered out. Results of a user's searches are cached until the user's
+    documents change.
+    
     Args:
         k: Number of documents to retrieve
         user_id: User ID for filtering documents by owner_id
+        mmr_lambda: MMR relevance weight (default: ``RETRIEVAL_MMR_LAMBDA``)
+        duplicate_threshold: Near-duplicate cutoff (default: ``RETRIEVAL_DUPLICATE_THRESHOLD``)
     """
     vector_store = get_vector_store()
-    search_kwargs = {"k": k}
+    search_kwargs = {}
     
     # Add metadata filter if user_id is provided
     if user_id is not None:
         if settings.VECTOR_STORE_TYPE == "pgvector":
-            # PGVector uses dictionary filter
+            # Dictionary filter: a typed column predicate on the vector table, JSONB on PGVector
             search_kwargs["filter"] = {"owner_id": user_id}
         elif settings.VECTOR_STORE_TYPE == "milvus":
             # Milvus uses expression string
             search_kwargs["expr"] = f'owner_id == {user_id}'
     
-    return vector_store.as_retriever(search_kwargs=search_kwargs)
+    return create_live_retriever(
+        vector_store,
+        k,
+        search_kwargs,
+        owner_id=user_id,
+        embeddings=get_query_embedding_model(),
+        mmr_lambda=mmr_lambda,
+        duplicate_threshold=duplicate_threshold,
+    )
 
 
-def get_qa_chain(user_id: Optional[int] = None):
+def get_qa_chain(
+    user_id: Optional[int] = None,
+    mmr_lambda: Optional[float] = None,
+    duplicate_threshold: Optional[float] = None,
+):
     """Get conversational retrieval chain.
     
     Args:
         user_id: User ID for filtering documents by owner_id
+        mmr_lambda: MMR relevance weight for retrieval
+        duplicate_threshold: Near-duplicate cutoff for retrieval
     """
     llm = get_llm()
-    retriever = get_retriever(user_id=user_id)
+    retriever = get_retriever(user_id=user_id, mmr_lambda=mmr_lambda, duplicate_threshold=duplicate_threshold)
     memory = ConversationBufferMemory(
         memory_key="chat_history",
         return_messages=True,
@@ -139,7 +239,9 @@ def get_qa_chain(user_id: Optional[int] = None):
 def query_agent(
     question: str,
     chat_history: Optional[List[tuple]] = None,
-    user_id: Optional[int] = None
+    user_id: Optional[int] = None,
+    mmr_lambda: Optional[float] = None,
+    duplicate_threshold: Optional[float] = None,
 ) -> dict:
     """Query the agent with a question using ConversationalRetrievalChain.
     
@@ -147,12 +249,14 @@ def query_agent(
         question: User's question
         chat_history: List of (question, answer) tuples
         user_id: User ID for filtering documents
+        mmr_lambda: MMR relevance weight for retrieval
+        duplicate_threshold: Near-duplicate cutoff for retrieval
     
     Returns:
         Dict with answer and sources
     """
     try:
-        chain = get_qa_chain(user_id=user_id)
+        chain = get_qa_chain(user_id=user_id, mmr_lambda=mmr_lambda, duplicate_threshold=duplicate_threshold)
         
         # If chat history exists, add it to memory
         if chat_history:
@@ -200,6 +304,35 @@ def add_documents_to_vector_store(documents: List[Document], user_id: Optional[i
     vector_store.add_documents(documents)
 
 
+async def aadd_embedded_documents(
+    documents: List[Document],
+    embeddings: List[List[float]],
+    ids: List[str],
+) -> List[str]:
+    """Add documents whose embeddings were already computed to the vector store.
+    
+    Args:
+        documents: Document objects to store
+        embeddings: One embedding vector per document
+        ids: Vector store ids to assign
+    
+    Returns:
+        Ids of the stored vectors
+    """
+    vector_store = get_vector_store()
+    if not hasattr(vector_store, "add_embeddings"):
+        # Store cannot take precomputed vectors; let it embed (served from the cache)
+        return await vector_store.aadd_documents(documents, ids=ids)
+    
+    return await asyncio.to_thread(
+        vector_store.add_embeddings,
+        texts=[doc.page_content for doc in documents],
+        embeddings=embeddings,
+        metadatas=[doc.metadata for doc in documents],
+        ids=ids,
+    )
+
+
 def _extract_content_from_chunk(chunk, data: dict) -> Optional[str]:
     """Extract text content from a chunk object."""
     if chunk:
@@ -255,7 +388,9 @@ def _is_final_answer(event_name: str, path_str: str, question_gen_completed: boo
 async def query_agent_stream(
     question: str,
     chat_history: Optional[List[tuple]] = None,
-    user_id: Optional[int] = None
+    user_id: Optional[int] = None,
+    mmr_lambda: Optional[float] = None,
+    duplicate_threshold: Optional[float] = None,
 ) -> AsyncIterator[str]:
     """Query the agent with a question and stream the response token by token.
     
@@ -263,12 +398,14 @@ async def query_agent_stream(
         question: User's question
         chat_history: List of (question, answer) tuples
         user_id: User ID for filtering documents
+        mmr_lambda: MMR relevance weight for retrieval
+        duplicate_threshold: Near-duplicate cutoff for retrieval
     
     Yields:
         Chunks of the answer as strings (token by token)
     """
     try:
-        chain = get_qa_chain(user_id=user_id)
+        chain = get_qa_chain(user_id=user_id, mmr_lambda=mmr_lambda, duplicate_threshold=duplicate_threshold)
         
         # Add chat history to memory
         if chat_history:
@@ -349,7 +486,7 @@ async def query_agent_stream(
         logger.error(f"Error streaming agent response: {e}", exc_info=True)
         # Final fallback
         try:
-            chain = get_qa_chain(user_id=user_id)
+            chain = get_qa_chain(user_id=user_id, mmr_lambda=mmr_lambda, duplicate_threshold=duplicate_threshold)
             if chat_history:
                 for q, a in chat_history:
                     chain.memory.chat_memory.add_user_message(q)
@@ -24,6 +24,8 @@ async def query_agent(
     session_id: Optional[str] = None,
     provider: Optional[str] = None,
     model: Optional[str] = None,
+    mmr_lambda: Optional[float] = None,
+    duplicate_threshold: Optional[float] = None,
 ) -> dict:
     """Query the agent with a question using LangGraph.
     
@@ -32,6 +34,8 @@ async def query_agent(
         chat_history: List of (question, answer) tuples
         user_id: User ID for filtering documents
         session_id: Optional session ID for conversation continuity
+        mmr_lambda: Optional MMR relevance weight for retrieval
+        duplicate_threshold: Optional near-duplicate cutoff for retrieval
     
     Returns:
         Dict with answer and sources
@@ -60,6 +64,8 @@ async def query_agent(
             user_id=user_id,
             provider=provider,
             model=model,
+            mmr_lambda=mmr_lambda,
+            duplicate_threshold=duplicate_threshold,
         )
         
         return response
@@ -75,6 +81,8 @@ async def query_agent_stream(
     session_id: Optional[str] = None,
     provider: Optional[str] = None,
     model: Optional[str] = None,
+    mmr_lambda: Optional[float] = None,
+    duplicate_threshold: Optional[float] = None,
 ) -> AsyncIterator[str]:
     """Query the agent with a question and stream the response token by token using LangGraph.
     
@@ -83,6 +91,8 @@ async def query_agent_stream(
         chat_history: List of (question, answer) tuples
         user_id: User ID for filtering documents
         session_id: Optional session ID for conversation continuity
+        mmr_lambda: Optional MMR relevance weight for retrieval
+        duplicate_threshold: Optional near-duplicate cutoff for retrieval
     
     Yields:
         Chunks of the answer as strings (token by token)
@@ -111,6 +121,8 @@ async def query_agent_stream(
             user_id=user_id,
             provider=provider,
             model=model,
+            mmr_lambda=mmr_lambda,
+            duplicate_threshold=duplicate_threshold,
         ):
             yield chunk
     except Exception as e:
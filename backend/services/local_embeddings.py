@@ -0,0 +1,190 @@
+"""In-process embedding models for ``EMBEDDING_PROVIDER=local``.
+
+A model is a directory. Directories saved by ``sentence-transformers``
+(recognized by their ``modules.json``) are loaded with that library, which
+is an optional dependency. Otherwise the directory holds an
+``embedding_model.json`` manifest:
+
+- ``{"type": "static", ...}``: a static embedding table, ``embeddings.npy``
+  (vocabulary size x dimension) and ``vocab.json`` (token -> row); a text is
+  embedded as the normalized mean of its tokens' rows
+- ``{"type": "hashing", "dimension": 384, "seed": 0}``: signed feature
+  hashing of word unigrams and bigrams. It needs no weights and is fully
+  deterministic; ``backend/embedding_models/tiny-test`` ships one for
+  offline testing
+"""
+import asyncio
+import hashlib
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Optional
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from backend.core.logging import logger
+from backend.utils.batching import MicroBatcher
+
+MANIFEST_FILE = "embedding_model.json"
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def _tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+class HashingModel:
+    """Feature hashing of word unigrams and bigrams into a fixed dimension."""
+
+    def __init__(self, name: str, dimension: int, seed: int = 0):
+        self.name = name
+        self.dimension = dimension
+        self._key = seed.to_bytes(8, "little")
+
+    def _features(self, text: str) -> tuple[np.ndarray, np.ndarray]:
+        tokens = _tokenize(text)
+        features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        digests = np.array(
+            [int.from_bytes(hashlib.blake2b(f.encode(), digest_size=8, key=self._key).digest(), "little")
+             for f in features],
+            dtype=np.uint64,
+        )
+        indices = (digests % np.uint64(self.dimension)).astype(np.int64)
+        signs = np.where((digests >> np.uint64(63)) == 1, -1.0, 1.0).astype(np.float32)
+        return indices, signs
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            indices, signs = self._features(text)
+            np.add.at(vectors[row], indices, signs)
+        return _normalize(vectors)
+
+
+class StaticModel:
+    """Mean of per-token vectors from an embedding table."""
+
+    def __init__(self, name: str, embeddings: np.ndarray, vocab: dict[str, int]):
+        self.name = name
+        self.dimension = embeddings.shape[1]
+        self._embeddings = embeddings.astype(np.float32, copy=False)
+        self._vocab = vocab
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            ids = [self._vocab[token] for token in _tokenize(text) if token in self._vocab]
+            if ids:
+                vectors[row] = self._embeddings[ids].mean(axis=0)
+        return _normalize(vectors)
+
+
+class SentenceTransformerModel:
+    """A ``sentence-transformers`` model run on the CPU."""
+
+    def __init__(self, path: Path):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError:
+            raise ValueError(
+                f"{path} is a sentence-transformers model; install sentence-transformers to load it"
+            )
+        self.name = path.name
+        self._model = SentenceTransformer(str(path), device="cpu")
+        self.dimension = self._model.get_sentence_embedding_dimension()
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        return self._model.encode(
+            texts,
+            batch_size=len(texts),
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+            show_progress_bar=False,
+        )
+
+
+def load_local_model(model_path: str):
+    """Load an embedding model from a directory.
+
+    Raises:
+        ValueError: If the directory is missing or not a supported model
+    """
+    path = Path(model_path)
+    if not path.is_dir():
+        raise ValueError(f"Local embedding model not found: {model_path}")
+    if (path / "modules.json").exists():
+        return SentenceTransformerModel(path)
+
+    manifest_path = path / MANIFEST_FILE
+    if not manifest_path.exists():
+        raise ValueError(f"{model_path} has neither modules.json nor {MANIFEST_FILE}")
+    manifest = json.loads(manifest_path.read_text())
+    name = manifest.get("name", path.name)
+    model_type = manifest.get("type")
+    if model_type == "hashing":
+        return HashingModel(name, int(manifest["dimension"]), int(manifest.get("seed", 0)))
+    if model_type == "static":
+        embeddings = np.load(path / manifest.get("embeddings", "embeddings.npy"))
+        vocab = json.loads((path / manifest.get("vocab", "vocab.json")).read_text())
+        return StaticModel(name, embeddings, vocab)
+    raise ValueError(f"Unknown local embedding model type: {model_type}")
+
+
+class LocalEmbeddings(Embeddings):
+    """Embeds texts in-process with a model loaded from disk.
+
+    Inference runs on a thread pool (numpy and torch release the GIL), in
+    batches of at most ``batch_size`` texts. Async calls go through a
+    ``MicroBatcher``: queries arriving while inference is busy are embedded
+    together in the next batch, waiting at most ``max_wait_ms``.
+
+    Args:
+        model_path: Model directory (see module docstring)
+        batch_size: Texts per inference call
+        max_wait_ms: How long an async request waits for others to batch with
+        workers: Inference threads (default: number of CPU cores)
+    """
+
+    def __init__(self, model_path: str, batch_size: int = 32, max_wait_ms: float = 5.0, workers: Optional[int] = None):
+        self.model = load_local_model(model_path)
+        self.model_name = self.model.name
+        self.dimension = self.model.dimension
+        self.batch_size = batch_size
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers or os.cpu_count() or 1,
+            thread_name_prefix="local-embedding",
+        )
+        self._batcher: MicroBatcher[str, List[float]] = MicroBatcher(
+            self._aencode,
+            max_batch_size=batch_size,
+            max_wait=max_wait_ms / 1000,
+        )
+        logger.info(f"Loaded local embedding model {self.model_name} ({self.dimension} dimensions)")
+
+    def _encode(self, texts: List[str]) -> List[List[float]]:
+        return self.model.encode(texts).tolist()
+
+    async def _aencode(self, texts: List[str]) -> List[List[float]]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._encode, texts)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts, running their batches in parallel."""
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        return [vector for batch in self._executor.map(self._encode, batches) for vector in batch]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._encode([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self._batcher.submit_many(texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await self._batcher.submit(text)
@@ -0,0 +1,79 @@
+"""Splitting compound questions into sub-queries for multi-query retrieval."""
+import re
+from typing import List
+
+_WH_WORDS = r"(?:what|how|why|when|where|which|who|whom|whose|whether)"
+# Boundaries between independent questions: after a question mark, at a
+# semicolon or line break, before "and" / "also" / "as well as" + a new
+# interrogative, and at explicit additions in Korean ("또한", "그리고")
+_SPLIT_RE = re.compile(
+    r"(?<=[?？])\s*|;\s*|\s*\n+\s*|"
+    rf",?\s+(?:and(?: also)?|also|as well as)\s+(?={_WH_WORDS}\b)|"
+    r"\s*(?:그리고|또한|아울러)\s+",
+    re.IGNORECASE,
+)
+# A part has to be a question of its own to be searched on its own
+_QUESTION_RE = re.compile(
+    rf"[?？]|\b{_WH_WORDS}\b|"
+    r"^(?:is|are|was|were|does|do|did|can|could|should|would|will|has|have)\b|"
+    r"무엇|뭐|어떻게|어떤|왜|언제|어디|누구|누가|어느|몇|(?:나요|까요|니까|인가요|은가요|는지)\W*$",
+    re.IGNORECASE,
+)
+# Pronouns referring back to an earlier part; such parts need the model to resolve them
+_PRONOUN_RE = re.compile(
+    r"\b(?:it|its|they|them|their|this|that|these|those|he|she|him|her)\b|그것|이것|그거|이거|그게|이게|그들",
+    re.IGNORECASE,
+)
+_WORD_RE = re.compile(r"\w+")
+_LIST_MARKER_RE = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s*")
+
+_DECOMPOSITION_PROMPT = (
+    "Split the question below into at most {max_queries} self-contained search queries for "
+    "a document search, one per line, without numbering. Resolve pronouns so each query "
+    "stands on its own. If the question asks about a single thing, return it unchanged.\n\n"
+    "Question: {query}"
+)
+
+
+def dedupe_queries(queries: List[str], max_queries: int) -> List[str]:
+    """Drop empty and repeated queries (ignoring case and spacing), keeping the first ``max_queries``."""
+    seen = set()
+    unique = []
+    for query in queries:
+        key = " ".join(query.lower().split())
+        if key and key not in seen:
+            seen.add(key)
+            unique.append(query)
+    return unique[:max_queries]
+
+
+def split_query(query: str, max_queries: int = 4, min_words: int = 2) -> List[str]:
+    """Split a compound question at sentence and conjunction boundaries.
+
+    Parts with fewer than ``min_words`` words are dropped. The split is only
+    kept when every part is a question of its own (it has a question mark or
+    an interrogative) and no part after the first refers back with a
+    pronoun; otherwise the question is left whole for the splitting model.
+
+    Returns:
+        The sub-queries, or ``[query]`` if the question has only one part
+    """
+    parts = [part.strip(" ,.") for part in _SPLIT_RE.split(query.strip())]
+    parts = [part for part in parts if len(_WORD_RE.findall(part)) >= min_words]
+    if len(parts) < 2:
+        return [query]
+    if not all(_QUESTION_RE.search(part) for part in parts):
+        return [query]
+    if any(_PRONOUN_RE.search(part) for part in parts[1:]):
+        return [query]
+    return dedupe_queries(parts, max_queries)
+
+
+def decomposition_prompt(query: str, max_queries: int) -> str:
+    """Prompt asking a model to split ``query`` into sub-queries."""
+    return _DECOMPOSITION_PROMPT.format(query=query, max_queries=max_queries)
+
+
+def parse_sub_queries(text: str, max_queries: int) -> List[str]:
+    """Read one sub-query per line from a model reply, dropping list markers."""
+    return dedupe_queries([_LIST_MARKER_RE.sub("", line).strip() for line in text.splitlines()], max_queries)
@@ -0,0 +1,92 @@
+"""Query embedding layer shared by all retrievals."""
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import List
+from langchain_core.embeddings import Embeddings
+from backend.core.metrics import QUERY_EMBEDDING_BATCHES, QUERY_EMBEDDING_CACHE_HITS, QUERY_EMBEDDING_CACHE_MISSES
+from backend.utils.batching import MicroBatcher
+
+
+class QueryEmbeddings(Embeddings):
+    """Embeddings wrapper that memoizes and batches query embeddings.
+
+    Recent query vectors are kept in an in-memory LRU. Concurrent async
+    requests for the same text share one request, and requests arriving
+    within ``max_wait_ms`` of each other are sent to the provider as one
+    ``aembed_documents`` call whose vectors are handed back to each caller.
+    This assumes the wrapped model embeds queries like documents, which
+    holds for the providers supported here.
+
+    Args:
+        embeddings: Embedding model to wrap
+        cache_size: Query vectors kept in memory (0 disables the memo)
+        batch_size: Largest batch sent to the provider
+        max_wait_ms: How long a request waits for others to batch with
+    """
+
+    def __init__(self, embeddings: Embeddings, cache_size: int = 4096, batch_size: int = 64, max_wait_ms: float = 5.0):
+        self.embeddings = embeddings
+        self.cache_size = cache_size
+        self._vectors: OrderedDict[str, List[float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._in_flight: dict[str, asyncio.Future] = {}
+        self._batcher: MicroBatcher[str, List[float]] = MicroBatcher(
+            self._embed_batch,
+            max_batch_size=batch_size,
+            max_wait=max_wait_ms / 1000,
+        )
+
+    def _get(self, text: str):
+        with self._lock:
+            vector = self._vectors.get(text)
+            if vector is not None:
+                self._vectors.move_to_end(text)
+        if vector is None:
+            QUERY_EMBEDDING_CACHE_MISSES.inc()
+        else:
+            QUERY_EMBEDDING_CACHE_HITS.inc()
+        return vector
+
+    def _put(self, text: str, vector: List[float]) -> None:
+        if not self.cache_size:
+            return
+        with self._lock:
+            self._vectors[text] = vector
+            self._vectors.move_to_end(text)
+            while len(self._vectors) > self.cache_size:
+                self._vectors.popitem(last=False)
+
+    async def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        QUERY_EMBEDDING_BATCHES.inc()
+        return await self.embeddings.aembed_documents(texts)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self.embeddings.aembed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        vector = self._get(text)
+        if vector is None:
+            vector = self.embeddings.embed_query(text)
+            self._put(text, vector)
+        return list(vector)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        vector = self._get(text)
+        if vector is not None:
+            return list(vector)
+        future = self._in_flight.get(text)
+        if future is None:
+            future = asyncio.ensure_future(self._batcher.submit(text))
+            self._in_flight[text] = future
+            future.add_done_callback(lambda done: self._on_done(text, done))
+        # A cancelled caller must not cancel the request other callers wait on
+        return list(await asyncio.shield(future))
+
+    def _on_done(self, text: str, future: asyncio.Future) -> None:
+        self._in_flight.pop(text, None)
+        if not future.cancelled() and future.exception() is None:
+            self._put(text, future.result())
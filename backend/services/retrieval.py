@@ -0,0 +1,474 @@
+"""Vector, lexical and hybrid retrieval that skips deleted documents."""
+import asyncio
+import json
+import re
+import time
+from typing import Any, Hashable, List, Optional
+import numpy as np
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.vectorstores import VectorStore
+from sqlmodel import Session
+from backend.core.config import settings
+from backend.core.db import engine
+from backend.core.logging import logger
+from backend.core.metrics import RETRIEVAL_DUPLICATES_DROPPED, RETRIEVAL_LEXICAL_ONLY, RETRIEVAL_SUB_QUERIES
+from backend.crud import document_crud, search_crud, vector_crud
+from backend.services.diversity import mmr_select, parse_vector, rank_relevance
+from backend.services.retrieval_cache import RetrievalCache, retrieval_cache
+from backend.services.search_planner import ANN, EXACT, SKIP, SearchPlanner, search_planner
+
+
+def filter_live_documents(documents: List[Document]) -> List[Document]:
+    """Drop hits whose chunk no longer belongs to a live document.
+
+    Vectors of tombstoned documents stay in the collection until the vector
+    GC purges them; they are recognized by the ``chunk_id`` stored in their
+    metadata, which is the id the vector was added with. Hits without a
+    ``chunk_id`` are kept.
+    """
+    chunk_ids = [doc.metadata["chunk_id"] for doc in documents if doc.metadata.get("chunk_id")]
+    if not chunk_ids:
+        return documents
+    with Session(engine) as session:
+        live = document_crud.get_live_embedding_ids(session, chunk_ids)
+    return [
+        doc for doc in documents
+        if not doc.metadata.get("chunk_id") or doc.metadata["chunk_id"] in live
+    ]
+
+
+def lexical_search(query: str, k: int, owner_id: Optional[int] = None) -> List[Document]:
+    """Search the chunk text index (see ``LEXICAL_SEARCH_MODE``).
+
+    Hits carry the same metadata as vector store hits, plus their
+    ``lexical_score``.
+    """
+    with Session(engine) as session:
+        rows = search_crud.search_chunks(session, query, k, owner_id=owner_id)
+    documents = []
+    for chunk, document, score in rows:
+        metadata = {
+            "document_id": document.id,
+            "owner_id": document.owner_id,
+            "filename": document.filename,
+            "chunk_index": chunk.chunk_index,
+            "chunk_id": chunk.embedding_id,
+        }
+        chunk_meta = json.loads(chunk.chunk_meta) if chunk.chunk_meta else {}
+        for field in ("page", "section"):
+            if chunk_meta.get(field) is not None:
+                metadata[field] = chunk_meta[field]
+        metadata["lexical_score"] = score
+        documents.append(Document(page_content=chunk.chunk_text, metadata=metadata))
+    return documents
+
+
+def diversify_documents(
+    documents: List[Document],
+    k: int,
+    query_embedding: Optional[List[float]] = None,
+    lambda_mult: float = 1.0,
+    duplicate_threshold: Optional[float] = None,
+) -> List[Document]:
+    """Re-rank candidates by maximal marginal relevance and drop near duplicates.
+
+    Candidate vectors are read from the pgvector store by their
+    ``chunk_id``. With a ``query_embedding`` relevance is the cosine
+    similarity to the query, otherwise it follows the candidate order (for
+    fused hybrid and lexical results). Candidates are returned unchanged
+    when some of their vectors are not available (other vector stores,
+    hits without a ``chunk_id``).
+
+    Args:
+        documents: Candidates, most relevant first
+        k: Documents to return
+        lambda_mult: Weight of relevance against diversity (see ``mmr_select``)
+        duplicate_threshold: Cosine similarity from which chunks count as near duplicates
+    """
+    if len(documents) < 2 or settings.VECTOR_STORE_TYPE != "pgvector":
+        return documents[:k]
+    chunk_ids = [doc.metadata.get("chunk_id") for doc in documents]
+    if not all(chunk_ids):
+        return documents[:k]
+    with Session(engine) as session:
+        stored = vector_crud.get_vectors(session, settings.VECTOR_COLLECTION_NAME, chunk_ids)
+    if len(stored) < len(set(chunk_ids)):
+        return documents[:k]
+    vectors = np.stack([parse_vector(stored[chunk_id]) for chunk_id in chunk_ids])
+    duplicates: List[int] = []
+    picked = mmr_select(
+        vectors,
+        k,
+        query=query_embedding,
+        relevance=None if query_embedding is not None else rank_relevance(len(documents)),
+        lambda_mult=lambda_mult,
+        duplicate_threshold=duplicate_threshold,
+        dropped=duplicates,
+    )
+    if duplicates:
+        RETRIEVAL_DUPLICATES_DROPPED.inc(len(duplicates))
+    return [documents[i] for i in picked]
+
+
+def reciprocal_rank_fusion(rankings: List[List[Document]], k: int = 60) -> List[Document]:
+    """Merge ranked result lists by reciprocal rank fusion.
+
+    Each document scores ``sum(1 / (k + rank))`` over the lists it appears
+    in (ranks start at 1), so documents ranked high by several retrievers
+    come first without having to compare their raw scores. Documents are
+    identified by their ``chunk_id`` (or their text); the first occurrence
+    is kept.
+    """
+    scores: dict[str, float] = {}
+    documents: dict[str, Document] = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, start=1):
+            key = doc.metadata.get("chunk_id") or doc.page_content
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+            documents.setdefault(key, doc)
+    return [documents[key] for key in sorted(scores, key=scores.get, reverse=True)]
+
+
+async def multi_query_retrieve(
+    retriever: BaseRetriever,
+    queries: List[str],
+    limit: int,
+    rrf_k: int = 60,
+) -> List[Document]:
+    """Search several queries concurrently and fuse their results.
+
+    Each query goes through ``retriever`` (and its cache) on its own; their
+    query embeddings are requested together, so the query embedding model
+    can batch them. The rankings are merged by reciprocal rank fusion, which
+    also dedupes chunks found by several queries. A failed query is left
+    out unless all of them fail.
+
+    Args:
+        limit: Most documents to return
+
+    Raises:
+        Exception: The error of the first query, if every query failed
+    """
+    RETRIEVAL_SUB_QUERIES.inc(len(queries))
+    results = await asyncio.gather(*(retriever.ainvoke(query) for query in queries), return_exceptions=True)
+    rankings = []
+    for query, result in zip(queries, results):
+        if isinstance(result, BaseException):
+            logger.warning(f"Sub-query failed, fusing the other results: '{query[:50]}': {result!r}")
+        else:
+            rankings.append(result)
+    if not rankings:
+        raise results[0]
+    return reciprocal_rank_fusion(rankings, k=rrf_k)[:limit]
+
+
+_IDENTIFIER_RE = re.compile(r"^(?=[\w.:/#-]*[\d_.:/#-])[\w.:/#-]+$|^[A-Z][A-Z0-9]+$")
+
+
+def is_keyword_query(query: str) -> bool:
+    """Whether a query looks like a lookup of exact terms.
+
+    That is a quoted phrase, or at most three tokens that each look like an
+    identifier: error codes, versions, paths, ``snake_case`` names and
+    acronyms (``ERR-1234``, ``v2.1``, ``HTTP 502``).
+    """
+    query = query.strip()
+    if len(query) > 2 and query[0] == query[-1] == '"':
+        return True
+    tokens = query.split()
+    return 0 < len(tokens) <= 3 and all(_IDENTIFIER_RE.match(token) for token in tokens)
+
+
+class LiveChunkRetriever(BaseRetriever):
+    """Similarity search that only returns chunks of live documents.
+
+    The query is embedded once, with ``embeddings`` if given and the vector
+    store's embedding model otherwise. If hits of deleted documents leave fewer
+    than ``k`` results, the search is repeated with twice as many
+    candidates, up to ``max_fetch_k``.
+
+    In ``lexical`` mode the chunk text index is searched instead. In
+    ``hybrid`` mode both are searched for ``candidates`` hits each and the
+    lists are merged by reciprocal rank fusion. Keyword-style queries with
+    enough lexical hits skip the embedding call, and if embedding the query
+    fails or takes longer than ``embedding_timeout`` the lexical hits are
+    returned alone.
+
+    With an ``owner_id`` and a ``cache``, results are cached under the
+    owner's corpus version, so they are reused until one of the owner's
+    documents is indexed or deleted. With an ``owner_id`` and a
+    ``planner``, searches of owners without indexed chunks return
+    nothing right away and small corpora are scanned exactly instead of
+    through the vector store (see ``SearchPlanner``).
+
+    With an ``mmr_lambda`` or a ``duplicate_threshold``, ``diversity_candidates``
+    results are searched and reduced to ``k`` by maximal marginal relevance,
+    leaving out near duplicates (see ``diversify_documents``).
+    """
+
+    vector_store: VectorStore
+    k: int = 5
+    max_fetch_k: int = 100
+    search_kwargs: dict[str, Any] = {}
+    embeddings: Optional[Embeddings] = None
+    owner_id: Optional[int] = None
+    cache: Optional[RetrievalCache] = None
+    mode: str = "vector"
+    candidates: int = 20
+    rrf_k: int = 60
+    embedding_timeout: Optional[float] = None
+    planner: Optional[SearchPlanner] = None
+    mmr_lambda: Optional[float] = None
+    duplicate_threshold: Optional[float] = None
+    diversity_candidates: int = 20
+
+    def _prepare(self, query: str) -> tuple[Optional[List[Document]], Optional[Hashable], Optional[int], str]:
+        """Look the query up in the cache and plan the search.
+
+        Returns:
+            Cached results (or None), the cache key, the owner's corpus version and the plan
+        """
+        if self.owner_id is None or (self.cache is None and self.planner is None):
+            return None, None, None, ANN
+        with Session(engine) as session:
+            version, chunks = document_crud.get_corpus_version(session, self.owner_id)
+        key = None
+        if self.cache is not None:
+            filters = json.dumps(self.search_kwargs, sort_keys=True, default=str)
+            key = self.cache.make_key(
+                self.owner_id, query, self.k, version, self.mode, filters, self.mmr_lambda, self.duplicate_threshold
+            )
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached, key, version, ANN
+        plan = self.planner.plan(self.owner_id, version, chunks) if self.planner is not None else ANN
+        return None, key, version, plan
+
+    def _next_fetch_k(self, k: int, fetch_k: int, hits: int, live: int) -> int:
+        """Candidates for the next search, or 0 when the results are final."""
+        if live >= k or hits < fetch_k or fetch_k >= self.max_fetch_k:
+            return 0
+        return min(fetch_k * 2, self.max_fetch_k)
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        cached, key, version, plan = self._prepare(query)
+        if cached is not None:
+            return cached
+        started = time.perf_counter()
+        documents, complete = self._search(query, version, plan)
+        if key is not None and complete:
+            self.cache.put(key, documents, time.perf_counter() - started)
+        return documents
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        cached, key, version, plan = await asyncio.to_thread(self._prepare, query)
+        if cached is not None:
+            return cached
+        started = time.perf_counter()
+        documents, complete = await self._asearch(query, version, plan)
+        # Lexical fallbacks are not cached, so the next query gets vector results again
+        if key is not None and complete:
+            self.cache.put(key, documents, time.perf_counter() - started)
+        return documents
+
+    @property
+    def _query_embeddings(self) -> Embeddings:
+        return self.embeddings or self.vector_store.embeddings
+
+    @property
+    def _diversify(self) -> bool:
+        return self.mmr_lambda is not None or self.duplicate_threshold is not None
+
+    @property
+    def _fetch_k(self) -> int:
+        """Results searched for, before diversification."""
+        return max(self.k, self.diversity_candidates) if self._diversify else self.k
+
+    def _lexical_only(self, query: str, lexical: List[Document]) -> bool:
+        """Whether lexical hits can answer a keyword-style query on their own."""
+        if len(lexical) >= self.k and is_keyword_query(query):
+            RETRIEVAL_LEXICAL_ONLY.labels(reason="keyword").inc()
+            return True
+        return False
+
+    def _fuse(self, lexical: List[Document], vector: List[Document]) -> List[Document]:
+        return reciprocal_rank_fusion([vector, lexical], k=self.rrf_k)[:self._fetch_k]
+
+    def _select(self, documents: List[Document], embedding: Optional[List[float]]) -> List[Document]:
+        """Reduce candidates to ``k`` results.
+
+        Args:
+            embedding: Query embedding when the candidates are in vector similarity order
+        """
+        if not self._diversify:
+            return documents[:self.k]
+        return diversify_documents(
+            documents,
+            self.k,
+            query_embedding=embedding,
+            lambda_mult=1.0 if self.mmr_lambda is None else self.mmr_lambda,
+            duplicate_threshold=self.duplicate_threshold,
+        )
+
+    def _search(self, query: str, version: Optional[int], plan: str) -> tuple[List[Document], bool]:
+        """Search according to ``mode`` and the planner's ``plan``.
+
+        Returns:
+            The results and whether they are complete (False for a lexical fallback)
+        """
+        documents, complete, embedding = self._search_candidates(query, version, plan)
+        return self._select(documents, embedding), complete
+
+    async def _asearch(self, query: str, version: Optional[int], plan: str) -> tuple[List[Document], bool]:
+        """Async variant of ``_search``."""
+        documents, complete, embedding = await self._asearch_candidates(query, version, plan)
+        if self._diversify and len(documents) > 1:
+            return await asyncio.to_thread(self._select, documents, embedding), complete
+        return self._select(documents, embedding), complete
+
+    def _search_candidates(
+        self, query: str, version: Optional[int], plan: str
+    ) -> tuple[List[Document], bool, Optional[List[float]]]:
+        """Candidates for ``_select``.
+
+        Returns:
+            The candidates, whether they are complete, and the query embedding
+            if the candidates are in vector similarity order
+        """
+        if plan == SKIP:
+            return [], True, None
+        fetch_k = self._fetch_k
+        if self.mode == "vector":
+            embedding = self._query_embeddings.embed_query(query)
+            return self._vector_search(embedding, fetch_k, version, plan), True, embedding
+        candidates = max(self.candidates, fetch_k)
+        lexical = lexical_search(query, fetch_k if self.mode == "lexical" else candidates, self.owner_id)
+        if self.mode == "lexical" or self._lexical_only(query, lexical):
+            return lexical[:fetch_k], True, None
+        try:
+            embedding = self._query_embeddings.embed_query(query)
+        except Exception as e:
+            logger.warning(f"Query embedding failed, returning lexical results only: {e}")
+            RETRIEVAL_LEXICAL_ONLY.labels(reason="embedding_error").inc()
+            return lexical[:fetch_k], False, None
+        return self._fuse(lexical, self._vector_search(embedding, candidates, version, plan)), True, None
+
+    async def _asearch_candidates(
+        self, query: str, version: Optional[int], plan: str
+    ) -> tuple[List[Document], bool, Optional[List[float]]]:
+        """Async variant of ``_search_candidates``."""
+        if plan == SKIP:
+            return [], True, None
+        fetch_k = self._fetch_k
+        if self.mode == "vector":
+            embedding = await self._query_embeddings.aembed_query(query)
+            return await self._avector_search(embedding, fetch_k, version, plan), True, embedding
+        if self.mode == "lexical":
+            return await asyncio.to_thread(lexical_search, query, fetch_k, self.owner_id), True, None
+        
+        def embed() -> asyncio.Future:
+            return asyncio.ensure_future(
+                asyncio.wait_for(self._query_embeddings.aembed_query(query), timeout=self.embedding_timeout)
+            )
+
+        # Embed while the lexical search runs, unless lexical hits may be enough
+        candidates = max(self.candidates, fetch_k)
+        embedding_task = None if is_keyword_query(query) else embed()
+        try:
+            lexical = await asyncio.to_thread(lexical_search, query, candidates, self.owner_id)
+        except BaseException:
+            if embedding_task is not None:
+                embedding_task.cancel()
+            raise
+        if embedding_task is None:
+            if self._lexical_only(query, lexical):
+                return lexical[:fetch_k], True, None
+            embedding_task = embed()
+        try:
+            embedding = await embedding_task
+        except Exception as e:
+            reason = "embedding_timeout" if isinstance(e, asyncio.TimeoutError) else "embedding_error"
+            logger.warning(f"Query embedding failed ({reason}), returning lexical results only: {e!r}")
+            RETRIEVAL_LEXICAL_ONLY.labels(reason=reason).inc()
+            return lexical[:fetch_k], False, None
+        vector = await self._avector_search(embedding, candidates, version, plan)
+        return self._fuse(lexical, vector), True, None
+
+    def _vector_search(self, embedding: List[float], k: int, version: Optional[int], plan: str) -> List[Document]:
+        if plan == EXACT:
+            # The owner's matrix only holds chunks of documents live at this version
+            return self.planner.exact_search(self.owner_id, version, embedding, k)
+        fetch_k = k
+        while True:
+            hits = self.vector_store.similarity_search_by_vector(embedding, k=fetch_k, **self.search_kwargs)
+            live = filter_live_documents(hits)
+            fetch_k = self._next_fetch_k(k, fetch_k, len(hits), len(live))
+            if not fetch_k:
+                return live[:k]
+
+    async def _avector_search(self, embedding: List[float], k: int, version: Optional[int], plan: str) -> List[Document]:
+        if plan == EXACT:
+            return await asyncio.to_thread(self.planner.exact_search, self.owner_id, version, embedding, k)
+        fetch_k = k
+        while True:
+            hits = await self.vector_store.asimilarity_search_by_vector(embedding, k=fetch_k, **self.search_kwargs)
+            live = await asyncio.to_thread(filter_live_documents, hits)
+            fetch_k = self._next_fetch_k(k, fetch_k, len(hits), len(live))
+            if not fetch_k:
+                return live[:k]
+
+
+def create_live_retriever(
+    vector_store: VectorStore,
+    k: int,
+    search_kwargs: dict[str, Any],
+    owner_id: Optional[int] = None,
+    embeddings: Optional[Embeddings] = None,
+    mmr_lambda: Optional[float] = None,
+    duplicate_threshold: Optional[float] = None,
+) -> LiveChunkRetriever:
+    """Create a retriever that excludes tombstoned documents, searching per ``RETRIEVAL_MODE``.
+
+    Args:
+        owner_id: Owner the search is restricted to; enables the retrieval cache
+        embeddings: Model to embed the query with (default: the vector store's)
+        mmr_lambda: MMR relevance weight for this search (default: ``RETRIEVAL_MMR_LAMBDA``)
+        duplicate_threshold: Near-duplicate cosine cutoff for this search
+            (default: ``RETRIEVAL_DUPLICATE_THRESHOLD``)
+
+    Raises:
+        ValueError: If the retrieval mode, ``mmr_lambda`` or ``duplicate_threshold`` is invalid
+    """
+    if settings.RETRIEVAL_MODE not in ("vector", "lexical", "hybrid"):
+        raise ValueError(f"Unsupported retrieval mode: {settings.RETRIEVAL_MODE}")
+    if settings.RETRIEVAL_DIVERSIFY:
+        mmr_lambda = settings.RETRIEVAL_MMR_LAMBDA if mmr_lambda is None else mmr_lambda
+        if duplicate_threshold is None:
+            duplicate_threshold = settings.RETRIEVAL_DUPLICATE_THRESHOLD or None
+    if mmr_lambda is not None and not 0.0 <= mmr_lambda <= 1.0:
+        raise ValueError("mmr_lambda must be between 0 and 1")
+    if duplicate_threshold is not None and not -1.0 <= duplicate_threshold <= 1.0:
+        raise ValueError("duplicate_threshold must be between -1 and 1")
+    diversity_candidates = max(settings.RETRIEVAL_DIVERSITY_CANDIDATES, k)
+    return LiveChunkRetriever(
+        vector_store=vector_store,
+        k=k,
+        max_fetch_k=max(settings.RETRIEVAL_MAX_FETCH_K, k, settings.RETRIEVAL_HYBRID_CANDIDATES, diversity_candidates),
+        search_kwargs=search_kwargs,
+        embeddings=embeddings,
+        owner_id=owner_id,
+        cache=retrieval_cache if settings.RETRIEVAL_CACHE_ENABLED else None,
+        mode=settings.RETRIEVAL_MODE,
+        candidates=max(settings.RETRIEVAL_HYBRID_CANDIDATES, k),
+        rrf_k=settings.RETRIEVAL_RRF_K,
+        embedding_timeout=settings.RETRIEVAL_EMBEDDING_TIMEOUT_SECONDS or None,
+        planner=search_planner if settings.SEARCH_PLANNER_ENABLED else None,
+        mmr_lambda=mmr_lambda,
+        duplicate_threshold=duplicate_threshold,
+        diversity_candidates=diversity_candidates,
+    )
@@ -0,0 +1,97 @@
+"""In-memory cache of retrieval results."""
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Hashable, List, Optional
+from langchain_core.documents import Document
+from backend.core.config import settings
+from backend.core.metrics import RETRIEVAL_CACHE_HITS, RETRIEVAL_CACHE_MISSES, RETRIEVAL_CACHE_SAVED_SECONDS
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def normalize_query(query: str) -> str:
+    """Normalize a query for cache lookups: case, punctuation and spacing are ignored."""
+    return " ".join(_TOKEN_RE.findall(query.lower()))
+
+
+@dataclass
+class _Entry:
+    documents: List[Document]
+    compute_seconds: float
+    expires_at: float
+
+
+class RetrievalCache:
+    """LRU cache of retrieval results with a time-to-live.
+
+    Keys include the owner's corpus version, which changes whenever one of
+    the owner's documents is indexed or deleted, so a cached result is never
+    served for a corpus it was not computed on; entries of old versions are
+    simply never hit again and age out.
+
+    Args:
+        max_entries: Entries kept before the least recently used is evicted
+        ttl_seconds: Lifetime of an entry
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[Hashable, _Entry] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(owner_id: int, query: str, k: int, corpus_version: int, *extra: Hashable) -> Hashable:
+        """Build the cache key of a retrieval.
+
+        Args:
+            extra: Anything else the results depend on (e.g. the search filter)
+        """
+        return (owner_id, normalize_query(query), k, corpus_version, *extra)
+
+    def get(self, key: Hashable) -> Optional[List[Document]]:
+        """Get cached results, recording a hit or a miss.
+
+        Returns:
+            Copies of the cached documents, or None
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= now:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                RETRIEVAL_CACHE_MISSES.inc()
+                return None
+            self._entries.move_to_end(key)
+        RETRIEVAL_CACHE_HITS.inc()
+        RETRIEVAL_CACHE_SAVED_SECONDS.inc(entry.compute_seconds)
+        # Callers may modify the documents they get
+        return [doc.model_copy(deep=True) for doc in entry.documents]
+
+    def put(self, key: Hashable, documents: List[Document], compute_seconds: float) -> None:
+        """Cache results along with how long they took to compute."""
+        entry = _Entry(
+            documents=[doc.model_copy(deep=True) for doc in documents],
+            compute_seconds=compute_seconds,
+            expires_at=time.monotonic() + self.ttl_seconds,
+        )
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+retrieval_cache = RetrievalCache(
+    max_entries=settings.RETRIEVAL_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.RETRIEVAL_CACHE_TTL_SECONDS,
+)
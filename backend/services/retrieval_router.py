@@ -0,0 +1,170 @@
+"""Decides whether a chat turn needs document retrieval."""
+import asyncio
+import re
+import threading
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional
+from backend.core.config import settings
+from backend.core.logging import logger
+from backend.core.metrics import (
+    RETRIEVAL_ROUTE_DECISIONS,
+    RETRIEVAL_ROUTE_FALSE_SKIPS,
+    RETRIEVAL_ROUTE_SAVED_SECONDS,
+)
+
+RETRIEVE = "retrieve"
+SKIP = "skip"
+
+# Whole-message small talk: greetings, thanks, acknowledgements, goodbyes
+_SMALL_TALK_RE = re.compile(
+    r"^(?:hi|hello|hey|yo|good (?:morning|afternoon|evening)|thanks?(?: you)?(?: (?:so|very) much)?|thx|ty|"
+    r"ok(?:ay)?|cool|great|nice|perfect|got it|understood|sounds good|awesome|bye|goodbye|see you|"
+    r"안녕(?:하세요)?|반가워(?:요)?|감사(?:합니다|해요)?|고마워(?:요)?|고맙습니다|알겠(?:어|어요|습니다)|"
+    r"좋아(?:요)?|네|넵|응|ㅇㅋ|오케이|수고(?:하셨습니다|하세요)?|잘 ?가(?:요)?)"
+    r"[\s!.~,?ㅎㅋ^]*$",
+    re.IGNORECASE,
+)
+# Requests to rework the previous answer rather than to look something up
+_REFORMAT_RE = re.compile(
+    r"^(?:(?:please|can you|could you)\s+)?(?:"
+    r"(?:make it|make that|now)\s+(?:shorter|longer|simpler|more concise|more formal|more casual)|"
+    r"(?:shorten|summarize|rephrase|reword|simplify|translate)\s+(?:it|that|this|the (?:answer|above))"
+    r"(?:\s+(?:to|into)\s+\w+)?|"
+    r"(?:format|put|show|write|rewrite)\s+(?:it|that|this)\s+(?:as|in(?:to)?)\s+.+|"
+    r"(?:as|in)\s+(?:a\s+)?(?:table|list|bullet(?:s| points)?|markdown|json|english|korean)|"
+    r"(?:in\s+)?(?:english|korean)(?:\s+please)?|tl;?dr|"
+    r"(?:더\s*)?(?:짧게|길게|간단히|쉽게|자세히)(?:\s*(?:써|말해|정리해|설명해))?\s*(?:줘|주세요)?|"
+    r"(?:표로|목록으로|영어로|한국어로|한글로)\s*(?:정리해|바꿔|번역해|써)?\s*(?:줘|주세요)?|"
+    r"(?:위\s*)?(?:내용|답변)(?:을|를)?\s*(?:요약|번역|정리)해\s*(?:줘|주세요)"
+    r")[\s!.?]*$",
+    re.IGNORECASE,
+)
+_WORD_RE = re.compile(r"\w+")
+
+_SCORING_PROMPT = (
+    "You route questions for an assistant that answers from the user's uploaded documents. "
+    "Reply with only a number between 0 and 1: the probability that answering the message "
+    "below needs a search of those documents.\n\nMessage: {query}"
+)
+
+
+@dataclass
+class RouteDecision:
+    """Whether to retrieve for a chat turn, and why."""
+    route: str
+    reason: str
+    score: Optional[float] = None
+
+
+def scoring_prompt(query: str) -> str:
+    """Prompt asking a small model whether ``query`` needs the documents."""
+    return _SCORING_PROMPT.format(query=query)
+
+
+def parse_score(text: str) -> Optional[float]:
+    """Read a probability from a scoring model reply."""
+    match = re.search(r"\d*\.?\d+", text)
+    if not match:
+        return None
+    score = float(match.group())
+    return score if 0.0 <= score <= 1.0 else None
+
+
+class RetrievalRouter:
+    """Rule-based retrieval routing with optional small-model scoring.
+
+    Small talk and, once an answer exists, requests to reformat it skip
+    retrieval. Messages longer than ``max_scored_words`` are always
+    retrieved for. Shorter ones are scored by ``scorer`` when one is given
+    (a small model estimating whether the documents are needed) and
+    retrieved for otherwise; scoring failures and timeouts retrieve.
+
+    A wrong skip is still recoverable, since the chat model can call the
+    retrieval tool itself; such calls are counted as false skips. The time
+    saved by a skip is estimated from the running average duration of
+    retrievals.
+
+    Args:
+        threshold: Scores below this skip retrieval
+        max_scored_words: Longest message that is scored instead of retrieved for
+        timeout: Seconds to wait for the scorer
+    """
+
+    def __init__(self, threshold: float = 0.5, max_scored_words: int = 12, timeout: float = 1.0):
+        self.threshold = threshold
+        self.max_scored_words = max_scored_words
+        self.timeout = timeout
+        self._average_retrieval_seconds: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def classify(self, query: str, has_answer: bool = False) -> Optional[RouteDecision]:
+        """Apply the rules.
+
+        Args:
+            has_answer: Whether the conversation already has an assistant answer
+
+        Returns:
+            The decision, or None when the rules leave it to the scorer
+        """
+        text = query.strip()
+        if not _WORD_RE.search(text):
+            return RouteDecision(SKIP, "empty")
+        if _SMALL_TALK_RE.match(text):
+            return RouteDecision(SKIP, "small_talk")
+        if has_answer and _REFORMAT_RE.match(text):
+            return RouteDecision(SKIP, "reformat")
+        if len(_WORD_RE.findall(text)) > self.max_scored_words:
+            return RouteDecision(RETRIEVE, "long_query")
+        return None
+
+    async def route(
+        self,
+        query: str,
+        has_answer: bool = False,
+        scorer: Optional[Callable[[str], Awaitable[Optional[float]]]] = None,
+    ) -> RouteDecision:
+        """Decide whether to retrieve for ``query`` and record the decision.
+
+        Args:
+            has_answer: Whether the conversation already has an assistant answer
+            scorer: Coroutine function returning the probability that the
+                documents are needed, or None if it cannot tell
+        """
+        decision = self.classify(query, has_answer)
+        if decision is None and scorer is not None:
+            try:
+                score = await asyncio.wait_for(scorer(query), timeout=self.timeout)
+            except Exception as e:
+                logger.warning(f"Retrieval scoring failed, retrieving: {e!r}")
+                score = None
+            if score is None:
+                decision = RouteDecision(RETRIEVE, "score_unavailable")
+            else:
+                decision = RouteDecision(RETRIEVE if score >= self.threshold else SKIP, "score", score)
+        elif decision is None:
+            decision = RouteDecision(RETRIEVE, "default")
+
+        RETRIEVAL_ROUTE_DECISIONS.labels(route=decision.route, reason=decision.reason).inc()
+        if decision.route == SKIP:
+            with self._lock:
+                saved = self._average_retrieval_seconds
+            if saved is not None:
+                RETRIEVAL_ROUTE_SAVED_SECONDS.inc(saved)
+        return decision
+
+    def record_retrieval(self, seconds: float) -> None:
+        """Feed the duration of a retrieval into the running average."""
+        with self._lock:
+            average = self._average_retrieval_seconds
+            self._average_retrieval_seconds = seconds if average is None else 0.9 * average + 0.1 * seconds
+
+    def record_false_skip(self, reason: str) -> None:
+        """Count a skipped turn whose answer went on to retrieve after all."""
+        RETRIEVAL_ROUTE_FALSE_SKIPS.labels(reason=reason).inc()
+
+
+retrieval_router = RetrievalRouter(
+    threshold=settings.RETRIEVAL_ROUTER_THRESHOLD,
+    max_scored_words=settings.RETRIEVAL_ROUTER_MAX_SCORED_WORDS,
+    timeout=settings.RETRIEVAL_ROUTER_TIMEOUT_SECONDS,
+)
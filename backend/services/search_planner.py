@@ -0,0 +1,223 @@
+"""Per-owner choice of how to run a vector search."""
+import json
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional
+import numpy as np
+from langchain_core.documents import Document
+from sqlmodel import Session
+from backend.core.config import settings
+from backend.core.db import engine
+from backend.core.logging import logger
+from backend.core.metrics import SEARCH_PLANS
+from backend.crud import document_crud, vector_crud
+from backend.services.diversity import parse_vector
+
+SKIP = "skip"
+EXACT = "exact"
+ANN = "ann"
+
+
+@dataclass
+class OwnerMatrix:
+    """Normalized vectors of an owner's chunks, memory-mapped from disk."""
+    version: int
+    ids: List[str]
+    vectors: np.ndarray
+
+
+class SearchPlanner:
+    """Picks a search strategy per owner from their corpus statistics.
+
+    - ``skip``: the owner has no chunks of live documents, so there is
+      nothing to embed the query for
+    - ``exact``: the owner has at most ``exact_max_chunks`` chunks and their
+      matrix is built; their vectors are scanned with NumPy, which is exact
+      and avoids the shared ANN index and its JSONB filter
+    - ``ann``: everything else goes to the vector store
+
+    The chunk count is recorded with the owner's corpus version when their
+    documents change (see ``document_crud.bump_corpus_version``), so planning
+    costs no query of its own. Matrices are tied to the corpus version too;
+    they are built in a background thread, scheduled by the ingestion side
+    after a document is indexed or by a search that finds the matrix
+    missing, which uses the ANN index until it is ready. Matrices are
+    written to ``directory`` as ``.npy`` files and memory-mapped, which lets
+    the app processes of one host share them through the page cache. Exact
+    scans need pgvector; with other vector stores large and small owners
+    alike use ``ann``.
+
+    Args:
+        directory: Where owner matrices are stored
+        exact_max_chunks: Largest corpus scanned exactly (0 disables exact scans)
+        max_owners: Owners whose matrices are kept in memory
+    """
+
+    def __init__(self, directory: str, exact_max_chunks: int, max_owners: int = 1024):
+        self.directory = Path(directory)
+        self.exact_max_chunks = exact_max_chunks
+        self.max_owners = max_owners
+        self._matrices: OrderedDict[int, OwnerMatrix] = OrderedDict()
+        self._lock = threading.Lock()
+        self._builder: Optional[ThreadPoolExecutor] = None
+        self._scheduled: set[tuple[int, Optional[int]]] = set()
+
+    @staticmethod
+    def _remember(entries: OrderedDict, owner_id: int, value, limit: int) -> None:
+        entries[owner_id] = value
+        entries.move_to_end(owner_id)
+        while len(entries) > limit:
+            entries.popitem(last=False)
+
+    def _exact_eligible(self, chunks: Optional[int]) -> bool:
+        return (
+            settings.VECTOR_STORE_TYPE == "pgvector"
+            and chunks is not None
+            and chunks <= self.exact_max_chunks
+        )
+
+    def plan(self, owner_id: int, version: int, chunks: Optional[int]) -> str:
+        """Choose the strategy for a search of ``owner_id``'s documents.
+
+        Args:
+            version: The owner's corpus version
+            chunks: Chunks of the owner's live documents at ``version`` (None if unknown)
+        """
+        if chunks == 0:
+            strategy = SKIP
+        elif self._exact_eligible(chunks) and self._matrix_ready(owner_id, version):
+            strategy = EXACT
+        else:
+            if self._exact_eligible(chunks):
+                self.schedule_build(owner_id, version)
+            strategy = ANN
+        SEARCH_PLANS.labels(strategy=strategy).inc()
+        return strategy
+
+    def _matrix_ready(self, owner_id: int, version: int) -> bool:
+        """Whether the owner's matrix at ``version`` is in memory or on disk."""
+        with self._lock:
+            matrix = self._matrices.get(owner_id)
+        if matrix is not None and matrix.version == version:
+            return True
+        path = self._matrix_path(owner_id, version)
+        return path.with_suffix(".npy").exists() and path.with_suffix(".json").exists()
+
+    def schedule_build(self, owner_id: int, version: Optional[int] = None) -> None:
+        """Build an owner's matrix in the background if their corpus is scanned exactly.
+
+        Args:
+            version: Corpus version to build; None reads the current one first
+        """
+        if self.exact_max_chunks <= 0 or settings.VECTOR_STORE_TYPE != "pgvector":
+            return
+        key = (owner_id, version)
+        with self._lock:
+            if key in self._scheduled:
+                return
+            self._scheduled.add(key)
+            if self._builder is None:
+                self._builder = ThreadPoolExecutor(max_workers=1, thread_name_prefix="search-matrix")
+            builder = self._builder
+        builder.submit(self._build_scheduled, owner_id, version)
+
+    def _build_scheduled(self, owner_id: int, version: Optional[int]) -> None:
+        try:
+            build_version = version
+            if build_version is None:
+                with Session(engine) as session:
+                    build_version, chunks = document_crud.get_corpus_version(session, owner_id)
+                if not chunks or not self._exact_eligible(chunks):
+                    return
+            self.get_matrix(owner_id, build_version)
+        except Exception as e:
+            logger.error(f"Error building search matrix of owner {owner_id}: {e}")
+        finally:
+            with self._lock:
+                self._scheduled.discard((owner_id, version))
+
+    def _matrix_path(self, owner_id: int, version: int) -> Path:
+        return self.directory / settings.VECTOR_COLLECTION_NAME / f"{owner_id}-v{version}"
+
+    def _build_matrix(self, owner_id: int, version: int) -> OwnerMatrix:
+        """Load an owner's vectors from the vector store into a file and map it."""
+        path = self._matrix_path(owner_id, version)
+        vectors_file, ids_file = path.with_suffix(".npy"), path.with_suffix(".json")
+        if not (vectors_file.exists() and ids_file.exists()):
+            with Session(engine) as session:
+                rows = vector_crud.get_owner_vectors(session, settings.VECTOR_COLLECTION_NAME, owner_id)
+            vectors = np.zeros((len(rows), settings.VECTOR_DIMENSION), dtype=np.float32)
+            for i, (_, value) in enumerate(rows):
+                vectors[i] = parse_vector(value)
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors /= np.where(norms == 0, 1, norms)
+
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Write under temporary names: other processes may build the same matrix
+            suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(str(vectors_file) + suffix, "wb") as f:
+                np.save(f, vectors)
+            Path(str(ids_file) + suffix).write_text(json.dumps([vector_id for vector_id, _ in rows]))
+            os.replace(str(ids_file) + suffix, ids_file)
+            os.replace(str(vectors_file) + suffix, vectors_file)
+            self._remove_stale_matrices(owner_id, version)
+            logger.info(f"Built search matrix of owner {owner_id} (version {version}, {len(rows)} vectors)")
+
+        ids = json.loads(ids_file.read_text())
+        vectors = np.load(vectors_file, mmap_mode="r")
+        if len(ids) != len(vectors):
+            raise ValueError(f"Search matrix {vectors_file} does not match its ids")
+        return OwnerMatrix(version=version, ids=ids, vectors=vectors)
+
+    def _remove_stale_matrices(self, owner_id: int, version: int) -> None:
+        for stale in self._matrix_path(owner_id, version).parent.glob(f"{owner_id}-v*"):
+            if stale.stem != f"{owner_id}-v{version}" and not stale.name.endswith(".tmp"):
+                stale.unlink(missing_ok=True)
+
+    def get_matrix(self, owner_id: int, version: int) -> OwnerMatrix:
+        """Get an owner's vector matrix at ``version``, building it if needed."""
+        with self._lock:
+            matrix = self._matrices.get(owner_id)
+        if matrix is None or matrix.version != version:
+            matrix = self._build_matrix(owner_id, version)
+            with self._lock:
+                self._remember(self._matrices, owner_id, matrix, self.max_owners)
+        return matrix
+
+    def exact_search(self, owner_id: int, version: int, embedding: List[float], k: int) -> List[Document]:
+        """Cosine similarity scan over an owner's vectors.
+
+        Returns:
+            The ``k`` nearest chunks, with the text and metadata stored in the vector store
+        """
+        matrix = self.get_matrix(owner_id, version)
+        if not matrix.ids or k <= 0:
+            return []
+        query = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        scores = matrix.vectors @ (query / norm if norm else query)
+        if k < len(scores):
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top], kind="stable")]
+        else:
+            top = np.argsort(-scores, kind="stable")
+        ids = [matrix.ids[i] for i in top]
+
+        with Session(engine) as session:
+            stored = vector_crud.get_vector_documents(session, settings.VECTOR_COLLECTION_NAME, ids)
+        return [
+            Document(page_content=stored[vector_id][0], metadata=dict(stored[vector_id][1]))
+            for vector_id in ids
+            if vector_id in stored
+        ]
+
+
+search_planner = SearchPlanner(
+    directory=settings.SEARCH_MATRIX_DIR,
+    exact_max_chunks=settings.SEARCH_EXACT_MAX_CHUNKS,
+    max_owners=settings.SEARCH_PLANNER_MAX_OWNERS,
+)
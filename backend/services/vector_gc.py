@@ -0,0 +1,135 @@
+"""Background garbage collection of deleted documents and orphaned vectors."""
+import asyncio
+import time
+from typing import List, Optional
+from sqlmodel import Session
+from backend.core.config import settings
+from backend.core.db import engine
+from backend.core.logging import logger
+from backend.crud import document_crud, vector_crud
+from backend.services.langchain_agent import get_vector_store
+from backend.utils.storage import storage
+
+
+class VectorGarbageCollector:
+    """Purges tombstoned documents and reconciles the vector collection.
+
+    Each pass locks a batch of tombstoned documents, deletes their vectors
+    by id in bulk, removes their chunks, jobs and rows with set-based
+    statements and deletes their files. It then looks for vectors that no
+    chunk references (left by failed deletes or crashed ingestion). An
+    orphan is only deleted once it has stayed unreferenced for a full
+    ``interval``, so vectors whose chunk rows are about to be inserted by
+    a running ingestion are never touched.
+    """
+
+    def __init__(self, interval: float, batch_size: int):
+        self.interval = interval
+        self.batch_size = batch_size
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        # Orphaned vector id -> when it was first seen unreferenced
+        self._orphan_candidates: dict[str, float] = {}
+
+    async def start(self) -> None:
+        """Start the collector loop."""
+        if self._task is not None:
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name="vector-gc")
+        logger.info(f"Vector GC started (every {self.interval}s)")
+
+    async def stop(self) -> None:
+        """Cancel the collector loop."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        logger.info("Vector GC stopped")
+
+    def notify(self) -> None:
+        """Run a pass soon because documents were tombstoned."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(self.collect)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Vector GC pass failed: {e}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    def collect(self) -> tuple[int, int]:
+        """Run one full pass.
+
+        Returns:
+            (documents purged, orphaned vectors deleted)
+        """
+        purged = 0
+        while True:
+            count = self._purge_tombstoned()
+            purged += count
+            if count < self.batch_size:
+                break
+        orphans = self._reconcile_orphans()
+        if purged or orphans:
+            logger.info(f"Vector GC purged {purged} deleted documents and {orphans} orphaned vectors")
+        return purged, orphans
+
+    def _delete_vectors(self, embedding_ids: List[str]) -> None:
+        vector_store = get_vector_store()
+        for start in range(0, len(embedding_ids), self.batch_size):
+            vector_store.delete(ids=embedding_ids[start:start + self.batch_size])
+
+    def _purge_tombstoned(self) -> int:
+        """Purge one batch of tombstoned documents; returns how many."""
+        with Session(engine) as session:
+            documents = document_crud.claim_tombstoned_documents(session, self.batch_size)
+            if not documents:
+                return 0
+            document_ids = [document.id for document in documents]
+            storage_paths = [document.storage_path for document in documents]
+
+            # Vectors first: if this fails the rows stay and the next pass retries
+            self._delete_vectors(document_crud.get_embedding_ids_for_documents(session, document_ids))
+            document_crud.purge_documents(session, document_ids)
+
+        for path in storage_paths:
+            storage.delete_file(path)
+        return len(document_ids)
+
+    def _reconcile_orphans(self) -> int:
+        """Delete vectors that have been unreferenced for at least ``interval``."""
+        if settings.VECTOR_STORE_TYPE != "pgvector":
+            # Milvus offers no join against the chunk table; tombstone purging still applies
+            return 0
+
+        with Session(engine) as session:
+            orphans = set(vector_crud.find_orphan_vector_ids(
+                session,
+                settings.VECTOR_COLLECTION_NAME,
+                limit=settings.VECTOR_GC_MAX_ORPHANS,
+            ))
+        now = time.monotonic()
+        first_seen = {vector_id: self._orphan_candidates.get(vector_id, now) for vector_id in orphans}
+        confirmed = sorted(vector_id for vector_id, seen in first_seen.items() if now - seen >= self.interval)
+        self._orphan_candidates = {
+            vector_id: seen for vector_id, seen in first_seen.items() if now - seen < self.interval
+        }
+        if confirmed:
+            self._delete_vectors(confirmed)
+        return len(confirmed)
+
+
+vector_gc = VectorGarbageCollector(
+    interval=settings.VECTOR_GC_INTERVAL,
+    batch_size=settings.VECTOR_GC_BATCH_SIZE,
+)
@@ -0,0 +1,60 @@
+"""Tests for the decompression limits of uploaded archives."""
+import asyncio
+import io
+import tarfile
+import unittest
+import zipfile
+from backend.utils.archive import ArchiveBombError, iter_archive_members
+
+
+async def read_members(fileobj, filename: str) -> dict[str, int]:
+    """Sizes of the members of an archive, read block by block."""
+    sizes = {}
+    async for member in iter_archive_members(fileobj, filename, block_size=64 * 1024):
+        sizes[member.name] = 0
+        async for block in member.blocks:
+            sizes[member.name] += len(block)
+    return sizes
+
+
+def make_zip(members: dict[str, bytes]) -> io.BytesIO:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    buffer.seek(0)
+    return buffer
+
+
+def make_tar_gz(members: dict[str, bytes]) -> io.BytesIO:
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+        for name, data in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    buffer.seek(0)
+    return buffer
+
+
+class ArchiveInflationTest(unittest.TestCase):
+    def test_ordinary_archives_are_read(self):
+        members = {"a.txt": b"retrieval augmented generation " * 100, "b.md": b"# Title\n\nText\n"}
+        for make, filename in ((make_zip, "docs.zip"), (make_tar_gz, "docs.tar.gz")):
+            with self.subTest(filename=filename):
+                sizes = asyncio.run(read_members(make(members), filename))
+                self.assertEqual(sizes, {name: len(data) for name, data in members.items()})
+
+    def test_zip_bomb_member_is_rejected_from_its_declared_size(self):
+        archive = make_zip({"zeros.txt": bytes(20 * 1024 * 1024)})
+        with self.assertRaises(ArchiveBombError):
+            asyncio.run(read_members(archive, "bomb.zip"))
+
+    def test_tar_bomb_is_stopped_while_decompressing(self):
+        archive = make_tar_gz({f"zeros-{idx}.txt": bytes(4 * 1024 * 1024) for idx in range(5)})
+        with self.assertRaises(ArchiveBombError):
+            asyncio.run(read_members(archive, "bomb.tar.gz"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,32 @@
+"""Tests for maximal marginal relevance selection."""
+import unittest
+import numpy as np
+from backend.services.diversity import mmr_select
+
+
+class MmrSelectTest(unittest.TestCase):
+    def test_only_candidates_dropped_as_duplicates_are_reported(self):
+        candidates = np.array([
+            [1.0, 0.0, 0.0],
+            [0.99, 0.01, 0.0],  # Near duplicate of 0
+            [0.0, 1.0, 0.0],
+            [0.0, 0.0, 1.0],
+        ])
+        dropped = []
+        picked = mmr_select(
+            candidates, 2, relevance=np.array([1.0, 0.9, 0.8, 0.7]), duplicate_threshold=0.95, dropped=dropped
+        )
+        self.assertEqual(picked, [0, 2])
+        # Candidate 3 was merely not needed; it is no duplicate
+        self.assertEqual(dropped, [1])
+
+    def test_nothing_dropped_without_threshold(self):
+        candidates = np.array([[1.0, 0.0], [1.0, 0.0], [0.0, 1.0]])
+        dropped = []
+        picked = mmr_select(candidates, 3, query=np.array([1.0, 0.0]), dropped=dropped)
+        self.assertEqual(sorted(picked), [0, 1, 2])
+        self.assertEqual(dropped, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+"""Tests for the extraction time limit of streamed documents."""
+import asyncio
+import os
+import tempfile
+import unittest
+from backend.utils.extraction_pool import ExtractionPool
+
+
+async def consume_slowly(segments, delay: float) -> list:
+    """Collect segments, pausing after each like a backpressured pipeline."""
+    collected = []
+    async for segment in segments:
+        collected.append(segment)
+        await asyncio.sleep(delay)
+    return collected
+
+
+class IterSegmentsTimeoutTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def test_slow_consumer_does_not_use_up_text_budget(self):
+        path = os.path.join(self.directory.name, "large.txt")
+        block = "x" * (64 * 1024)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(block * 4)
+        pool = ExtractionPool(max_workers=1, pages_per_task=1, timeout_seconds=0.2, memory_limit_mb=None)
+
+        segments = asyncio.run(consume_slowly(pool.iter_segments(path, "text/plain"), delay=0.1))
+
+        self.assertEqual("".join(segment.text for segment in segments), block * 4)
+
+    def test_slow_consumer_does_not_use_up_pdf_budget(self):
+        try:
+            from PyPDF2 import PdfWriter
+        except ImportError:
+            self.skipTest("PyPDF2 is not installed")
+        path = os.path.join(self.directory.name, "large.pdf")
+        writer = PdfWriter()
+        for _ in range(4):
+            writer.add_blank_page(width=200, height=200)
+        with open(path, "wb") as f:
+            writer.write(f)
+        # Worker startup is not charged: the budget of a task starts in the worker
+        pool = ExtractionPool(max_workers=1, pages_per_task=1, timeout_seconds=2.0, memory_limit_mb=None)
+        self.addCleanup(pool.shutdown)
+
+        segments = asyncio.run(consume_slowly(pool.iter_segments(path, "application/pdf"), delay=1.0))
+
+        self.assertEqual([segment.page for segment in segments], [1, 2, 3, 4])
+
+
+if __name__ == "__main__":
+    unittest.main()
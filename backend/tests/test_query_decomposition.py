@@ -0,0 +1,64 @@
+"""Tests for the rule-based splitting of compound questions."""
+import unittest
+from backend.services.query_decomposition import split_query
+
+
+class SplitQueryTest(unittest.TestCase):
+    def test_single_questions_stay_whole(self):
+        cases = [
+            "Does it also support JSON export?",
+            "What are the pros as well as cons of HNSW?",
+            "What is the difference between HNSW and IVFFlat?",
+            "Is the index rebuilt and is the cache cleared on upload?",
+            "Explain HNSW; what is IVFFlat?",
+            "업로드 한도와 지원 형식을 알려줘",
+        ]
+        for query in cases:
+            with self.subTest(query=query):
+                self.assertEqual(split_query(query), [query])
+
+    def test_parts_referring_back_stay_whole(self):
+        cases = [
+            "What is RRF and how does it work?",
+            "What is HNSW? When should I use it?",
+            "Which models are supported, and what are their limits?",
+            "RRF가 뭐야? 그리고 그것은 어떻게 동작해?",
+        ]
+        for query in cases:
+            with self.subTest(query=query):
+                self.assertEqual(split_query(query), [query])
+
+    def test_independent_questions_are_split(self):
+        cases = [
+            (
+                "What is RRF and how does HNSW build a graph?",
+                ["What is RRF", "how does HNSW build a graph?"],
+            ),
+            (
+                "What is the upload limit? Which file types are supported?",
+                ["What is the upload limit?", "Which file types are supported?"],
+            ),
+            (
+                "How are documents chunked, as well as which embedding model is used?",
+                ["How are documents chunked", "which embedding model is used?"],
+            ),
+            (
+                "What is the upload limit; what is the rate limit?",
+                ["What is the upload limit", "what is the rate limit?"],
+            ),
+            (
+                "업로드 한도는 얼마인가요? 그리고 지원하는 파일 형식은 무엇인가요?",
+                ["업로드 한도는 얼마인가요?", "지원하는 파일 형식은 무엇인가요?"],
+            ),
+        ]
+        for query, expected in cases:
+            with self.subTest(query=query):
+                self.assertEqual(split_query(query), expected)
+
+    def test_repeated_and_extra_parts_are_dropped(self):
+        query = "What is RRF? What is RRF? What is HNSW? What is MMR?"
+        self.assertEqual(split_query(query, max_queries=2), ["What is RRF?", "What is HNSW?"])
+
+
+if __name__ == "__main__":
+    unittest.main()
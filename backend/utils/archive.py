@@ -0,0 +1,145 @@
+"""Streaming access to the members of uploaded zip and tar archives."""
+import asyncio
+import os
+import tarfile
+import zipfile
+import zlib
+from pathlib import PurePosixPath
+from typing import AsyncIterator, BinaryIO, Callable, NamedTuple, Optional
+from backend.core.config import settings
+
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")
+_ARCHIVE_ERRORS = (zipfile.BadZipFile, tarfile.TarError, EOFError, zlib.error)
+
+
+class InvalidArchiveError(ValueError):
+    """Raised when an uploaded archive is corrupt or not in a supported format."""
+
+
+class ArchiveBombError(InvalidArchiveError):
+    """Raised when an archive decompresses to far more than its own size."""
+
+
+class ArchiveMember(NamedTuple):
+    """A regular file inside an archive, read block by block."""
+    name: str  # Path inside the archive
+    blocks: AsyncIterator[bytes]
+
+
+def is_archive(filename: str) -> bool:
+    """Check whether a filename looks like a supported archive."""
+    return filename.lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def _is_hidden(name: str) -> bool:
+    # macOS resource forks, dotfiles and files in dot directories
+    return any(part.startswith(".") or part == "__MACOSX" for part in PurePosixPath(name).parts)
+
+
+class _InflationGuard:
+    """Counts the bytes an archive decompresses to and stops at a ratio of its size."""
+
+    def __init__(self, filename: str, archive_size: int, max_ratio: float):
+        self.filename = filename
+        self.max_ratio = max_ratio
+        self.limit = archive_size * max_ratio if max_ratio else None
+        self.total = 0
+
+    def add(self, size: int) -> None:
+        self.total += size
+        if self.limit is not None and self.total > self.limit:
+            raise ArchiveBombError(
+                f"Archive {self.filename} decompresses to more than "
+                f"{self.max_ratio}x its size"
+            )
+
+
+async def _iter_blocks(fileobj: BinaryIO, block_size: int, guard: _InflationGuard) -> AsyncIterator[bytes]:
+    """Read a blocking file object in a thread, one block at a time."""
+    try:
+        while True:
+            try:
+                block = await asyncio.to_thread(fileobj.read, block_size)
+            except _ARCHIVE_ERRORS as e:
+                raise InvalidArchiveError(f"Corrupt archive member: {e}")
+            if not block:
+                break
+            guard.add(len(block))
+            yield block
+    finally:
+        fileobj.close()
+
+
+async def iter_archive_members(
+    fileobj: BinaryIO,
+    filename: str,
+    block_size: Optional[int] = None,
+) -> AsyncIterator[ArchiveMember]:
+    """Iterate over the regular files of a zip or tar archive.
+
+    Members are decompressed while they are read, so neither the archive nor
+    a member is ever held in memory. Each member's ``blocks`` must be
+    consumed (or closed) before moving on to the next one; tar archives are
+    read strictly sequentially. Directories, links and hidden files are
+    skipped.
+
+    Decompression stops with ``ArchiveBombError`` once the members read add
+    up to more than ``ARCHIVE_MAX_COMPRESSION_RATIO`` times the archive size;
+    zip members declaring such a ratio are rejected before being read.
+
+    Args:
+        fileobj: Seekable file object for zip archives (e.g. ``UploadFile.file``)
+        filename: Archive filename, used to detect the format
+        block_size: Bytes per block (default: ``settings.UPLOAD_BLOCK_SIZE``)
+
+    Raises:
+        InvalidArchiveError: If the archive can't be read
+        ArchiveBombError: If the archive inflates beyond the allowed ratio
+    """
+    block_size = block_size or settings.UPLOAD_BLOCK_SIZE
+    archive_size = fileobj.seek(0, os.SEEK_END)
+    fileobj.seek(0)
+    guard = _InflationGuard(filename, archive_size, settings.ARCHIVE_MAX_COMPRESSION_RATIO)
+    try:
+        async for member in _iter_members(fileobj, filename, block_size, guard):
+            yield member
+    except _ARCHIVE_ERRORS as e:
+        raise InvalidArchiveError(f"Invalid archive {filename}: {e}")
+
+
+async def _iter_members(
+    fileobj: BinaryIO,
+    filename: str,
+    block_size: int,
+    guard: _InflationGuard,
+) -> AsyncIterator[ArchiveMember]:
+    max_ratio = settings.ARCHIVE_MAX_COMPRESSION_RATIO
+    if filename.lower().endswith(".zip"):
+        archive = await asyncio.to_thread(zipfile.ZipFile, fileobj)
+        try:
+            for info in archive.infolist():
+                if info.is_dir() or _is_hidden(info.filename):
+                    continue
+                # Declared sizes can lie; the guard checks the bytes actually read
+                if max_ratio and info.file_size > max(info.compress_size, 1) * max_ratio:
+                    raise ArchiveBombError(
+                        f"Archive member {info.filename} decompresses to more than {max_ratio}x its size"
+                    )
+                member_file = await asyncio.to_thread(archive.open, info)
+                yield ArchiveMember(info.filename, _iter_blocks(member_file, block_size, guard))
+        finally:
+            archive.close()
+        return
+
+    # Stream mode: no seeking, members are read in archive order
+    archive = await asyncio.to_thread(tarfile.open, fileobj=fileobj, mode="r|*")
+    try:
+        members = iter(archive)
+        next_member: Callable = lambda: next(members, None)
+        while (info := await asyncio.to_thread(next_member)) is not None:
+            if not info.isfile() or _is_hidden(info.name):
+                continue
+            member_file = await asyncio.to_thread(archive.extractfile, info)
+            yield ArchiveMember(info.name, _iter_blocks(member_file, block_size, guard))
+    finally:
+        archive.close()
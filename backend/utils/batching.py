@@ -0,0 +1,89 @@
+"""Dynamic batching of concurrent async requests."""
+import asyncio
+from typing import Awaitable, Callable, Generic, List, Optional, Sequence, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class MicroBatcher(Generic[T, R]):
+    """Coalesces items submitted by concurrent callers into batches.
+
+    When no batch is running, items are flushed on the next event loop
+    iteration, so a lone request is not delayed and items submitted in the
+    same iteration share a batch. While batches are running, new items
+    collect until they fill ``max_batch_size`` or ``max_wait`` seconds have
+    passed. Batches run concurrently; each caller gets the results for its
+    own items in order.
+
+    Args:
+        process_batch: Coroutine function mapping a list of items to one result per item
+        max_batch_size: Largest batch passed to ``process_batch``
+        max_wait: Seconds to wait for more items before flushing a partial batch
+    """
+
+    def __init__(
+        self,
+        process_batch: Callable[[List[T]], Awaitable[List[R]]],
+        max_batch_size: int,
+        max_wait: float,
+    ):
+        if max_batch_size <= 0:
+            raise ValueError("max_batch_size must be positive")
+        self.process_batch = process_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._pending: List[tuple[T, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._running: set[asyncio.Task] = set()
+
+    async def submit(self, item: T) -> R:
+        """Process one item as part of a batch."""
+        return (await self.submit_many([item]))[0]
+
+    async def submit_many(self, items: Sequence[T]) -> List[R]:
+        """Process items, batched together with those of other callers."""
+        if not items:
+            return []
+        loop = asyncio.get_running_loop()
+        futures = [loop.create_future() for _ in items]
+        self._pending.extend(zip(items, futures))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush(full_only=True)
+        if self._pending and self._timer is None:
+            delay = self.max_wait if self._running else 0
+            self._timer = loop.call_later(delay, self._flush)
+        return list(await asyncio.gather(*futures))
+
+    def _flush(self, full_only: bool = False) -> None:
+        """Start batches for the pending items.
+
+        Args:
+            full_only: Leave a trailing partial batch waiting for more items
+        """
+        if not full_only and self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._pending and (len(self._pending) >= self.max_batch_size or not full_only):
+            batch = self._pending[:self.max_batch_size]
+            del self._pending[:self.max_batch_size]
+            task = asyncio.ensure_future(self._run(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch: List[tuple[T, asyncio.Future]]) -> None:
+        try:
+            results = await self.process_batch([item for item, _ in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f"Batch of {len(batch)} items returned {len(results)} results")
+        except BaseException as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            if not isinstance(e, Exception):
+                raise
+            return
+        for (_, future), result in zip(batch, results):
+            # A caller may have been cancelled while the batch ran
+            if not future.done():
+                future.set_result(result)
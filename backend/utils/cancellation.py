@@ -0,0 +1,42 @@
+"""Cancel request work when the client goes away."""
+import asyncio
+from typing import Awaitable, TypeVar
+from fastapi import Request
+
+T = TypeVar("T")
+
+
+class ClientDisconnected(Exception):
+    """The client closed the connection before the response was ready."""
+
+
+async def cancel_on_disconnect(request: Request, awaitable: Awaitable[T], poll_interval: float = 0.5) -> T:
+    """Await ``awaitable``, cancelling it if the client disconnects first.
+
+    Starlette only cancels streaming responses when the client goes away;
+    a plain endpoint keeps running its LLM calls and database queries. The
+    cancellation reaches awaited psycopg queries, which are then cancelled
+    on the server as well.
+
+    Args:
+        request: The incoming request
+        awaitable: Work done for the request
+        poll_interval: Seconds between disconnect checks
+
+    Raises:
+        ClientDisconnected: If the client disconnected and the work was cancelled
+    """
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_interval)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                raise ClientDisconnected()
+    finally:
+        # Cancellation of this coroutine itself (e.g. server shutdown)
+        if not task.done():
+            task.cancel()
@@ -0,0 +1,298 @@
+"""Span-based text chunking.
+
+Chunks are computed as (start, end) offsets into the source text and only
+sliced into strings once their boundaries are final. Sizes are measured in
+tokens of the embedding model's tokenizer (or characters), chunks never
+cross a PDF page boundary or a Markdown heading, and inside those sections
+chunks end at the strongest nearby break: paragraph, line, sentence, word.
+"""
+import bisect
+import re
+from functools import lru_cache
+from typing import Iterator, List, NamedTuple, Optional, Sequence
+from backend.core.config import settings
+from backend.core.logging import logger
+
+# Rough characters per token, used when no tokenizer is available
+CHARS_PER_TOKEN = 4
+
+_HEADING_RE = re.compile(r"#{1,6}[ \t]+(\S[^\n]*)")
+_NON_SPACE_RE = re.compile(r"\S")
+
+# Break points in order of preference, searched right to left within a window.
+# Each entry is (separators, offset from the match to the chunk end)
+_BREAKS = (
+    (("\n\n",), 2),  # Paragraph
+    (("\n",), 1),  # Line
+    ((". ", "? ", "! "), 1),  # Sentence (a break before a newline is a line break)
+    ((" ", "\t"), 0),  # Word
+)
+
+
+class ChunkingConfig(NamedTuple):
+    """Chunk size settings for one collection."""
+    chunk_size: int
+    chunk_overlap: int
+    unit: str = "tokens"  # "tokens" or "chars"
+
+
+class Span(NamedTuple):
+    """A chunk as offsets into the source text."""
+    start: int
+    end: int
+    page: Optional[int] = None
+    section: Optional[str] = None  # Nearest Markdown heading
+
+
+class TextChunk(NamedTuple):
+    """A materialized chunk."""
+    text: str
+    page: Optional[int] = None
+    section: Optional[str] = None
+
+
+def get_chunking_config(collection_name: Optional[str] = None) -> ChunkingConfig:
+    """Get chunk settings for a collection.
+
+    Values in ``settings.CHUNKING_OVERRIDES[collection_name]`` take precedence
+    over the global ``CHUNK_SIZE``, ``CHUNK_OVERLAP`` and ``CHUNK_UNIT``.
+    """
+    override = settings.CHUNKING_OVERRIDES.get(collection_name or settings.VECTOR_COLLECTION_NAME, {})
+    return ChunkingConfig(
+        chunk_size=int(override.get("chunk_size", settings.CHUNK_SIZE)),
+        chunk_overlap=int(override.get("chunk_overlap", settings.CHUNK_OVERLAP)),
+        unit=str(override.get("unit", settings.CHUNK_UNIT)),
+    )
+
+
+@lru_cache(maxsize=None)
+def get_tokenizer(encoding_name: str):
+    """Load a tiktoken encoding once per process.
+
+    Returns:
+        The encoding, or None if tiktoken or its BPE files are unavailable
+    """
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(encoding_name)
+    except Exception as e:
+        logger.warning(
+            f"Tokenizer {encoding_name} unavailable ({e}); "
+            f"measuring chunks as {CHARS_PER_TOKEN} characters per token"
+        )
+        return None
+
+
+class SpanChunker:
+    """Splits text into overlapping chunks of bounded size.
+
+    Args:
+        chunk_size: Maximum chunk length in ``unit``
+        chunk_overlap: Length in ``unit`` repeated at the start of the next chunk
+        unit: "tokens" to measure with the tokenizer, "chars" for characters
+        markdown: Treat Markdown headings as section boundaries
+        encoding_name: tiktoken encoding used when ``unit`` is "tokens"
+    """
+
+    def __init__(
+        self,
+        chunk_size: int,
+        chunk_overlap: int,
+        unit: str = "tokens",
+        markdown: bool = False,
+        encoding_name: Optional[str] = None,
+    ):
+        if chunk_size <= 0:
+            raise ValueError("chunk_size must be positive")
+        if not 0 <= chunk_overlap < chunk_size:
+            raise ValueError("chunk_overlap must be between 0 and chunk_size")
+        if unit not in ("tokens", "chars"):
+            raise ValueError(f"Unknown chunk unit: {unit}")
+
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.markdown = markdown
+        self.tokenizer = get_tokenizer(encoding_name or settings.CHUNK_TOKENIZER_ENCODING) if unit == "tokens" else None
+        # Without a tokenizer, token sizes are approximated in characters
+        scale = CHARS_PER_TOKEN if unit == "tokens" and self.tokenizer is None else 1
+        self._size = chunk_size * scale
+        self._overlap = chunk_overlap * scale
+
+    @classmethod
+    def from_config(cls, config: ChunkingConfig, markdown: bool = False) -> "SpanChunker":
+        """Create a chunker from a collection's chunking config."""
+        return cls(config.chunk_size, config.chunk_overlap, unit=config.unit, markdown=markdown)
+
+    @property
+    def max_chunk_chars(self) -> int:
+        """Upper bound of the characters in one chunk."""
+        # A token is rarely longer than a handful of characters
+        return self._size * 8 if self.tokenizer is not None else self._size
+
+    def split(
+        self,
+        text: str,
+        page_offsets: Optional[Sequence[int]] = None,
+        section: Optional[str] = None,
+    ) -> List[Span]:
+        """Compute chunk spans without copying any text.
+
+        Args:
+            text: Source text
+            page_offsets: Start offset of each page; pages are hard boundaries
+            section: Heading in effect at the start of ``text``
+
+        Returns:
+            Spans in text order
+        """
+        boundaries = {0, len(text)}
+        if page_offsets:
+            boundaries.update(offset for offset in page_offsets if 0 < offset < len(text))
+        headings = _find_headings(text) if self.markdown else []
+        boundaries.update(offset for offset, _ in headings)
+        boundaries = sorted(boundaries)
+
+        token_starts = self._token_starts(text)
+
+        spans: List[Span] = []
+        heading_idx = 0
+        for section_start, section_end in zip(boundaries, boundaries[1:]):
+            while heading_idx < len(headings) and headings[heading_idx][0] <= section_start:
+                section = headings[heading_idx][1]
+                heading_idx += 1
+            page = None
+            if page_offsets:
+                page = max(bisect.bisect_right(page_offsets, section_start), 1)
+            for start, end in self._split_section(text, section_start, section_end, token_starts):
+                spans.append(Span(start, end, page, section))
+        return spans
+
+    def chunk(self, text: str, page_offsets: Optional[Sequence[int]] = None) -> List[TextChunk]:
+        """Split text and materialize the chunks."""
+        return [TextChunk(text[span.start:span.end], span.page, span.section) for span in self.split(text, page_offsets)]
+
+    def _token_starts(self, text: str) -> Optional[List[int]]:
+        """Character offset where each token starts, or None when measuring characters."""
+        if self.tokenizer is None or not text:
+            return None
+        _, offsets = self.tokenizer.decode_with_offsets(self.tokenizer.encode_ordinary(text))
+        return offsets
+
+    def _advance(self, pos: int, length: int, token_starts: Optional[List[int]], limit: int) -> int:
+        """Offset ``length`` units after ``pos``, capped at ``limit``."""
+        if token_starts is None:
+            return min(pos + length, limit)
+        idx = max(bisect.bisect_right(token_starts, pos) - 1, 0) + length
+        return min(token_starts[idx], limit) if idx < len(token_starts) else limit
+
+    def _retreat(self, pos: int, length: int, token_starts: Optional[List[int]]) -> int:
+        """Offset ``length`` units before ``pos``."""
+        if token_starts is None:
+            return max(pos - length, 0)
+        idx = bisect.bisect_left(token_starts, pos)
+        return token_starts[max(idx - length, 0)]
+
+    def _split_section(
+        self,
+        text: str,
+        section_start: int,
+        section_end: int,
+        token_starts: Optional[List[int]],
+    ) -> Iterator[tuple[int, int]]:
+        """Yield (start, end) chunk offsets within one section."""
+        pos = _skip_space(text, section_start, section_end)
+        while pos < section_end:
+            limit = self._advance(pos, self._size, token_starts, section_end)
+            end = limit
+            if limit < section_end:
+                # Strongest break in the second half of the window
+                floor = self._advance(pos, self._size // 2, token_starts, limit)
+                for separators, offset in _BREAKS:
+                    found = -1
+                    for separator in separators:
+                        found = max(found, text.rfind(separator, floor, limit - offset + len(separator)))
+                    if found > floor:
+                        end = found + offset
+                        break
+
+            chunk_end = _trim_space(text, pos, end)
+            if chunk_end > pos:
+                yield pos, chunk_end
+            if end >= section_end:
+                break
+
+            # Start the next chunk `overlap` before the end, on a word boundary
+            next_pos = self._retreat(end, self._overlap, token_starts) if self._overlap else end
+            space = text.find(" ", next_pos, end)
+            if space >= 0:
+                next_pos = space + 1
+            pos = _skip_space(text, max(next_pos, pos + 1), section_end)
+
+
+class StreamingSpanChunker:
+    """Feeds a text stream through a ``SpanChunker`` with bounded buffering.
+
+    A change of page is a hard boundary, so each page is chunked as soon as
+    the next one starts. Within long unpaged text (plain text, Markdown) the
+    buffer is chunked whenever it grows past ``flush_chars``, cutting at the
+    last paragraph break so no chunk is split by the flush.
+    """
+
+    def __init__(self, chunker: SpanChunker, flush_chars: int = 64 * 1024):
+        self.chunker = chunker
+        self.flush_chars = max(flush_chars, 4 * chunker.max_chunk_chars)
+        self._buffer = ""
+        self._page: Optional[int] = None
+        self._section: Optional[str] = None
+
+    def feed(self, text: str, page: Optional[int] = None) -> List[TextChunk]:
+        """Add text and return the chunks that can no longer change."""
+        chunks = []
+        if self._buffer and page != self._page:
+            chunks.extend(self._flush(len(self._buffer)))
+        self._page = page
+        self._buffer += text
+        if len(self._buffer) >= self.flush_chars:
+            keep = self.chunker.max_chunk_chars
+            cut = self._buffer.rfind("\n\n", 0, len(self._buffer) - keep)
+            if cut <= 0:
+                cut = self._buffer.rfind("\n", 0, len(self._buffer) - keep)
+            if cut <= 0:
+                cut = len(self._buffer) - keep
+            chunks.extend(self._flush(cut))
+        return chunks
+
+    def finish(self) -> List[TextChunk]:
+        """Flush the remaining text at the end of the stream."""
+        return self._flush(len(self._buffer))
+
+    def _flush(self, cut: int) -> List[TextChunk]:
+        text, self._buffer = self._buffer[:cut], self._buffer[cut:]
+        spans = self.chunker.split(text, section=self._section)
+        chunks = [TextChunk(text[span.start:span.end], self._page, span.section) for span in spans]
+        if spans:
+            self._section = spans[-1].section
+        return chunks
+
+
+def _find_headings(text: str) -> List[tuple[int, str]]:
+    """Offsets and titles of Markdown headings (lines starting with ``#``)."""
+    headings = []
+    pos = 0 if text.startswith("#") else text.find("\n#") + 1 or -1
+    while pos >= 0:
+        match = _HEADING_RE.match(text, pos)
+        if match:
+            headings.append((pos, match.group(1).strip()))
+        pos = text.find("\n#", pos) + 1 or -1
+    return headings
+
+
+def _skip_space(text: str, pos: int, end: int) -> int:
+    match = _NON_SPACE_RE.search(text, pos, end)
+    return match.start() if match else end
+
+
+def _trim_space(text: str, start: int, end: int) -> int:
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return end
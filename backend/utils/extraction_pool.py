@@ -0,0 +1,243 @@
+"""Process pool for CPU-bound text extraction."""
+import asyncio
+import multiprocessing
+import os
+import signal
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import AsyncIterator, Callable, Optional
+from backend.core.config import settings
+from backend.core.logging import logger
+from backend.utils.extractor import (
+    ExtractedText,
+    TextSegment,
+    count_pdf_pages,
+    detect_file_type,
+    extract_pdf_pages,
+    extract_text_from_file,
+    iter_text_plain,
+    join_pages,
+)
+
+
+class ExtractionTimeoutError(Exception):
+    """Raised when extracting a document exceeds its time limit."""
+
+
+def _init_worker(memory_limit_bytes: Optional[int]) -> None:
+    """Limit the address space of an extraction worker process."""
+    if not memory_limit_bytes:
+        return
+    try:
+        import resource
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit_bytes, memory_limit_bytes))
+    except (ImportError, ValueError, OSError) as e:
+        logger.warning(f"Could not set extraction worker memory limit: {e}")
+
+
+def _raise_timeout(signum, frame):
+    raise ExtractionTimeoutError("Extraction time limit exceeded")
+
+
+def _run_with_timeout(timeout: float, func: Callable, *args):
+    """Run ``func`` in the worker, interrupting it with SIGALRM after ``timeout`` seconds.
+
+    The alarm stops a pathological page inside the worker itself, so the
+    worker process stays usable for the next task. It starts when the task
+    starts, so time spent queued for a worker is not charged.
+    """
+    if timeout <= 0:
+        raise ExtractionTimeoutError("Extraction time limit exceeded")
+    signal.signal(signal.SIGALRM, _raise_timeout)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return func(*args)
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+class ExtractionPool:
+    """Extracts document text in worker processes.
+
+    PDFs are split into page ranges that are parsed in parallel; each
+    document is bounded by a wall-clock time limit and every worker by an
+    address-space limit, so one pathological file can neither block the event
+    loop nor exhaust the app process.
+    """
+
+    def __init__(
+        self,
+        max_workers: int,
+        pages_per_task: int,
+        timeout_seconds: float,
+        memory_limit_mb: Optional[int],
+    ):
+        self.max_workers = max_workers
+        self.pages_per_task = pages_per_task
+        self.timeout_seconds = timeout_seconds
+        self.memory_limit_bytes = memory_limit_mb * 1024 * 1024 if memory_limit_mb else None
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                # spawn: the app process runs threads, which fork does not handle safely
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.memory_limit_bytes,),
+            )
+        return self._executor
+
+    def shutdown(self, wait: bool = False) -> None:
+        """Stop the worker processes.
+
+        Args:
+            wait: Block until the workers have exited and been reaped
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+
+    async def _submit(self, deadline: float, func: Callable, *args):
+        """Run ``func`` in a worker, limited to the time left until ``deadline``."""
+        loop = asyncio.get_running_loop()
+        timeout = deadline - time.time()
+        return await loop.run_in_executor(self._get_executor(), _run_with_timeout, timeout, func, *args)
+
+    async def extract(self, file_path: str, mime_type: Optional[str] = None) -> ExtractedText:
+        """Extract the text of a document.
+
+        Args:
+            file_path: Path to the file
+            mime_type: MIME type of the file (optional)
+
+        Returns:
+            ExtractedText with page offsets for PDFs
+
+        Raises:
+            ExtractionTimeoutError: If the document exceeds the time limit
+        """
+        deadline = time.time() + self.timeout_seconds
+        try:
+            # Backstop in case a worker cannot be interrupted by its alarm
+            return await asyncio.wait_for(
+                self._extract(file_path, mime_type, deadline),
+                timeout=self.timeout_seconds + 5,
+            )
+        except asyncio.TimeoutError:
+            raise ExtractionTimeoutError(f"Extraction of {file_path} exceeded {self.timeout_seconds}s")
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory); start fresh for the next document
+            logger.error(f"Extraction worker crashed while processing {file_path}")
+            self.shutdown()
+            raise
+
+    async def _extract(self, file_path: str, mime_type: Optional[str], deadline: float) -> ExtractedText:
+        if detect_file_type(file_path, mime_type) != "pdf":
+            text = await self._submit(deadline, extract_text_from_file, file_path, mime_type)
+            return ExtractedText(text=text)
+
+        page_count = await self._submit(deadline, count_pdf_pages, file_path)
+        ranges = [
+            (start, min(start + self.pages_per_task, page_count))
+            for start in range(0, page_count, self.pages_per_task)
+        ]
+        results = await asyncio.gather(
+            *(self._submit(deadline, extract_pdf_pages, file_path, start, end) for start, end in ranges)
+        )
+        pages = [page for page_range in results for page in page_range]
+        return join_pages(pages)
+
+    async def iter_segments(
+        self,
+        file_path: str,
+        mime_type: Optional[str] = None,
+        start_page: int = 1,
+    ) -> AsyncIterator[TextSegment]:
+        """Extract a document incrementally, yielding text segments in order.
+
+        Plain text and Markdown are read in blocks in a thread. PDF page
+        ranges are parsed by the worker processes with at most ``max_workers``
+        ranges in flight, so the pages of a large PDF are never all held in
+        memory at once. DOCX is extracted in one worker task.
+
+        The time limit only covers extraction: the clock stops while the
+        generator is suspended at a ``yield``, so a consumer that is slow to
+        embed and store the segments (pipeline backpressure) doesn't use up
+        the extraction budget. Each worker task gets the budget left when it
+        is submitted.
+
+        Args:
+            start_page: First PDF page to extract (1-based); ignored for other formats
+
+        Raises:
+            ExtractionTimeoutError: If extraction exceeds the time limit
+        """
+        deadline = time.time() + self.timeout_seconds
+        file_type = detect_file_type(file_path, mime_type)
+        try:
+            if file_type in ("txt", "md"):
+                blocks = iter_text_plain(file_path)
+                while True:
+                    if time.time() > deadline:
+                        raise ExtractionTimeoutError(f"Extraction of {file_path} exceeded {self.timeout_seconds}s")
+                    block = await asyncio.to_thread(next, blocks, None)
+                    if block is None:
+                        return
+                    suspended = time.time()
+                    yield TextSegment(block)
+                    deadline += time.time() - suspended
+
+            if file_type != "pdf":
+                text = await self._submit_with_backstop(deadline, extract_text_from_file, file_path, mime_type)
+                yield TextSegment(text)
+                return
+
+            page_count = await self._submit_with_backstop(deadline, count_pdf_pages, file_path)
+            starts = iter(range(max(start_page - 1, 0), page_count, self.pages_per_task))
+            pending: list[tuple[int, asyncio.Task]] = []
+
+            def schedule_next() -> None:
+                start = next(starts, None)
+                if start is not None:
+                    end = min(start + self.pages_per_task, page_count)
+                    pending.append((start, asyncio.ensure_future(
+                        self._submit_with_backstop(deadline, extract_pdf_pages, file_path, start, end)
+                    )))
+
+            for _ in range(self.max_workers):
+                schedule_next()
+            try:
+                while pending:
+                    start, task = pending.pop(0)
+                    pages = await task
+                    schedule_next()
+                    suspended = time.time()
+                    for offset, page_text in enumerate(pages):
+                        # Separate pages like join_pages does
+                        yield TextSegment(page_text + "\n", page=start + offset + 1)
+                    deadline += time.time() - suspended
+            finally:
+                for _, task in pending:
+                    task.cancel()
+        except BrokenProcessPool:
+            logger.error(f"Extraction worker crashed while processing {file_path}")
+            self.shutdown()
+            raise
+
+    async def _submit_with_backstop(self, deadline: float, func: Callable, *args):
+        """Submit a task, giving up shortly after the deadline if its alarm didn't fire."""
+        try:
+            return await asyncio.wait_for(self._submit(deadline, func, *args), timeout=deadline - time.time() + 5)
+        except asyncio.TimeoutError:
+            raise ExtractionTimeoutError(f"Extraction exceeded {self.timeout_seconds}s")
+
+
+extraction_pool = ExtractionPool(
+    max_workers=settings.EXTRACTION_WORKERS or os.cpu_count() or 1,
+    pages_per_task=settings.EXTRACTION_PAGES_PER_TASK,
+    timeout_seconds=settings.EXTRACTION_TIMEOUT_SECONDS,
+    memory_limit_mb=settings.EXTRACTION_MEMORY_LIMIT_MB,
+)
@@ -1,9 +1,37 @@
 """Text extraction from various file formats."""
+import bisect
 import os
-from typing import Optional
+from typing import Iterator, NamedTuple, Optional
 from backend.core.logging import logger
 
 
+class ExtractedText(NamedTuple):
+    """Extracted document text with page boundaries."""
+    text: str
+    page_offsets: Optional[list[int]] = None  # Start offset of each page in text (paged formats only)
+
+
+class TextSegment(NamedTuple):
+    """A piece of extracted text, yielded incrementally by streaming extractors."""
+    text: str
+    page: Optional[int] = None  # 1-based page number for paged formats
+
+
+def join_pages(pages: list[str]) -> ExtractedText:
+    """Join per-page texts once, recording where each page starts."""
+    offsets = []
+    position = 0
+    for page in pages:
+        offsets.append(position)
+        position += len(page) + 1  # "\n" separator
+    return ExtractedText(text="\n".join(pages) + "\n" if pages else "", page_offsets=offsets)
+
+
+def page_number_at(page_offsets: list[int], offset: int) -> int:
+    """Get the 1-based page number containing a text offset."""
+    return max(bisect.bisect_right(page_offsets, offset), 1)
+
+
 def extract_text_from_file(file_path: str, mime_type: Optional[str] = None) -> str:
     """Extract text from file based on extension or mime type.
     
@@ -14,45 +42,86 @@ def extract_text_from_file(file_path: str, mime_type: Optional[str] = None) -> s
     Returns:
         Extracted text content
     """
-    file_ext = os.path.splitext(file_path)[1].lower()
+    file_type = detect_file_type(file_path, mime_type)
     
     try:
-        if file_ext == ".txt" or mime_type == "text/plain":
+        if file_type in ("txt", "md"):
             return extract_text_plain(file_path)
-        elif file_ext == ".pdf" or mime_type == "application/pdf":
+        elif file_type == "pdf":
             return extract_text_pdf(file_path)
-        elif file_ext in [".docx", ".doc"] or mime_type == "application/vnd.openxmlformats-officedocument.wordprocessingml.document":
+        elif file_type == "docx":
             return extract_text_docx(file_path)
-        elif file_ext == ".md" or mime_type == "text/markdown":
-            return extract_text_plain(file_path)
         else:
-            logger.warning(f"Unsupported file type: {file_ext}")
+            logger.warning(f"Unsupported file type: {os.path.splitext(file_path)[1].lower()}")
             return ""
     except Exception as e:
         logger.error(f"Error extracting text from {file_path}: {e}")
         raise
 
 
+def detect_file_type(file_path: str, mime_type: Optional[str] = None) -> Optional[str]:
+    """Detect the document type from extension or mime type.
+    
+    Returns:
+        One of "txt", "pdf", "docx", "md", or None if unsupported
+    """
+    file_ext = os.path.splitext(file_path)[1].lower()
+    if file_ext == ".txt" or mime_type == "text/plain":
+        return "txt"
+    elif file_ext == ".pdf" or mime_type == "application/pdf":
+        return "pdf"
+    elif file_ext in [".docx", ".doc"] or mime_type == "application/vnd.openxmlformats-officedocument.wordprocessingml.document":
+        return "docx"
+    elif file_ext == ".md" or mime_type == "text/markdown":
+        return "md"
+    return None
+
+
 def extract_text_plain(file_path: str) -> str:
     """Extract text from plain text file."""
     with open(file_path, "r", encoding="utf-8") as f:
         return f.read()
 
 
-def extract_text_pdf(file_path: str) -> str:
-    """Extract text from PDF file."""
+def _import_pypdf2():
     try:
         import PyPDF2
     except ImportError:
         logger.error("PyPDF2 not installed. Install with: pip install PyPDF2")
         raise ImportError("PyPDF2 is required for PDF extraction")
-    
-    text = ""
+    return PyPDF2
+
+
+def count_pdf_pages(file_path: str) -> int:
+    """Count the pages of a PDF file."""
+    PyPDF2 = _import_pypdf2()
+    with open(file_path, "rb") as f:
+        return len(PyPDF2.PdfReader(f).pages)
+
+
+def extract_pdf_pages(file_path: str, start: int = 0, end: Optional[int] = None) -> list[str]:
+    """Extract the text of pages ``start`` (inclusive) to ``end`` (exclusive) of a PDF file."""
+    PyPDF2 = _import_pypdf2()
     with open(file_path, "rb") as f:
         pdf_reader = PyPDF2.PdfReader(f)
-        for page in pdf_reader.pages:
-            text += page.extract_text() + "\n"
-    return text
+        total = len(pdf_reader.pages)
+        end = total if end is None else min(end, total)
+        return [pdf_reader.pages[idx].extract_text() or "" for idx in range(start, end)]
+
+
+def extract_text_pdf(file_path: str) -> str:
+    """Extract text from PDF file."""
+    return join_pages(extract_pdf_pages(file_path)).text
+
+
+def iter_text_plain(file_path: str, block_size: int = 64 * 1024) -> Iterator[str]:
+    """Read a plain text file incrementally in blocks of characters."""
+    with open(file_path, "r", encoding="utf-8") as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            yield block
 
 
 def extract_text_docx(file_path: str) -> str:
@@ -105,3 +174,4 @@ def chunk_text(text: str, chunk_size: int = 500, chunk_overlap: int = 50) -> lis
 
 
 
+
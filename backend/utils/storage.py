@@ -1,23 +1,44 @@
-"""File storage abstraction (local or S3)."""
+"""File storage abstraction (local filesystem)."""
+import asyncio
+import hashlib
 import os
 import shutil
+import uuid
 from pathlib import Path
-from typing import Optional
+from typing import AsyncIterator, NamedTuple, Optional
 from backend.core.config import settings
 from backend.core.logging import logger
 
 
+class FileTooLargeError(ValueError):
+    """Raised when an upload exceeds the configured size limit."""
+
+
+class StoredFile(NamedTuple):
+    """Result of streaming a file into storage."""
+    path: str
+    size: int
+    content_hash: str  # SHA-256 hex digest of the file content
+
+
+async def iter_upload(upload, block_size: Optional[int] = None) -> AsyncIterator[bytes]:
+    """Read an ``UploadFile`` (or any object with async ``read``) in fixed-size blocks."""
+    block_size = block_size or settings.UPLOAD_BLOCK_SIZE
+    while True:
+        block = await upload.read(block_size)
+        if not block:
+            break
+        yield block
+
+
 class Storage:
     """Storage abstraction for file operations."""
     
     def __init__(self):
         self.storage_type = settings.STORAGE_TYPE
-        if self.storage_type == "local":
-            self.base_path = Path(settings.UPLOAD_DIR)
-            self.base_path.mkdir(parents=True, exist_ok=True)
-        elif self.storage_type == "s3":
-            # TODO: Initialize S3 client
-            logger.warning("S3 storage not yet implemented")
+        # Only local storage is supported; other values are rejected by the settings
+        self.base_path = Path(settings.UPLOAD_DIR)
+        self.base_path.mkdir(parents=True, exist_ok=True)
     
     def save_file(self, file_content: bytes, file_path: str, user_id: int) -> str:
         """Save file to storage.
@@ -32,9 +53,6 @@ class Storage:
         """
         if self.storage_type == "local":
             return self._save_local(file_content, file_path, user_id)
-        elif self.storage_type == "s3":
-            # TODO: Implement S3 save
-            raise NotImplementedError("S3 storage not yet implemented")
         else:
             raise ValueError(f"Unknown storage type: {self.storage_type}")
     
@@ -51,6 +69,63 @@ class Storage:
         
         return str(full_path)
     
+    async def save_stream(
+        self,
+        blocks: AsyncIterator[bytes],
+        file_path: str,
+        user_id: int,
+        max_size: Optional[int] = None,
+    ) -> StoredFile:
+        """Stream file content into storage block by block.
+        
+        Size and SHA-256 hash are computed while writing, so memory use stays
+        at one block regardless of file size.
+        
+        Args:
+            blocks: Async iterator of file content blocks
+            file_path: Relative path where file should be saved
+            user_id: User ID for organizing files
+            max_size: Abort with FileTooLargeError once this many bytes are exceeded
+        
+        Returns:
+            StoredFile with the saved path, size and content hash
+        """
+        if self.storage_type == "local":
+            return await self._save_stream_local(blocks, file_path, user_id, max_size)
+        else:
+            raise ValueError(f"Unknown storage type: {self.storage_type}")
+    
+    async def _save_stream_local(
+        self,
+        blocks: AsyncIterator[bytes],
+        file_path: str,
+        user_id: int,
+        max_size: Optional[int],
+    ) -> StoredFile:
+        """Stream file to local filesystem via a temporary file."""
+        user_dir = self.base_path / str(user_id)
+        full_path = user_dir / file_path
+        full_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        # Write to a temporary name so a failed upload never replaces a good file
+        tmp_path = full_path.with_name(f".{full_path.name}.{uuid.uuid4().hex}.part")
+        hasher = hashlib.sha256()
+        size = 0
+        try:
+            with open(tmp_path, "wb") as f:
+                async for block in blocks:
+                    size += len(block)
+                    if max_size is not None and size > max_size:
+                        raise FileTooLargeError(f"File size exceeds maximum {max_size} bytes")
+                    hasher.update(block)
+                    await asyncio.to_thread(f.write, block)
+            os.replace(tmp_path, full_path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        
+        return StoredFile(path=str(full_path), size=size, content_hash=hasher.hexdigest())
+    
     def get_file(self, file_path: str) -> bytes:
         """Get file content from storage.
         
@@ -63,9 +138,6 @@ class Storage:
         if self.storage_type == "local":
             with open(file_path, "rb") as f:
                 return f.read()
-        elif self.storage_type == "s3":
-            # TODO: Implement S3 get
-            raise NotImplementedError("S3 storage not yet implemented")
         else:
             raise ValueError(f"Unknown storage type: {self.storage_type}")
     
@@ -87,9 +159,6 @@ class Storage:
             except Exception as e:
                 logger.error(f"Error deleting file {file_path}: {e}")
                 return False
-        elif self.storage_type == "s3":
-            # TODO: Implement S3 delete
-            raise NotImplementedError("S3 storage not yet implemented")
         else:
             raise ValueError(f"Unknown storage type: {self.storage_type}")
 
@@ -82,6 +82,14 @@ export const uploadAPI = {
       headers: { 'Content-Type': 'multipart/form-data' },
     })
   },
+  uploadBulk: (files) => {
+    const formData = new FormData()
+    for (const file of files) formData.append('files', file)
+    return api.post('/api/v1/upload/bulk', formData, {
+      headers: { 'Content-Type': 'multipart/form-data' },
+    })
+  },
+  getBatch: (id) => api.get(`/api/v1/upload/batches/${id}`),
 }
 
 // Documents API
@@ -89,8 +97,17 @@ export const documentsAPI = {
   getAll: (skip = 0, limit = 100) =>
     api.get('/api/v1/docs/', { params: { skip, limit } }),
   getOne: (id) => api.get(`/api/v1/docs/${id}`),
+  getStatus: (id) => api.get(`/api/v1/docs/${id}/status`),
+  reindex: (id, file = null) => {
+    const formData = new FormData()
+    if (file) formData.append('file', file)
+    return api.post(`/api/v1/docs/${id}/reindex`, formData, {
+      headers: { 'Content-Type': 'multipart/form-data' },
+    })
+  },
   update: (id, data) => api.patch(`/api/v1/docs/${id}`, data),
   delete: (id) => api.delete(`/api/v1/docs/${id}`),
+  deleteMany: (ids) => api.post('/api/v1/docs/bulk-delete', { document_ids: ids }),
 }
 
 // Chat API